@@ -6,12 +6,35 @@
 
 # Script to relay raw ethernet frames from a network device to a file, and
 # vice-versa. This allows ethernet access for the simulation tesbench.
+# Frames are exchanged through shared-memory rings (see ethSimRing.py), in a
+# single thread that sleeps until the socket or the testbench are ready, or
+# through plain files (--files) for the older testbenches in sim-old.
+# With rings, the relayed frames can be captured to a pcap file (--pcap), and
+# the frames to the testbench can be replayed from a capture (--replay)
+# instead of taken from the network device.
 
+import argparse
+import errno
+import selectors
 import socket
 import os
+import time
+from collections import deque
 from threading import Thread
+from ethFilter import AttachFilter
+from ethPcap import PcapWriter, ReadPcap
+from ethSimRing import CreateSimRing
 
 ETH_P_ALL = 0x0003
+ETH_TYPE = 0x6000  # iob-eth frame type
+
+# Time in seconds to wait for the testbench to free space in a full ring
+RING_FULL_WAIT = 0.001
+# Frames held by the relay in each direction, on top of the rings
+RELAY_QUEUE_FRAMES = 256
+# Socket receive buffer in bytes, to hold bursts from the host while the
+# testbench is busy (capped by net.core.rmem_max)
+RELAY_SOCKET_BUFFER = 4 << 20
 
 
 def file_2_eth(socket_object, file_object):
@@ -22,17 +45,11 @@ def file_2_eth(socket_object, file_object):
         socket_object.send(file_object.read(frame_size)[:-4])
 
 
-def eth_2_file(socket_object, file_object, mac_filter=None):
-    # Convert mac_filter (str) to bytes
-    if type(mac_filter) is str:
-        mac_filter = int(mac_filter, 16).to_bytes(6, "big")
+def eth_2_file(socket_object, file_object):
     while True:
-        # Capture frames and check their destination mac
-        while True:
-            frame_data, _ = socket_object.recvfrom(4096)
-            # print(f"*detected frame {len(frame_data)} bytes")  # DEBUG
-            if frame_data[0:6] == mac_filter:
-                break
+        # Capture frames (socket filter only lets through the ones to relay)
+        frame_data, _ = socket_object.recvfrom(4096)
+        # print(f"*detected frame {len(frame_data)} bytes")  # DEBUG
         # Ensure soc has read the previous frame by checking file size
         while file_object.tell() > 0:
             file_object.seek(0, os.SEEK_END)
@@ -52,46 +69,270 @@ def file_2_eth_thread(socket_object, fifo_file_path):
         file_2_eth(socket_object, input_file)
 
 
-def relay_frames(interface, input_file, output_file, mac_filter=None):
+def replay_frames(pcap_file, mac_filter=None, realtime=True):
+    """Get frames of a capture to relay to the testbench.
+    param pcap_file: path of the pcap file
+    param mac_filter: only replay frames with this destination MAC addr (bytes)
+    param realtime: replay at the original timing, from the first frame
+    return: iterator of (time.monotonic_ns() to relay the frame at, frame)
+    """
+    offset = None
+    for timestamp, frame in ReadPcap(pcap_file):
+        if frame[12:14] != ETH_TYPE.to_bytes(2, "big"):
+            continue
+        if mac_filter is not None and frame[0:6] != mac_filter:
+            continue
+        if not realtime:
+            yield 0, frame
+            continue
+        if offset is None:
+            offset = time.monotonic_ns() - timestamp
+        yield timestamp + offset, frame
+
+
+def send_queued(socket_object, frames, pcap=None):
+    """Send queued frames until the non-blocking socket is busy.
+    param socket_object: non-blocking socket
+    param frames: deque of frames, sent ones are removed
+    param pcap: PcapWriter to capture the sent frames to, or None
+    return: True if all frames were sent
+    """
+    while frames:
+        try:
+            socket_object.send(frames[0])
+        except BlockingIOError:
+            return False
+        except OSError as e:
+            if e.errno != errno.ENOBUFS:
+                raise
+            return False
+        frame = frames.popleft()
+        if pcap is not None:
+            pcap.Write(frame)
+    return True
+
+
+def relay_rings(
+    socket_object, input_ring, output_ring, bell_fd, pcap=None, replay=None
+):
+    """Relay frames between the socket and the rings, in one thread that sleeps
+    until the socket or the bell of the input ring are ready.
+    param socket_object: bound socket
+    param input_ring: ring of frames from the testbench
+    param output_ring: ring of frames to the testbench
+    param bell_fd: read end of the bell of the input ring (see open_bell)
+    param pcap: PcapWriter to capture the relayed frames to, or None
+    param replay: frames to the testbench from replay_frames, relayed instead
+                  of the frames captured from the socket, or None
+    """
+    socket_object.setblocking(False)
+    socket_object.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RELAY_SOCKET_BUFFER)
+    os.set_blocking(bell_fd, False)
+    # Frames taken from the input ring and not sent yet, and frames captured
+    # while the output ring was full
+    to_eth = deque()
+    to_ring = deque()
+
+    selector = selectors.DefaultSelector()
+    selector.register(bell_fd, selectors.EVENT_READ)
+    if replay is None:
+        next_replay = None
+        socket_events = selectors.EVENT_READ
+        selector.register(socket_object, socket_events)
+    else:
+        next_replay = next(replay, None)
+        socket_events = 0
+    while True:
+        # The testbench does not signal when it frees ring space, so only
+        # poll while waiting for it
+        if to_ring:
+            wait = RING_FULL_WAIT
+        elif next_replay is not None:
+            wait = max(next_replay[0] - time.monotonic_ns(), 0) / 1e9
+        else:
+            wait = None
+        for key, events in selector.select(wait):
+            if key.fd == bell_fd:
+                os.read(bell_fd, 4096)
+            elif events & selectors.EVENT_READ:
+                # Capture frames (socket filter only lets through the ones to relay)
+                while len(to_ring) < RELAY_QUEUE_FRAMES:
+                    try:
+                        frame_data, _ = socket_object.recvfrom(4096)
+                    except BlockingIOError:
+                        break
+                    to_ring.append(frame_data)
+                    if pcap is not None:
+                        pcap.Write(frame_data)
+
+        # Replay frames that are due
+        while next_replay is not None and len(to_ring) < RELAY_QUEUE_FRAMES:
+            if next_replay[0] > time.monotonic_ns():
+                break
+            to_ring.append(next_replay[1])
+            if pcap is not None:
+                pcap.Write(next_replay[1])
+            next_replay = next(replay, None)
+
+        # Queue captured frames, unless the testbench fell a whole ring behind
+        while to_ring and output_ring.Put(to_ring[0]):
+            to_ring.popleft()
+
+        # Take frames from the testbench until the ring is empty, leaving them
+        # in the ring while the socket is busy
+        ring_empty = False
+        while not ring_empty and send_queued(socket_object, to_eth, pcap):
+            while len(to_eth) < RELAY_QUEUE_FRAMES:
+                frame = input_ring.Get()
+                if frame is None:
+                    ring_empty = True
+                    break
+                # Ignore last 4 CRC bytes
+                to_eth.append(frame[:-4])
+        send_queued(socket_object, to_eth, pcap)
+
+        # Stop capturing while the capture queue is full, and wait for the
+        # socket while it has frames to send
+        events = 0
+        if replay is None and len(to_ring) < RELAY_QUEUE_FRAMES:
+            events |= selectors.EVENT_READ
+        if to_eth:
+            events |= selectors.EVENT_WRITE
+        if events != socket_events:
+            if not events:
+                selector.unregister(socket_object)
+            elif not socket_events:
+                selector.register(socket_object, events)
+            else:
+                selector.modify(socket_object, events)
+            socket_events = events
+
+
+def open_bell(bell_path):
+    """Create named pipe rung by the testbench after queueing frames.
+    param bell_path: path of the named pipe
+    return: file descriptors of its read end, and of a write end kept open so
+            reads wait for the testbench instead of returning end of file
+            while it is not running
+    """
+    os.mkfifo(bell_path)
+    bell_fd = os.open(bell_path, os.O_RDONLY | os.O_NONBLOCK)
+    writer_fd = os.open(bell_path, os.O_WRONLY)
+    os.set_blocking(bell_fd, True)
+    return bell_fd, writer_fd
+
+
+def relay_frames(
+    interface,
+    input_file,
+    output_file,
+    mac_filter=None,
+    use_files=False,
+    pcap_file=None,
+    replay_file=None,
+    replay_realtime=True,
+):
     """Relay frames from network device to file and vice-versa.
     param interface: name of network device
-    param input_file: path to the generated input file. Will be a named pipe.
-    param output_file: path to the generated output file
+    param input_file: path to the generated input ring (frames from the testbench).
+                      With use_files, will be a named pipe.
+    param output_file: path to the generated output ring (frames to the testbench)
     param mac_filter: Filter out frames that do not have specified MAC addr as destination
+                      (filtered in the kernel, along with frames of other types)
+    param use_files: relay through plain files, as expected by the sim-old testbenches
+    param pcap_file: path of pcap file to capture the relayed frames to (rings only)
+    param replay_file: path of pcap file with the frames to relay to the testbench,
+                       instead of the ones from the network device (rings only)
+    param replay_realtime: replay frames at their original timing, instead of as
+                           fast as the testbench takes them
     """
 
     # Delete old files
-    if os.path.exists(input_file):
-        os.remove(input_file)
-    if os.path.exists(output_file):
-        os.remove(output_file)
+    bell_file = input_file + ".bell"
+    for path in (input_file, output_file, bell_file):
+        if os.path.exists(path):
+            os.remove(path)
 
-    with socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL)) as s:
-        s.bind((interface, 0))
+    # Convert mac_filter (str) to bytes
+    if type(mac_filter) is str:
+        mac_filter = int(mac_filter, 16).to_bytes(6, "big")
 
-        f2e_thread = Thread(target=file_2_eth_thread, args=(s, input_file), daemon=True)
-        f2e_thread.start()
+    # Receive nothing until the filter is attached and the socket is bound.
+    # Bind to ETH_P_ALL: frames sent by the console in this host only reach
+    # ETH_P_ALL sockets.
+    with socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0) as s:
+        AttachFilter(s, ETH_TYPE, mac_filter)
+        s.bind((interface, ETH_P_ALL))
 
-        with open(output_file, "ab") as output_file:
-            eth_2_file(s, output_file, mac_filter)
+        if use_files:
+            f2e_thread = Thread(
+                target=file_2_eth_thread, args=(s, input_file), daemon=True
+            )
+            f2e_thread.start()
 
+            with open(output_file, "ab") as output_file:
+                eth_2_file(s, output_file)
+            return
 
-if __name__ == "__main__":
-    import sys
+        # The testbench waits for the output ring, so create it last
+        bell_fd, writer_fd = open_bell(bell_file)
+        input_ring = CreateSimRing(input_file)
+        output_ring = CreateSimRing(output_file)
+        replay = None
+        if replay_file is not None:
+            replay = replay_frames(replay_file, mac_filter, replay_realtime)
+        pcap = None if pcap_file is None else PcapWriter(pcap_file)
+        try:
+            relay_rings(s, input_ring, output_ring, bell_fd, pcap, replay)
+        finally:
+            if pcap is not None:
+                pcap.close()
 
-    if len(sys.argv) != 4:
-        print(
-            f"Usage: {sys.argv[0]} <interface> <input_file> <output_file> [-f <dest_mac_addr>]"
-        )
-        sys.exit(1)
 
-    interface = sys.argv[1]
-    input_file = sys.argv[2]
-    output_file = sys.argv[3]
-    dest_mac_addr = (sys.argv[sys.argv.index("-f") + 1] if "-f" in sys.argv else None,)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Relay frames between a network device and the simulation testbench."
+    )
+    parser.add_argument("interface", help="network device")
+    parser.add_argument("input_file", help="frames from the testbench (e.g. soc2eth)")
+    parser.add_argument("output_file", help="frames to the testbench (e.g. eth2soc)")
+    parser.add_argument(
+        "-f", dest="dest_mac_addr", help="only relay frames to this MAC address"
+    )
+    parser.add_argument(
+        "--files",
+        action="store_true",
+        help="relay through plain files (sim-old testbenches)",
+    )
+    parser.add_argument(
+        "--pcap", metavar="FILE", help="capture the relayed frames to pcap FILE"
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="FILE",
+        help="relay the frames in pcap FILE to the testbench, instead of the "
+        "ones from the network device",
+    )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="replay as fast as possible, instead of at the original timing",
+    )
+    args = parser.parse_args()
+    if args.files and (args.pcap or args.replay):
+        parser.error("--pcap and --replay are not supported with --files")
 
     try:
-        relay_frames(interface, input_file, output_file, dest_mac_addr)
+        relay_frames(
+            args.interface,
+            args.input_file,
+            args.output_file,
+            args.dest_mac_addr,
+            args.files,
+            args.pcap,
+            args.replay,
+            not args.fast,
+        )
     except PermissionError as e:
         print(e)
         print(
@@ -0,0 +1,616 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethAsync.py
+
+asyncio transport for the board communication protocol. Frames are received
+from the event loop (loop.add_reader), so one process can run transfers with
+several boards at once, or run other tasks while a transfer is in progress.
+
+Example:
+    async def main():
+        link = AsyncEthLink(CreateSocket(Link(host_mac, interface)))
+        await link.recv_file("output.bin", size, window=32)
+        await link.send_file("input.bin", window=32)
+        print(link.stats.Json())
+        link.close()
+
+    asyncio.run(main())
+
+Several boards through one socket, with frames sorted by source MAC address:
+    async def main():
+        manager = LinkManager(CreateSocket(Link(host_mac, interface)))
+        links = [
+            manager.AddLink(Link(host_mac, interface, dst_addr=mac))
+            for mac in board_macs
+        ]
+        await asyncio.gather(*(link.send_file("input.bin") for link in links))
+        manager.close()
+"""
+
+from ethBase import (
+    CapturePackets,
+    FormAck,
+    FormSize,
+    FrameBuilder,
+    ParseSize,
+    ParseSync,
+    SelectMode,
+    TransferMode,
+    ACK_INTERVAL,
+    ETH_HEADER_LEN,
+    LEGACY_MODE,
+    MODE_ACK,
+    MODE_SEQ,
+    SEQ_HEADER,
+    SyncPayload,
+)
+from ethFile import OpenSink, OpenSource
+from ethMmsg import FRAME_BUFFER_SIZE
+from ethStats import TransferStats
+from ethVerify import CountMismatches
+from os.path import getsize
+from socket import AF_PACKET
+import asyncio
+import time
+
+
+def _ReadFrames(socket, src_addr):
+    """
+    Get all frames ready in non-blocking socket, with given destination MAC
+    address.
+
+    socket: socket for communication
+    src_addr: our MAC address (bytes)
+    return: list of frames (bytes), and True if the peer closed the connection
+            (PC emulation)
+    """
+    ring = getattr(socket, "rx_ring", None)
+    closed = False
+    if ring is not None:
+        # Copy frames out of the ring, they are only valid until the next
+        # receive
+        frames = [bytes(rcv) for rcv in ring.Recv(64, 0)]
+    else:
+        frames = []
+        while True:
+            try:
+                rcv = socket.recv(FRAME_BUFFER_SIZE)
+            except (BlockingIOError, InterruptedError):
+                break
+            if not rcv:
+                closed = True
+                break
+            frames.append(rcv)
+
+    CapturePackets(socket, frames)
+    # Raw sockets are filtered by destination in the kernel
+    if socket.family != AF_PACKET:
+        frames = [rcv for rcv in frames if rcv[0:6] == src_addr]
+    return frames, closed
+
+
+class AsyncEthLink:
+    """
+    Link with one board over a socket from CreateSocket. Must be created from
+    a coroutine, as it registers the socket in the running event loop.
+    """
+
+    def __init__(self, socket, link=None, manager=None, stats=None):
+        """
+        socket: socket for communication
+        link: Link with the addresses and timeout (default: the Link of the
+              socket)
+        manager: LinkManager that receives the frames of this link, or None to
+                 receive all frames of the socket
+        stats: TransferStats of the transfers of this link (default: new one
+               without progress callback)
+        """
+        self.socket = socket
+        self.link = link if link is not None else socket.link
+        self.timeout = self.link.timeout
+        # Transfer mode negotiated in the last sync
+        self.mode = LEGACY_MODE
+        # Whether the board sent sync frames (it negotiates modes)
+        self.board_syncs = False
+        self.stats = stats if stats is not None else TransferStats()
+        self.manager = manager
+        self.frames = asyncio.Queue()
+        self.loop = asyncio.get_running_loop()
+
+        if manager is None:
+            socket.setblocking(False)
+            self.loop.add_reader(socket.fileno(), self._OnReadable)
+
+    def close(self):
+        """Stop receiving frames from the event loop"""
+        if self.manager is None:
+            self.loop.remove_reader(self.socket.fileno())
+        else:
+            self.manager.RemoveLink(self)
+
+    def _OnReadable(self):
+        """Queue payloads of all frames ready in the socket"""
+        frames, closed = _ReadFrames(self.socket, self.link.src_addr)
+        for rcv in frames:
+            self.frames.put_nowait(rcv[ETH_HEADER_LEN:])
+        # Nothing else to receive, sending fails from now on
+        if closed:
+            self.loop.remove_reader(self.socket.fileno())
+
+    async def _Send(self, packets):
+        CapturePackets(self.socket, packets)
+        for packet in packets:
+            await self.loop.sock_sendall(self.socket, packet)
+
+    async def _Recv(self, timeout=None):
+        """Get next payload. Raises asyncio.TimeoutError after timeout seconds"""
+        return await asyncio.wait_for(self.frames.get(), timeout)
+
+    def _Drain(self):
+        """Drop payloads already received (late frames of previous transfers)"""
+        while not self.frames.empty():
+            self.frames.get_nowait()
+
+    async def _RecvMany(self, max_n, timeout=None):
+        """
+        Wait for the first payload, then take only the ones already received.
+
+        return: list of payloads (empty on timeout)
+        """
+        try:
+            payloads = [await self._Recv(timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while len(payloads) < max_n and not self.frames.empty():
+            payloads.append(self.frames.get_nowait())
+        return payloads
+
+    async def _SendAndAck(self, packet, payload):
+        """
+        Send packet and wait for acknowledge with same data, resending it on
+        timeout. The board can not tell a frame sent again from the next one,
+        so the RTO is not allowed below the link timeout here.
+
+        return: difference count between send and received data
+        """
+        rto = self.link.rto
+        errors = 0
+        retransmitted = False
+        self.stats.Sent(1, len(payload))
+        while True:
+            sent_time = time.perf_counter()
+            await self._Send([packet])
+            try:
+                rcv = await self._Recv(max(rto.rto, self.timeout))
+                break
+            except asyncio.TimeoutError:
+                print("Eth send timeout!")
+                self.stats.Timeout()
+                self.stats.Retransmit(1)
+                rto.Backoff()
+                retransmitted = True
+                errors += len(payload)
+
+        # Only frames sent once give unambiguous RTT samples
+        if not retransmitted:
+            rtt = time.perf_counter() - sent_time
+            self.stats.Rtt(rtt)
+            rto.Sample(rtt)
+        self.stats.Received(1)
+        mismatches = CountMismatches(payload, rcv)
+        self.stats.Verified(len(payload), mismatches)
+        return errors + mismatches
+
+    async def _ReplySync(self, mode):
+        await self._Send([self.link.FormPacket(SyncPayload(mode))])
+        self.stats.Sent(1)
+
+    async def sync_ack_first(self, mode=LEGACY_MODE):
+        """
+        Ping board at RTO intervals (without backoff) until it responds,
+        requesting given transfer mode.
+
+        mode: TransferMode to request
+        return: TransferMode accepted by the board
+        """
+        self.stats.BeginSync()
+        sync = SyncPayload(mode)
+        packet = self.link.FormPacket(sync)
+        self._Drain()
+
+        while True:
+            await self._Send([packet])
+            self.stats.Sent(1)
+            try:
+                # Skip late frames of the previous transfer: the reply is a
+                # sync frame, or the sync frame echoed by boards without mode
+                # negotiation
+                while True:
+                    rcv = await self._Recv(self.link.rto.rto)
+                    if ParseSync(rcv) is not None or rcv[: len(sync)] == sync:
+                        break
+                break
+            except asyncio.TimeoutError:
+                self.stats.Timeout()
+        self.stats.Received(1)
+
+        offered = ParseSync(rcv)
+        self.board_syncs = self.board_syncs or offered is not None
+        self.mode = self.stats.mode = SelectMode(mode, offered)
+        return self.mode
+
+    async def sync_ack_last(self, mode=LEGACY_MODE, need_sync=None):
+        """
+        Wait for the board sync frame and reply to it.
+
+        mode: TransferMode to request, if offered by the board
+        need_sync: only accept a sync frame, skipping late frames of the
+                   previous transfer (default: if the board sent sync frames
+                   before, as it negotiates modes)
+        return: TransferMode selected for the transfer
+        """
+        if need_sync is None:
+            need_sync = self.board_syncs
+        self.stats.BeginSync()
+        while True:
+            rcv = await self._Recv()
+            offered = ParseSync(rcv)
+            if not need_sync or offered is not None:
+                break
+        self.stats.Received(1)
+        self.board_syncs = self.board_syncs or offered is not None
+        self.mode = self.stats.mode = SelectMode(mode, offered)
+        await self._ReplySync(self.mode)
+        return self.mode
+
+    async def _SendData(self, f_input, input_file_size, mode):
+        """Send file data with negotiated mode, return error count"""
+        stats = self.stats
+        if not mode.flags & MODE_SEQ:
+            builder = FrameBuilder(self.link.header, payload_size=mode.payload)
+            count_errors = 0
+            stats.BeginData(((input_file_size - 1) // mode.payload) + 1)
+            for start in range(0, input_file_size, mode.payload):
+                frame = builder.ReadInto(f_input, mode.payload)
+                count_errors += await self._SendAndAck(frame, builder.Payload())
+                stats.Progress(start // mode.payload + 1)
+            stats.End()
+            return count_errors
+
+        chunk_size = mode.payload - SEQ_HEADER.size
+        num_frames = ((input_file_size - 1) // chunk_size) + 1
+        stats.BeginData(num_frames)
+        rto = self.link.rto
+
+        # Frames sent but not yet acknowledged: seq -> FrameBuilder holding it
+        in_flight = {}
+        # Send time of frames in flight that were sent only once (RTT samples)
+        sent_time = {}
+        free = [
+            FrameBuilder(self.link.header, SEQ_HEADER.size, chunk_size)
+            for _ in range(mode.window)
+        ]
+        next_seq = 0
+        count_acked = 0
+        count_errors = 0
+
+        while count_acked < num_frames:
+            # Fill the window
+            new_frames = []
+            new_bytes = 0
+            while free and next_seq < num_frames:
+                builder = free.pop()
+                SEQ_HEADER.pack_into(builder.Prefix(), 0, next_seq)
+                new_frames.append(builder.ReadInto(f_input, chunk_size))
+                in_flight[next_seq] = builder
+                new_bytes += builder.length
+                next_seq += 1
+            await self._Send(new_frames)
+            if new_frames:
+                now = time.perf_counter()
+                for seq in range(next_seq - len(new_frames), next_seq):
+                    sent_time[seq] = now
+                stats.Sent(len(new_frames), new_bytes)
+
+            echoes = await self._RecvMany(mode.window, rto.rto)
+            if not echoes:
+                print("Eth send timeout!")
+                stats.Timeout()
+                stats.Retransmit(len(in_flight))
+                rto.Backoff()
+                sent_time.clear()
+                await self._Send([builder.frame for builder in in_flight.values()])
+                continue
+
+            now = time.perf_counter()
+            stats.Received(len(echoes))
+            for echo in echoes:
+                (seq,) = SEQ_HEADER.unpack_from(echo)
+                # Ignore repeated echoes of frames already acknowledged
+                if seq not in in_flight:
+                    continue
+                builder = in_flight.pop(seq)
+                if seq in sent_time:
+                    rtt = now - sent_time.pop(seq)
+                    stats.Rtt(rtt)
+                    rto.Sample(rtt)
+                errors = CountMismatches(
+                    builder.Payload(), memoryview(echo)[SEQ_HEADER.size :]
+                )
+                stats.Verified(builder.length, errors)
+                count_errors += errors
+                free.append(builder)
+                count_acked += 1
+            stats.Progress(count_acked)
+
+        stats.End()
+        return count_errors
+
+    async def _RecvData(self, f_output, expected_size, mode, ack_every, ack_interval):
+        """Receive file data with negotiated mode, return number of bytes"""
+        stats = self.stats
+        if not mode.flags & MODE_SEQ:
+            count_bytes = 0
+            count_frames = 0
+            stats.BeginData(((expected_size - 1) // mode.payload) + 1)
+            while count_bytes < expected_size:
+                payload = await self._Recv()
+                await self._Send([self.link.FormPacket(payload)])
+                # Drop the padding of the last frame
+                payload = payload[: expected_size - count_bytes]
+                f_output.write(payload)
+                count_bytes += len(payload)
+                stats.Received(1, len(payload))
+                stats.Sent(1)
+                count_frames += 1
+                stats.Progress(count_frames)
+            stats.End()
+            return count_bytes
+
+        chunk_size = mode.payload - SEQ_HEADER.size
+        num_frames = ((expected_size - 1) // chunk_size) + 1
+        stats.BeginData(num_frames)
+        if ack_every is None:
+            ack_every = max(mode.window // 2, 1)
+
+        received = bytearray(num_frames)
+        cum_ack = 0
+        count_bytes = 0
+        unacked = 0
+
+        while cum_ack < num_frames:
+            payloads = await self._RecvMany(mode.window, ack_interval)
+            if not payloads:
+                # Also repeats last ack, in case it was lost. Otherwise the
+                # board resends on its own timeout: waiting is not a timeout.
+                if mode.flags & MODE_ACK:
+                    stats.Timeout()
+                    await self._Send([self.link.FormPacket(FormAck(received, cum_ack))])
+                    stats.Retransmit(1)
+                    unacked = 0
+                continue
+
+            echoes = []
+            previous_bytes = count_bytes
+            for payload in payloads:
+                # Sync frame repeated because our reply was lost
+                if ParseSync(payload) is not None:
+                    await self._ReplySync(mode)
+                    continue
+                (seq,) = SEQ_HEADER.unpack_from(payload)
+                if seq >= num_frames:
+                    continue
+
+                if not received[seq]:
+                    bytes_to_receive = min(chunk_size, expected_size - seq * chunk_size)
+                    f_output.seek(seq * chunk_size)
+                    f_output.write(
+                        payload[SEQ_HEADER.size : SEQ_HEADER.size + bytes_to_receive]
+                    )
+                    count_bytes += bytes_to_receive
+                    received[seq] = 1
+                    while cum_ack < num_frames and received[cum_ack]:
+                        cum_ack += 1
+
+                unacked += 1
+                echoes.append(self.link.FormPacket(payload))
+            stats.Received(len(payloads), count_bytes - previous_bytes)
+
+            if mode.flags & MODE_ACK:
+                if unacked >= ack_every or cum_ack == num_frames:
+                    await self._Send([self.link.FormPacket(FormAck(received, cum_ack))])
+                    stats.Sent(1)
+                    unacked = 0
+            else:
+                await self._Send(echoes)
+                stats.Sent(len(echoes))
+            stats.Progress(cum_ack)
+        stats.End()
+
+        # Linger to repeat the final ack if the board did not get it, until it
+        # goes quiet or starts the next transfer
+        while True:
+            payloads = await self._RecvMany(mode.window, self.timeout)
+            if not payloads or any(ParseSync(p) is not None for p in payloads):
+                break
+            stats.Received(len(payloads))
+            if mode.flags & MODE_ACK:
+                await self._Send([self.link.FormPacket(FormAck(received, cum_ack))])
+                stats.Retransmit(1)
+            else:
+                await self._Send(
+                    [self.link.FormPacket(payload) for payload in payloads]
+                )
+                stats.Retransmit(len(payloads))
+
+        return count_bytes
+
+    def _Mode(self, window, flags):
+        if window > 1:
+            return TransferMode(flags, window, self.link.payload)
+        return TransferMode(0, 1, self.link.payload)
+
+    async def send_file(self, input_filename, window=1, use_mmap=False):
+        """
+        Sync with the board and send file (size known by the board).
+
+        input_filename: path of file to send
+        window: maximum number of frames in flight
+        use_mmap: read file through a memory mapping
+        return: difference count between sent and echoed data
+        """
+        mode = await self.sync_ack_first(self._Mode(window, MODE_SEQ))
+        return await self._SendFile(input_filename, mode, use_mmap)
+
+    async def _SendFile(self, input_filename, mode, use_mmap):
+        input_file_size = getsize(input_filename)
+        if input_file_size == 0:
+            return 0
+        f_input = OpenSource(input_filename, use_mmap)
+        try:
+            return await self._SendData(f_input, input_file_size, mode)
+        finally:
+            f_input.close()
+
+    async def send_variable(self, input_filename, window=1, use_mmap=False):
+        """
+        Sync with the board and send file size, then file.
+
+        input_filename: path of file to send
+        window: maximum number of frames in flight
+        use_mmap: read file through a memory mapping
+        return: difference count between sent and echoed data
+        """
+        mode = await self.sync_ack_first(self._Mode(window, MODE_SEQ))
+        payload = FormSize(mode, getsize(input_filename))
+        errors = await self._SendAndAck(self.link.FormPacket(payload), payload)
+        return errors + await self._SendFile(input_filename, mode, use_mmap)
+
+    async def recv_file(
+        self,
+        output_filename,
+        expected_size,
+        window=1,
+        ack_every=None,
+        ack_interval=ACK_INTERVAL,
+        use_mmap=False,
+    ):
+        """
+        Sync with the board and receive file of known size.
+
+        output_filename: path of file to write
+        expected_size: number of bytes to receive
+        window: maximum number of frames in flight
+        ack_every: number of frames per ack (default: half the window)
+        ack_interval: maximum time in seconds between acks
+        use_mmap: preallocate file and write it through a memory mapping
+        return: number of bytes received
+        """
+        mode = await self.sync_ack_last(self._Mode(window, MODE_SEQ | MODE_ACK))
+        return await self._RecvFile(
+            output_filename, expected_size, mode, ack_every, ack_interval, use_mmap
+        )
+
+    async def _RecvFile(
+        self, output_filename, expected_size, mode, ack_every, ack_interval, use_mmap
+    ):
+        if expected_size == 0:
+            return 0
+        f_output = OpenSink(output_filename, expected_size, use_mmap)
+        try:
+            return await self._RecvData(
+                f_output, expected_size, mode, ack_every, ack_interval
+            )
+        finally:
+            f_output.close()
+
+    async def recv_variable(
+        self,
+        output_filename,
+        window=1,
+        ack_every=None,
+        ack_interval=ACK_INTERVAL,
+        use_mmap=False,
+    ):
+        """
+        Sync with the board and receive file size, then file.
+
+        output_filename: path of file to write
+        window: maximum number of frames in flight
+        ack_every: number of frames per ack (default: half the window)
+        ack_interval: maximum time in seconds between acks
+        use_mmap: preallocate file and write it through a memory mapping
+        return: number of bytes received
+        """
+        mode = await self.sync_ack_last(self._Mode(window, MODE_SEQ | MODE_ACK))
+
+        # Receive file size, repeating sync reply if the board lost it
+        while True:
+            payload = await self._Recv()
+            if ParseSync(payload) is None:
+                break
+            await self._ReplySync(mode)
+        await self._Send([self.link.FormPacket(payload)])
+        self.stats.Received(1)
+        self.stats.Sent(1)
+        expected_size = ParseSize(payload, mode)[0]
+
+        return await self._RecvFile(
+            output_filename, expected_size, mode, ack_every, ack_interval, use_mmap
+        )
+
+
+class LinkManager:
+    """
+    Shares one socket among links with several boards. Received frames are
+    sorted by source MAC address into the link with that board address.
+    Must be created from a coroutine, as it registers the socket in the
+    running event loop.
+    """
+
+    def __init__(self, socket):
+        """
+        socket: socket for communication from CreateSocket
+        """
+        self.socket = socket
+        self.src_addr = socket.link.src_addr
+        # Board MAC address -> AsyncEthLink
+        self.links = {}
+        self.loop = asyncio.get_running_loop()
+
+        socket.setblocking(False)
+        self.loop.add_reader(socket.fileno(), self._OnReadable)
+
+    def AddLink(self, link):
+        """
+        Create link with a board.
+
+        link: Link with the board address (dst_addr)
+        return: AsyncEthLink
+        """
+        if link.dst_addr in self.links:
+            raise ValueError(f"Board {link.dst_addr.hex()} already has a link")
+        async_link = AsyncEthLink(self.socket, link, self)
+        self.links[link.dst_addr] = async_link
+        return async_link
+
+    def RemoveLink(self, async_link):
+        self.links.pop(async_link.link.dst_addr, None)
+
+    def close(self):
+        """Stop receiving frames from the event loop"""
+        self.loop.remove_reader(self.socket.fileno())
+        self.links = {}
+
+    def _OnReadable(self):
+        """Queue payloads of all frames ready in the socket into their links"""
+        frames, closed = _ReadFrames(self.socket, self.src_addr)
+        if closed:
+            self.loop.remove_reader(self.socket.fileno())
+        for rcv in frames:
+            async_link = self.links.get(rcv[6:12])
+            # Frames from boards without link are dropped
+            if async_link is not None:
+                async_link.frames.put_nowait(rcv[ETH_HEADER_LEN:])
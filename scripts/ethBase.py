@@ -4,17 +4,26 @@
 
 """ethBase.py
 
-Base functions for socket communication with board.
+Base functions for socket communication with board. The link parameters
+(addresses, interface, timeout) are given by a Link object, kept by the
+socket from CreateSocket. Command line handling is in ethCli.py.
 """
 
-from socket import socket, AF_PACKET, AF_UNIX, SOCK_RAW, SOCK_SEQPACKET, htons, timeout
+from socket import socket, AF_PACKET, AF_UNIX, SOCK_RAW, SOCK_SEQPACKET, timeout
+from collections import namedtuple
+from ethFilter import AttachFilter
+from ethRing import RxRing
+from ethRto import RtoEstimator, RTO_MAX, RTO_MIN
+from ethMmsg import MmsgAvailable, MmsgReceiver, SendMmsg, FRAME_BUFFER_SIZE
+from ethPcap import PcapWriter
+from ethStats import PrintProgress, TransferStats
+from ethVerify import CountMismatches
+import atexit
+import select
+import struct
 import time
-import sys
 import os
-
-
-def PrintBaseUsage():
-    print("<usage>: python eth_comm.py <RMAC> <eth_interface> <timeout>")
+import zlib
 
 
 # Get interface name based on given MAC address
@@ -32,87 +41,458 @@ def get_eth_interface(mac_addr):
     raise Exception(f"No interface with MAC address '{mac_addr}' found!")
 
 
-# Check arguments common to all scripts
-if len(sys.argv) < 3:
-    PrintBaseUsage()
-    sys.exit()
-
+# Socket used instead of the interface in PC emulation ("PC" environment var)
 addr = "/tmp/tmpLocalSocket"
 
 # Ethernet parameters
-interface = sys.argv[2]
-print(f"Using ethernet interface '{interface}'.")
-# use byte arrays by default
-src_addr = bytes.fromhex(sys.argv[1])  # sender MAC address
-dst_addr = bytes.fromhex("01606e11020f")  # receiver MAC address
-eth_type = bytes.fromhex("6000")  # ethernet frame type
+DEFAULT_DST_ADDR = bytes.fromhex("01606e11020f")  # receiver (board) MAC address
+ETH_TYPE = bytes.fromhex("6000")  # ethernet frame type
 ETH_P_ALL = 0x0003
 
 # Frame parameters
 ETH_NBYTES = 1500
 ETH_MINIMUM_NBYTES = 64 - 18
+ETH_HEADER_LEN = 14  # destination and source MAC addresses, frame type
+# Largest payload we can receive (size of receive buffers minus header)
+ETH_MAX_NBYTES = FRAME_BUFFER_SIZE - ETH_HEADER_LEN
+
+DEFAULT_TIMEOUT = 0.1
+
+# Sync frame payload used to negotiate the transfer mode. Peers that do not
+# know it ignore its contents, since any frame is accepted as sync ack.
+# Fields: magic, version, sender, mode flags, window, payload size (0 for
+# ETH_NBYTES, as sent by peers without payload size negotiation)
+SYNC_FRAME = struct.Struct("<4sBBBxHH")
+SYNC_MAGIC = b"IOBE"
+SYNC_VERSION = 1
+SYNC_FROM_HOST = 1
+SYNC_FROM_BOARD = 2
+
+# Transfer mode flags
+MODE_SEQ = 0x01  # data frames carry a sequence number, several may be in flight
+MODE_ACK = 0x02  # receiver sends compact ack frames instead of echoing data
+MODE_CRC = 0x04  # data frames carry a CRC32 of their data, checked by receiver
+MODE_RESUME = 0x08  # host asks to resume an interrupted transfer after sync
+MODE_STREAM = 0x10  # versioned size frame in variable size transfers
+
+# Sequence number at the start of each data frame payload (MODE_SEQ)
+SEQ_HEADER = struct.Struct("<I")
+
+# CRC32 (as zlib.crc32) of the data of each data frame, after its sequence
+# number (MODE_CRC)
+CRC_HEADER = struct.Struct("<I")
+
+# Verdict frame payload (MODE_CRC), sent for each data frame instead of an
+# echo or compact acks: sequence number and whether the data matched its
+# CRC32. After the last data frame, the sender sends a digest frame, with the
+# next sequence number and the CRC32 of the whole file instead of data; its
+# verdict tells if the received file matches.
+VERDICT_FRAME = struct.Struct("<IB")
+VERDICT_OK = 1
+VERDICT_BAD = 2
+
+# Resume frame payload (MODE_RESUME), exchanged before the data frames: the
+# host asks to resume the transfer at an offset, with the CRC32 (as
+# zlib.crc32) of the file data before it; the board replies with the offset
+# it resumes at (0 if its data before the offset does not match).
+# Fields: magic, sender (as in sync frames), offset, CRC32
+RESUME_FRAME = struct.Struct("<4sBxxxII")
+RESUME_MAGIC = b"IOBK"
+
+# Size frame payload of variable size transfers (MODE_STREAM; the size is a
+# 32-bit signed integer otherwise). Fields: magic, version, flags, size.
+# Streams of unknown length are sent in segments, each a variable size
+# transfer (sync, size frame, data) with SIZE_MORE set. The last segment
+# has it clear; a last size frame of 0 bytes (no data follows) is the
+# end-of-stream frame.
+SIZE_FRAME = struct.Struct("<4sBBxxQ")
+SIZE_MAGIC = b"IOBS"
+SIZE_VERSION = 1
+SIZE_MORE = 0x01  # more segments of the stream follow
+# Largest size of a size frame without MODE_STREAM
+SIZE_LEGACY_MAX = (1 << 31) - 1
+
+# Compact ack frame payload (MODE_ACK): number of frames received in order
+# (cumulative ack), and bitmask of frames received after it (selective ack)
+ACK_FRAME = struct.Struct("<II")
+ACK_SACK_BITS = 32
+# Default interval between acks when frames stop arriving (MODE_ACK)
+ACK_INTERVAL = 0.01
+
+# Negotiated transfer mode: mode flags, maximum number of frames in flight and
+# payload size of data frames
+TransferMode = namedtuple(
+    "TransferMode", ["flags", "window", "payload"], defaults=(ETH_NBYTES,)
+)
+LEGACY_MODE = TransferMode(0, 1, ETH_NBYTES)
+
+
+def MacAddr(addr):
+    """Get MAC address as bytes, from bytes or hex string (e.g. '01606e11020f')"""
+    if isinstance(addr, str):
+        return bytes.fromhex(addr.replace(":", ""))
+    return bytes(addr)
+
+
+class Link:
+    """
+    Configuration of the link with one board: our (source) MAC address, board
+    (destination) MAC address, frame type, interface and timeout, and the
+    retransmission timeout estimated from the board response time.
+    """
+
+    def __init__(
+        self,
+        src_addr,
+        interface=None,
+        dst_addr=DEFAULT_DST_ADDR,
+        eth_type=ETH_TYPE,
+        timeout=DEFAULT_TIMEOUT,
+        payload=ETH_NBYTES,
+        rto_min=RTO_MIN,
+        rto_max=RTO_MAX,
+        adaptive=True,
+    ):
+        """
+        src_addr: our MAC address (bytes or hex string)
+        interface: ethernet interface name (not used in PC emulation)
+        dst_addr: board MAC address (bytes or hex string)
+        eth_type: ethernet frame type (bytes or int)
+        timeout: time in seconds to wait for the board before retrying, until
+                 the board response time is measured (initial RTO)
+        payload: largest payload size of data frames to request from the board
+        rto_min: smallest retransmission timeout in seconds
+        rto_max: largest retransmission timeout in seconds
+        adaptive: adapt the retransmission timeout to the measured round trip
+                  times (False always waits 'timeout' seconds)
+        """
+        self.src_addr = MacAddr(src_addr)
+        self.dst_addr = MacAddr(dst_addr)
+        if isinstance(eth_type, int):
+            eth_type = eth_type.to_bytes(2, "big")
+        self.eth_type = eth_type
+        self.interface = interface
+        self.timeout = timeout
+        self.payload = payload
+        self.rto = RtoEstimator(timeout, rto_min, rto_max, adaptive)
+        # Frame header
+        self.header = self.dst_addr + self.src_addr + self.eth_type
+
+    def FormPacket(self, payload):
+        """Generate packet from payload with the header of this link"""
+        return FormPacket(payload, self.header)
+
+
+def MaxPayload(interface):
+    """
+    Get largest payload supported by interface (its MTU) and our receive
+    buffers.
+
+    interface: ethernet interface name
+    return: payload size in bytes
+    """
+    try:
+        with open(f"/sys/class/net/{interface}/mtu", "r") as f:
+            mtu = int(f.read())
+    except (OSError, ValueError):
+        return ETH_NBYTES
+    return max(min(mtu, ETH_MAX_NBYTES), ETH_MINIMUM_NBYTES)
 
-# Frame header
-ETH_HEADER = dst_addr + src_addr + eth_type
 
-# TIMEOUT = 0.1
-TIMEOUT = float(sys.argv[3])
+class LinkSocket(socket):
+    """
+    Socket with the Link configuration used by the functions in this module,
+    optionally an RxRing to receive frames and a PcapWriter that captures the
+    frames sent and received, and the TransferStats of its transfers.
+    """
+
+    link = None
+    rx_ring = None
+    pcap = None
+    stats = None
+
+
+def SocketStats(socket):
+    """Get TransferStats of socket, created (without callback) on first use"""
+    stats = getattr(socket, "stats", None)
+    if stats is None:
+        stats = socket.stats = TransferStats()
+    return stats
 
 
 # Open socket and bind
-def CreateSocket():
+def CreateSocket(link, rx_ring=False, pcap=None):
+    """
+    Create raw socket that only receives frames with our mac as destination
+    addr (filtered in the kernel). If "PC" is defined in the environment,
+    creates an AF_UNIX socket instead. Progress of transfers is printed by
+    its stats callback.
+
+    link: Link with addresses, frame type, interface and timeout
+    rx_ring: receive frames through a memory-mapped ring (raw socket only)
+    pcap: path of pcap file to capture the frames sent and received to
+          (written until the program exits), or None
+    returns: LinkSocket object
+    """
+    if "PC" not in os.environ:
+        s = CreateRawSocket(link, rx_ring)
+        CapturePcap(s, pcap)
+        return s
+
+    s = LinkSocket(AF_UNIX, SOCK_SEQPACKET)
+    while True:
+        try:
+            s.connect(addr)
+            break
+        except:
+            pass
+
+    s.settimeout(None)
+    s.link = link
+    s.stats = TransferStats(PrintProgress)
+    CapturePcap(s, pcap)
+
+    return s
+
+
+def CreateRawSocket(link, rx_ring=False):
     """
-    Create raw socket. If "PC" is defined in the environment, creates an AF_UNIX
-    socket instead.
+    Create raw socket on link interface that only receives frames with our
+    mac as destination addr (filtered in the kernel), even in PC emulation.
 
-    returns: socket object
+    link: Link with addresses, frame type, interface and timeout
+    rx_ring: receive frames through a memory-mapped ring
+    returns: LinkSocket object
     """
-    if "PC" in os.environ:
-        s = socket(AF_UNIX, SOCK_SEQPACKET)
-        while True:
-            try:
-                s.connect(addr)
-                break
-            except:
-                pass
-    else:
-        s = socket(AF_PACKET, SOCK_RAW, htons(ETH_P_ALL))
-        s.bind((interface, 0))
+    # Receive nothing until the filter is attached and the socket is bound.
+    # Bind to ETH_P_ALL: frames sent by other sockets in this host (e.g.
+    # the eth2file relay in simulation) only reach ETH_P_ALL sockets.
+    s = LinkSocket(AF_PACKET, SOCK_RAW, 0)
+    if rx_ring:
+        s.rx_ring = RxRing(s)
+    AttachFilter(s, int.from_bytes(link.eth_type, "big"), link.src_addr)
+    s.bind((link.interface, ETH_P_ALL))
 
     s.settimeout(None)
+    s.link = link
+    s.stats = TransferStats(PrintProgress)
 
     return s
 
 
-def FormPacket(payload):
+def CapturePcap(socket, path):
+    """
+    Capture frames sent and received by socket to a pcap file, until the
+    program exits.
+
+    socket: LinkSocket
+    path: path of pcap file, or None for no capture
+    return: nothing
+    """
+    if path is None:
+        return
+    socket.pcap = PcapWriter(path)
+    atexit.register(socket.pcap.close)
+
+
+def CapturePackets(socket, packets):
+    """Add packets sent or received by socket to its capture, if any"""
+    pcap = getattr(socket, "pcap", None)
+    if pcap is not None:
+        pcap.WriteFrames(packets)
+
+
+def FormPacket(payload, header):
     """
     Generate packet from payload. Add padding to ensure minimum ethernet
     packet size.
 
     payload: byte array with payload data
+    header: Eth header (e.g. Link.header)
 
     return: byte array with {Eth header + payload + (optional padding)}
     """
 
+    packet = header + payload
+
     length = len(payload)
     if length < ETH_MINIMUM_NBYTES:
-        payload = payload + (b"\x00" * (ETH_MINIMUM_NBYTES - length))
+        packet += b"\x00" * (ETH_MINIMUM_NBYTES - length)
+
+    return packet
 
-    return ETH_HEADER + payload
+
+class FrameBuilder:
+    """
+    Reusable frame buffer with the Eth header already written. Payload data is
+    placed right after the header (and an optional prefix, e.g. a sequence
+    number), so frames are built and sent without new allocations.
+    """
+
+    def __init__(self, header, prefix_size=0, payload_size=ETH_NBYTES):
+        self.header_size = len(header)
+        self.prefix_size = prefix_size
+        self.buffer = bytearray(
+            self.header_size + max(prefix_size + payload_size, ETH_MINIMUM_NBYTES)
+        )
+        self.buffer[: self.header_size] = header
+        self.view = memoryview(self.buffer)
+        self.length = 0
+        # Current frame: view of the buffer up to the end of payload/padding
+        self.frame = self.view[:0]
+
+    def Prefix(self):
+        """Get writable view of the prefix, placed before the payload data"""
+        return self.view[self.header_size : self.header_size + self.prefix_size]
+
+    def Payload(self):
+        """Get view of the payload data of the current frame"""
+        start = self.header_size + self.prefix_size
+        return self.view[start : start + self.length]
+
+    def ReadInto(self, f_input, size):
+        """
+        Read payload data from file straight into the frame buffer. Add
+        padding to ensure minimum ethernet packet size.
+
+        f_input: input file object (binary mode)
+        size: number of bytes to read
+        return: memoryview with {Eth header + prefix + payload + (optional padding)}
+        """
+        start = self.header_size + self.prefix_size
+        self.length = f_input.readinto(self.view[start : start + size])
+        return self._Frame()
+
+    def Write(self, payload):
+        """
+        Copy payload data into the frame buffer.
+
+        payload: byte array with payload data
+        return: memoryview with {Eth header + prefix + payload + (optional padding)}
+        """
+        start = self.header_size + self.prefix_size
+        self.length = len(payload)
+        self.view[start : start + self.length] = payload
+        return self._Frame()
+
+    def _Frame(self):
+        end = self.header_size + self.prefix_size + self.length
+        minimum = self.header_size + ETH_MINIMUM_NBYTES
+        if end < minimum:
+            # Clear data left by previous frames
+            self.view[end:minimum] = bytes(minimum - end)
+            end = minimum
+        self.frame = self.view[:end]
+        return self.frame
 
 
 def RecvFrame(socket):
     """Receive a frame, ensuring it has our mac as destination addr"""
+    ring = getattr(socket, "rx_ring", None)
     while True:
-        rcv, _ = socket.recvfrom(4096)
+        if ring is not None:
+            # Frame is a view of the ring, valid until the next receive
+            frames = ring.Recv(1, socket.gettimeout())
+            if not frames:
+                raise timeout("timed out")
+            rcv = frames[0]
+        else:
+            rcv, _ = socket.recvfrom(4096)
+        CapturePackets(socket, (rcv,))
         # print(f"#detected frame {len(rcv)} bytes")  # DEBUG
-        # Ensure destination mac addr matches ours
-        if rcv[0:6] == src_addr:
+        # Ensure destination mac addr matches ours (raw sockets are filtered
+        # in the kernel)
+        if socket.family == AF_PACKET or rcv[0:6] == socket.link.src_addr:
             break
     # print(f"#rcvd {len(rcv)} bytes")  # DEBUG
     return rcv
 
 
+def SendFrames(socket, payloads):
+    """
+    Send several payloads, batching them in as few system calls as possible.
+
+    socket: socket for communication
+    payloads: list of byte arrays with payload data
+    return: nothing
+    """
+    SendPackets(socket, [socket.link.FormPacket(payload) for payload in payloads])
+
+
+def SendPacket(socket, packet):
+    """
+    Send one complete packet.
+
+    socket: socket for communication
+    packet: bytes-like packet
+    return: number of bytes sent
+    """
+    CapturePackets(socket, (packet,))
+    return socket.send(packet)
+
+
+def SendPackets(socket, packets):
+    """
+    Send several complete packets (e.g. from FrameBuilder), batching them in as
+    few system calls as possible.
+
+    socket: socket for communication
+    packets: list of bytes-like packets (bytearray/memoryview must be writable)
+    return: nothing
+    """
+    CapturePackets(socket, packets)
+    if socket.family == AF_PACKET and MmsgAvailable():
+        SendMmsg(socket.fileno(), packets)
+    else:
+        for packet in packets:
+            socket.send(packet)
+
+
+def RecvFrames(socket, max_n, timeout=None):
+    """
+    Receive up to max_n frames that have our mac as destination addr. Waits
+    for the first frame, then takes only the frames already queued.
+
+    socket: socket for communication
+    max_n: maximum number of frames to receive
+    timeout: maximum time in seconds to wait for the first frame (None waits
+             forever)
+    return: list of received payloads (empty on timeout)
+    """
+    ring = getattr(socket, "rx_ring", None)
+    receiver = RecvFrames.receivers.get(max_n)
+    if receiver is None and socket.family == AF_PACKET and MmsgAvailable():
+        receiver = RecvFrames.receivers[max_n] = MmsgReceiver(max_n)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        if ring is not None:
+            # Frames are views of the ring, valid until the next receive
+            frames = ring.Recv(max_n, remaining)
+            if not frames:
+                return []
+        elif not select.select([socket], [], [], remaining)[0]:
+            return []
+        elif receiver is not None and socket.family == AF_PACKET:
+            frames = receiver.Recv(socket.fileno())
+        else:
+            frames = [socket.recv(FRAME_BUFFER_SIZE)]
+            while len(frames) < max_n and select.select([socket], [], [], 0)[0]:
+                frames.append(socket.recv(FRAME_BUFFER_SIZE))
+        CapturePackets(socket, frames)
+
+        # Ensure destination mac addr matches ours (raw sockets are filtered
+        # in the kernel)
+        if socket.family != AF_PACKET:
+            frames = [rcv for rcv in frames if rcv[0:6] == socket.link.src_addr]
+        if frames:
+            return [rcv[ETH_HEADER_LEN:] for rcv in frames]
+
+
+RecvFrames.receivers = {}  # type: ignore
+
+
 def SendAndAck(socket, payload):
     """
     Send payload and receive acknowledge with same data.
@@ -121,30 +501,56 @@ def SendAndAck(socket, payload):
     payload: bytes data payload
     return: difference count between send and received data
     """
-    packet = FormPacket(payload)
+    return SendPacketAndAck(socket, socket.link.FormPacket(payload), payload)
+
+
+def SendPacketAndAck(socket, packet, payload):
+    """
+    Send complete packet and receive acknowledge with same data. The
+    destination can not tell a frame sent again from the next one, so the
+    RTO is not allowed below the link timeout here.
 
+    socket: socket for communication
+    packet: bytes-like packet (e.g. from FrameBuilder)
+    payload: payload data in packet, to compare with the acknowledge
+    return: difference count between send and received data
+    """
+    stats = SocketStats(socket)
+    rto = socket.link.rto
     prev_timeout = socket.gettimeout()
-    socket.settimeout(TIMEOUT)
 
     errors = 0
+    retransmitted = False
+    stats.Sent(1, len(payload))
     while True:
-        bytes_sent = socket.send(packet)
+        sent_time = time.perf_counter()
+        bytes_sent = SendPacket(socket, packet)
 
         try:
+            socket.settimeout(max(rto.rto, socket.link.timeout))
             rcv = RecvFrame(socket)
             break
         except timeout:
             print("Eth send timeout!")
+            stats.Timeout()
+            stats.Retransmit(1)
+            rto.Backoff()
+            retransmitted = True
             errors += len(payload)
             pass
 
     socket.settimeout(prev_timeout)
 
-    for sent_byte, rcv_byte in zip(payload, rcv[len(ETH_HEADER) :]):
-        if sent_byte != rcv_byte:
-            errors += 1
+    # Only frames sent once give unambiguous RTT samples
+    if not retransmitted:
+        rtt = time.perf_counter() - sent_time
+        stats.Rtt(rtt)
+        rto.Sample(rtt)
+    stats.Received(1)
+    mismatches = CountMismatches(payload, memoryview(rcv)[ETH_HEADER_LEN:])
+    stats.Verified(len(payload), mismatches)
 
-    return errors
+    return errors + mismatches
 
 
 def RcvAndAck(socket):
@@ -156,77 +562,310 @@ def RcvAndAck(socket):
     """
     rcv = RecvFrame(socket)
 
-    payload = rcv[len(ETH_HEADER) :]
+    payload = rcv[ETH_HEADER_LEN:]
 
-    socket.send(FormPacket(payload))
+    SendPacket(socket, socket.link.FormPacket(payload))
+    stats = SocketStats(socket)
+    stats.Received(1, len(payload))
+    stats.Sent(1)
 
     return payload
 
 
-def SyncAckFirst(socket):
+def DataPrefixSize(mode):
+    """
+    Get size of the fields before the data in data frames (MODE_SEQ).
+
+    mode: negotiated TransferMode
+    return: size in bytes of the sequence number (and CRC32 with MODE_CRC)
+    """
+    if mode.flags & MODE_CRC:
+        return SEQ_HEADER.size + CRC_HEADER.size
+    return SEQ_HEADER.size
+
+
+def CheckData(payload, length):
+    """
+    Check data of a data frame against its CRC32 (MODE_CRC).
+
+    payload: data frame payload
+    length: number of data bytes in the frame (without padding)
+    return: True if the data matches
+    """
+    (crc,) = CRC_HEADER.unpack_from(payload, SEQ_HEADER.size)
+    start = SEQ_HEADER.size + CRC_HEADER.size
+    return zlib.crc32(memoryview(payload)[start : start + length]) == crc
+
+
+def FormVerdict(seq, ok):
+    """Generate verdict payload for frame seq (MODE_CRC)"""
+    return VERDICT_FRAME.pack(seq, VERDICT_OK if ok else VERDICT_BAD)
+
+
+def FormAck(received, cum_ack):
+    """
+    Generate compact ack payload (MODE_ACK).
+
+    received: bytearray with 1 for each frame received
+    cum_ack: number of frames received in order
+    return: bytes payload
+    """
+    sack = 0
+    for i, got in enumerate(received[cum_ack + 1 : cum_ack + 1 + ACK_SACK_BITS]):
+        if got:
+            sack |= 1 << i
+    return ACK_FRAME.pack(cum_ack, sack)
+
+
+def FormSync(mode, sender=SYNC_FROM_HOST):
+    """
+    Generate sync frame payload requesting given transfer mode.
+
+    mode: TransferMode to request
+    sender: SYNC_FROM_HOST, or SYNC_FROM_BOARD to stand in for the board
+    return: bytes payload
+    """
+    return SYNC_FRAME.pack(
+        SYNC_MAGIC, SYNC_VERSION, sender, mode.flags, mode.window, mode.payload
+    )
+
+
+def SyncPayload(mode):
+    """
+    Get payload of the sync frame to send for given mode.
+
+    mode: TransferMode to request/select
+    return: bytes payload (empty for LEGACY_MODE, as legacy sync frames)
+    """
+    if mode == LEGACY_MODE:
+        return b""
+    return FormSync(mode)
+
+
+def ParseSync(payload, sender=SYNC_FROM_BOARD):
+    """
+    Get transfer mode from sync frame payload sent by the board.
+
+    payload: received payload data
+    sender: SYNC_FROM_BOARD, or SYNC_FROM_HOST to stand in for the board
+    return: TransferMode, or None if payload is not a sync frame from sender
+    """
+    if len(payload) < SYNC_FRAME.size:
+        return None
+    magic, version, frame_sender, flags, window, size = SYNC_FRAME.unpack_from(payload)
+    if magic != SYNC_MAGIC or version != SYNC_VERSION or sender != frame_sender:
+        return None
+    return TransferMode(flags, max(window, 1), size or ETH_NBYTES)
+
+
+def SelectMode(mode, offered):
+    """
+    Get transfer mode supported by both sides.
+
+    mode: TransferMode requested by us
+    offered: TransferMode offered/accepted by the destination (None if it does
+             not negotiate modes)
+    return: TransferMode for the transfer
+    """
+    if offered is None:
+        return LEGACY_MODE
+    return TransferMode(
+        offered.flags & mode.flags,
+        min(offered.window, mode.window),
+        min(offered.payload, mode.payload),
+    )
+
+
+def SyncAckFirst(socket, mode=LEGACY_MODE, keep_stats=False):
     """
-    Ping destination and wait for response at TIMEOUT intervals.
+    Ping destination and wait for response at retransmission timeout
+    intervals. Pings are not backed off, and give no RTT samples, as the
+    destination may just not be listening yet.
 
     socket: socket connection
-    return: nothing
+    mode: TransferMode to request from the destination
+    keep_stats: keep counting the stats of the transfer (next segment of a
+                stream) instead of starting new ones
+    return: TransferMode accepted by the destination
     """
+    stats = SocketStats(socket)
+    stats.BeginSync(keep_stats)
+    rto = socket.link.rto
     previous = socket.gettimeout()
-    socket.settimeout(TIMEOUT)
+    socket.settimeout(rto.rto)
+
+    sync = SyncPayload(mode)
+    packet = socket.link.FormPacket(sync)
 
     while True:
-        socket.send(FormPacket(bytes("", encoding="ascii")))
+        SendPacket(socket, packet)
+        stats.Sent(1)
 
         try:
-            rcv = RecvFrame(socket)
+            # Skip late frames of the previous transfer (e.g. replies to
+            # frames sent again): the reply is a sync frame, or the sync
+            # frame echoed by destinations without mode negotiation
+            while True:
+                payload = RecvFrame(socket)[ETH_HEADER_LEN:]
+                if ParseSync(payload) is not None or payload[: len(sync)] == sync:
+                    break
             break
         except timeout:
-            pass
+            stats.Timeout()
 
     socket.settimeout(previous)
+    stats.Received(1)
 
+    stats.mode = SelectMode(mode, ParseSync(payload))
+    return stats.mode
 
-def SyncAckLast(socket):
+
+def SyncAckLast(socket, mode=LEGACY_MODE, need_sync=False, keep_stats=False):
     """
-    Wait for initial message from socket destination at TIMEOUT intervals.
+    Wait for initial message from socket destination at link timeout intervals.
 
     socket: socket connection
-    return: nothing
+    mode: TransferMode to request, if offered by the destination
+    need_sync: only accept a sync frame, skipping late frames of the previous
+               transfer (the destination is known to negotiate modes)
+    keep_stats: see SyncAckFirst
+    return: TransferMode selected for the transfer
     """
+    stats = SocketStats(socket)
+    stats.BeginSync(keep_stats)
     previous = socket.gettimeout()
-    socket.settimeout(TIMEOUT)
+    socket.settimeout(socket.link.timeout)
 
     while True:
         try:
             rcv = RecvFrame(socket)
-            break
+            if not need_sync or ParseSync(rcv[ETH_HEADER_LEN:]) is not None:
+                break
         except timeout:
             pass
+    stats.Received(1)
 
-    socket.send(FormPacket(bytes("", encoding="ascii")))
+    # Select mode among the ones offered by the destination
+    selected = SelectMode(mode, ParseSync(rcv[ETH_HEADER_LEN:]))
+    stats.mode = selected
+    ReplySync(socket, selected)
 
     socket.settimeout(previous)
 
+    return selected
+
 
-# Print progress every so often
-def TimedPrintProgress(current, n_frames):
+def FormResume(offset, crc, sender=SYNC_FROM_HOST):
     """
-    Print progress.
+    Generate resume frame payload (MODE_RESUME).
 
-    current: current status.
-    n_frames: total number of frames.
-    return: nothing
+    offset: offset in the file to resume the transfer at
+    crc: CRC32 of the file data before offset
+    sender: SYNC_FROM_HOST, or SYNC_FROM_BOARD to stand in for the board
+    return: bytes payload
     """
-    TimedPrintProgress.storedMilli
-    milli = int(round(time.time() * 1000))
+    return RESUME_FRAME.pack(RESUME_MAGIC, sender, offset, crc)
 
-    if (
-        milli > (TimedPrintProgress.storedMilli + 100)
-        or current == 0
-        or current == n_frames
-    ):
-        print("\rProgress: %d / %d" % (current + 1, n_frames + 1))
-        sys.stdout.flush()
-        TimedPrintProgress.storedMilli = milli
+
+def ParseResume(payload, sender=SYNC_FROM_BOARD):
+    """
+    Get offset and CRC32 from resume frame payload (MODE_RESUME).
+
+    payload: received payload data
+    sender: SYNC_FROM_BOARD, or SYNC_FROM_HOST to stand in for the board
+    return: (offset, crc) tuple, or None if payload is not a resume frame from
+            sender
+    """
+    if len(payload) < RESUME_FRAME.size:
+        return None
+    magic, frame_sender, offset, crc = RESUME_FRAME.unpack_from(payload)
+    if magic != RESUME_MAGIC or frame_sender != sender:
+        return None
+    return offset, crc
+
+
+def RequestResume(socket, offset, crc, mode=None):
+    """
+    Ask destination to resume the transfer at offset (MODE_RESUME), at
+    retransmission timeout intervals until it replies.
+
+    socket: socket connection
+    offset: offset in the file to resume at (0 to start over)
+    crc: CRC32 of the file data before offset
+    mode: selected TransferMode, to repeat the sync reply if the destination
+          sends its sync frame again (after SyncAckLast), or None
+    return: offset the destination resumes at
+    """
+    stats = SocketStats(socket)
+    rto = socket.link.rto
+    previous = socket.gettimeout()
+    socket.settimeout(rto.rto)
+
+    packet = socket.link.FormPacket(FormResume(offset, crc))
+    SendPacket(socket, packet)
+    stats.Sent(1)
+    while True:
+        try:
+            payload = RecvFrame(socket)[ETH_HEADER_LEN:]
+        except timeout:
+            stats.Timeout()
+            stats.Retransmit(1)
+            SendPacket(socket, packet)
+            continue
+        stats.Received(1)
+        reply = ParseResume(payload)
+        if reply is not None:
+            break
+        if mode is not None and ParseSync(payload) is not None:
+            ReplySync(socket, mode)
+
+    socket.settimeout(previous)
+    return reply[0]
+
+
+def FormSize(mode, size, flags=0):
+    """
+    Generate size frame payload of a variable size transfer.
+
+    mode: negotiated TransferMode
+    size: number of bytes of the data that follows
+    flags: SIZE_MORE for segments of a stream, except the last
+    return: bytes payload
+    """
+    if mode.flags & MODE_STREAM:
+        return SIZE_FRAME.pack(SIZE_MAGIC, SIZE_VERSION, flags, size)
+    if flags or size > SIZE_LEGACY_MAX:
+        raise ValueError(
+            "Destination does not support streams or sizes over %d bytes"
+            % SIZE_LEGACY_MAX
+        )
+    return struct.pack("<i", size)
 
 
-TimedPrintProgress.storedMilli = 0  # type: ignore
+def ParseSize(payload, mode):
+    """
+    Get size and flags from size frame payload of a variable size transfer.
+
+    payload: received payload data
+    mode: negotiated TransferMode
+    return: (size, flags) tuple
+    """
+    if not mode.flags & MODE_STREAM:
+        return struct.unpack_from("<i", payload)[0], 0
+    magic, version, flags, size = SIZE_FRAME.unpack_from(payload)
+    if magic != SIZE_MAGIC or version != SIZE_VERSION:
+        raise ValueError("Invalid size frame")
+    return size, flags
+
+
+def ReplySync(socket, mode):
+    """
+    Send sync reply with selected transfer mode. Also used to repeat the
+    reply when the destination sends its sync frame again.
+
+    socket: socket connection
+    mode: selected TransferMode
+    return: nothing
+    """
+    SendPacket(socket, socket.link.FormPacket(SyncPayload(mode)))
+    SocketStats(socket).Sent(1)
@@ -0,0 +1,360 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethBatch.py
+
+Transfer of many files in a single variable-size transfer: one sync and size
+frame for the whole batch, and small files sharing frames. The transferred
+stream starts with a manifest:
+    header: magic "IOBB", number of files, manifest size (uint32 each)
+    one entry per file: offset of the file in the stream, size, CRC32 (as
+        zlib.crc32), all uint32, and name length (uint16, with the NUL),
+        followed by the NUL-terminated UTF-8 name
+followed by the files, each at an offset aligned to BATCH_ALIGN bytes (zero
+padding in between), so the board can use them in place (see eth_rcv_batch
+and eth_send_batch in iob_eth.c). Names may hold subdirectories (with '/').
+
+The receiver stages the stream in '<output_dir>/.batch' (so an interrupted
+batch can be resumed with MODE_RESUME), then copies each file out and checks
+it against its CRC32.
+
+Usage:
+    python ethBatch.py <RMAC> <eth_interface> <timeout> send <file> [...]
+    python ethBatch.py <RMAC> <eth_interface> <timeout> rcv <output_dir>
+"""
+
+from ethBase import (
+    CreateSocket,
+    SyncAckFirst,
+    SyncAckLast,
+    ACK_INTERVAL,
+    LEGACY_MODE,
+    MODE_ACK,
+    MODE_SEQ,
+    MODE_STREAM,
+)
+from ethCli import (
+    AddAckOptions,
+    AddCrcOption,
+    AddResumeOption,
+    ArgumentParser,
+    ParseArgs,
+    RequestedMode,
+)
+from ethRcvVariableData import RcvVariableFile
+from ethSendData import SendSource
+from ethSendVariableData import SendSize
+from ethStats import WriteSummary
+from ethVerify import FileCrc32, VERIFY_BLOCK_SIZE
+from bisect import bisect_right
+from collections import namedtuple
+import os
+import struct
+
+BATCH_MAGIC = b"IOBB"
+BATCH_HEADER = struct.Struct("<4sII")
+BATCH_ENTRY = struct.Struct("<IIIH")
+# Alignment of the files in the stream
+BATCH_ALIGN = 8
+# Name of the staged stream in the output directory (refused as a file name)
+BATCH_STREAM = ".batch"
+
+# File in the batch: name, offset in the stream, size and CRC32
+BatchEntry = namedtuple("BatchEntry", "name offset size crc")
+
+
+def _Align(offset):
+    return (offset + BATCH_ALIGN - 1) & -BATCH_ALIGN
+
+
+def FormManifest(files):
+    """
+    Generate batch manifest and lay out the files after it.
+
+    files: list of (name, size, crc) of each file
+    return: manifest bytes, list of BatchEntry, and stream size
+    """
+    names = [name.encode() + b"\0" for name, _, _ in files]
+    if len(set(names)) != len(names):
+        raise ValueError("Repeated file name in batch")
+    manifest_size = BATCH_HEADER.size
+    manifest_size += sum(BATCH_ENTRY.size + len(name) for name in names)
+
+    manifest = bytearray(BATCH_HEADER.pack(BATCH_MAGIC, len(files), manifest_size))
+    entries = []
+    stream_size = manifest_size
+    for (name, size, crc), encoded in zip(files, names):
+        offset = _Align(stream_size)
+        manifest += BATCH_ENTRY.pack(offset, size, crc, len(encoded)) + encoded
+        entries.append(BatchEntry(name, offset, size, crc))
+        stream_size = offset + size
+    return bytes(manifest), entries, stream_size
+
+
+def ParseManifest(f_input, stream_size):
+    """
+    Get the files of a batch from its manifest.
+
+    f_input: binary file object with the stream, positioned at the start
+    stream_size: size of the stream
+    return: list of BatchEntry
+    """
+    header = f_input.read(BATCH_HEADER.size)
+    if len(header) < BATCH_HEADER.size:
+        raise ValueError("Batch too short for a manifest")
+    magic, count, manifest_size = BATCH_HEADER.unpack(header)
+    if magic != BATCH_MAGIC or not BATCH_HEADER.size <= manifest_size <= stream_size:
+        raise ValueError("Invalid batch manifest")
+    data = f_input.read(manifest_size - BATCH_HEADER.size)
+
+    entries = []
+    pos = 0
+    for _ in range(count):
+        if pos + BATCH_ENTRY.size > len(data):
+            raise ValueError("Truncated batch manifest")
+        offset, size, crc, name_len = BATCH_ENTRY.unpack_from(data, pos)
+        pos += BATCH_ENTRY.size
+        name = data[pos : pos + name_len]
+        pos += name_len
+        if len(name) != name_len or not name.endswith(b"\0"):
+            raise ValueError("Truncated batch manifest")
+        if offset < manifest_size or offset + size > stream_size:
+            raise ValueError("File out of batch bounds")
+        entries.append(BatchEntry(name[:-1].decode(), offset, size, crc))
+    return entries
+
+
+class BatchSource:
+    """
+    Stream of a batch of files (manifest, then the files), read like a
+    binary file object. Files are opened as they are read.
+    """
+
+    def __init__(self, filenames, names=None):
+        """
+        filenames: paths of the files to send
+        names: names of the files in the batch (default: base names)
+        """
+        if names is None:
+            names = [os.path.basename(filename) for filename in filenames]
+        files = []
+        for filename, name in zip(filenames, names):
+            with open(filename, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                files.append((name, size, FileCrc32(f, size)))
+        self.manifest, self.entries, self.size = FormManifest(files)
+        self.filenames = list(filenames)
+        self.starts = [entry.offset for entry in self.entries]
+        self.pos = 0
+        # File currently open, and its index
+        self.file = None
+        self.index = None
+
+    def seek(self, offset):
+        self.pos = offset
+
+    def _File(self, index):
+        """Get file object of file at index, closing the previous one"""
+        if index != self.index:
+            self.close()
+            self.file = open(self.filenames[index], "rb")
+            self.index = index
+        return self.file
+
+    def readinto(self, buffer):
+        """
+        Copy stream data at current position into buffer.
+
+        buffer: writable bytes-like object
+        return: number of bytes copied
+        """
+        view = memoryview(buffer).cast("B")
+        count = 0
+        while count < len(view) and self.pos < self.size:
+            space = len(view) - count
+            if self.pos < len(self.manifest):
+                n = min(space, len(self.manifest) - self.pos)
+                view[count : count + n] = self.manifest[self.pos : self.pos + n]
+            else:
+                index = bisect_right(self.starts, self.pos) - 1
+                if (
+                    index < 0
+                    or self.pos >= self.starts[index] + self.entries[index].size
+                ):
+                    # Padding up to the next file
+                    n = min(space, self.starts[index + 1] - self.pos)
+                    view[count : count + n] = bytes(n)
+                else:
+                    entry = self.entries[index]
+                    f = self._File(index)
+                    f.seek(self.pos - entry.offset)
+                    n = min(space, entry.offset + entry.size - self.pos)
+                    n = f.readinto(view[count : count + n])
+                    if not n:
+                        raise OSError(
+                            "File '%s' changed while sending" % self.filenames[index]
+                        )
+            count += n
+            self.pos += n
+        return count
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.index = None
+
+
+def SendBatch(socket, input_filenames, mode=LEGACY_MODE, names=None):
+    """
+    Send batch of files, after syncing with the board.
+
+    socket: socket for communication
+    input_filenames: paths of the files to send
+    mode: negotiated TransferMode
+    names: names of the files in the batch (default: base names)
+    return: difference count between sent and echoed data
+    """
+    source = BatchSource(input_filenames, names)
+    print("Batch: %d files, %d bytes" % (len(source.entries), source.size))
+
+    SendSize(socket, source.size, mode)
+
+    try:
+        # The stream is not kept on disk, so it has no checkpoint
+        return SendSource(socket, source, source.size, mode)
+    finally:
+        source.close()
+
+
+def _OutputPath(output_dir, name):
+    """
+    Get path of a received file, refusing names outside output_dir, names
+    that are not files, and the staged stream (BATCH_STREAM)
+    """
+    parts = name.split("/")
+    if (
+        not name
+        or name.startswith("/")
+        or "" in parts
+        or "." in parts
+        or ".." in parts
+        or parts[0] == BATCH_STREAM
+    ):
+        raise ValueError("Invalid file name in batch: '%s'" % name)
+    return os.path.join(output_dir, *parts)
+
+
+def _CopyRange(f_input, f_output, offset, size):
+    """Copy size bytes at offset of f_input to f_output, in the kernel if possible"""
+    try:
+        while size > 0:
+            n = os.copy_file_range(f_input.fileno(), f_output.fileno(), size, offset)
+            if not n:
+                break
+            offset += n
+            size -= n
+    except (AttributeError, OSError):
+        # Not available in this system or between these file systems
+        pass
+    f_input.seek(offset)
+    while size > 0:
+        block = f_input.read(min(size, VERIFY_BLOCK_SIZE))
+        if not block:
+            raise ValueError("Batch stream ended before its files")
+        f_output.write(block)
+        size -= len(block)
+
+
+def UnpackBatch(stream_filename, output_dir):
+    """
+    Copy the files of a received batch stream to output_dir, checking each
+    one against its CRC32.
+
+    stream_filename: path of the stream
+    output_dir: directory to write the files to
+    return: list of BatchEntry of the files, and number of files that do not
+            match their CRC32
+    """
+    count_errors = 0
+    with open(stream_filename, "rb") as f_input:
+        entries = ParseManifest(f_input, os.fstat(f_input.fileno()).st_size)
+        # Check all names before writing any file
+        paths = [_OutputPath(output_dir, entry.name) for entry in entries]
+        if os.path.realpath(stream_filename) in map(os.path.realpath, paths):
+            raise ValueError("File name in batch overwrites the batch stream")
+        for entry, path in zip(entries, paths):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f_output:
+                _CopyRange(f_input, f_output, entry.offset, entry.size)
+            if FileCrc32(f_input, entry.size, entry.offset) != entry.crc:
+                print("Error, '%s' does not match its CRC32" % entry.name)
+                count_errors += 1
+    return entries, count_errors
+
+
+def RcvBatch(
+    socket,
+    output_dir,
+    mode=LEGACY_MODE,
+    ack_every=None,
+    ack_interval=ACK_INTERVAL,
+    use_mmap=False,
+):
+    """
+    Receive batch of files, after syncing with the board. The staged stream is
+    kept if a file does not match its CRC32.
+
+    socket: socket for communication
+    output_dir: directory to write the files to
+    mode: negotiated TransferMode
+    ack_every: number of frames per ack (MODE_ACK)
+    ack_interval: maximum time in seconds between acks (MODE_ACK)
+    use_mmap: receive stream through a memory mapping
+    return: list of BatchEntry of the files, and number of files that do not
+            match their CRC32
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stream_filename = os.path.join(output_dir, BATCH_STREAM)
+    RcvVariableFile(socket, stream_filename, mode, ack_every, ack_interval, use_mmap)
+    entries, count_errors = UnpackBatch(stream_filename, output_dir)
+    print("Batch: %d files, %d with errors" % (len(entries), count_errors))
+    if not count_errors:
+        os.remove(stream_filename)
+    return entries, count_errors
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser("Send or receive a batch of files.")
+    AddAckOptions(parser)
+    AddCrcOption(parser)
+    AddResumeOption(parser)
+    ops = parser.add_subparsers(dest="op", required=True)
+    ops.add_parser("send", help="send files to board").add_argument(
+        "input_files", nargs="+"
+    )
+    ops.add_parser("rcv", help="receive files from board").add_argument("output_dir")
+    args, link = ParseArgs(parser)
+
+    socket = CreateSocket(link, args.rx_ring, args.pcap)
+
+    if args.op == "send":
+        print("\nStarting batch transmission...")
+        mode = SyncAckFirst(socket, RequestedMode(args, MODE_SEQ, MODE_STREAM))
+        SendBatch(socket, args.input_files, mode)
+    else:
+        print("\nStarting batch reception...")
+        # Streams can not be received through a memory mapping
+        stream = 0 if args.mmap else MODE_STREAM
+        mode = SyncAckLast(socket, RequestedMode(args, MODE_SEQ | MODE_ACK, stream))
+        RcvBatch(
+            socket,
+            args.output_dir,
+            mode,
+            args.ack_every,
+            ACK_INTERVAL if args.ack_interval is None else args.ack_interval / 1000,
+            args.mmap,
+        )
+    if args.stats:
+        WriteSummary(socket.stats, args.stats)
@@ -0,0 +1,560 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethBench.py
+
+Throughput and latency benchmark of the host transfer functions, without a
+board. The board is stood in for by a BoardEmulator (ethEmulator.py) in a
+thread, serving the PC emulation socket (/tmp/tmpLocalSocket), optionally
+with delay, loss and processing time per frame.
+
+Each run syncs and transfers one file, and reports throughput (MB/s and
+frames/s), per-frame round trip times (measured by the sender of the data
+frames) and host CPU time per MB. Results are written as JSON, to compare
+runs across commits. The host adapts its retransmission timeout to the
+measured RTT, unless --fixed-timeout is given.
+
+Runs are made in a child process, stopped after a deadline (--run-timeout),
+so a stalled run does not block the sweep; its "status" is then "timeout"
+("ok" otherwise, or "error"). With loss, stop-and-wait runs (window 1
+without CRC32) are "skipped", as that mode does not recover lost frames.
+
+Usage:
+    python ethBench.py [-s sizes] [-p payloads] [-t timeouts] [-w windows]
+                       [--ops ops] [-r repeat] [-o results.json]
+                       [-d delay_ms] [-l loss] [-c processing_us]
+                       [--fixed-timeout] [--run-timeout seconds]
+"""
+
+from ethBase import (
+    LinkSocket,
+    Link,
+    SocketStats,
+    SyncAckFirst,
+    SyncAckLast,
+    TransferMode,
+    DataPrefixSize,
+    DEFAULT_DST_ADDR,
+    ETH_HEADER_LEN,
+    ETH_NBYTES,
+    MODE_ACK,
+    MODE_CRC,
+    MODE_SEQ,
+    SEQ_HEADER,
+    addr,
+)
+from ethEmulator import AcceptUnix, BoardEmulator, ListenUnix
+from ethRcvData import RcvFile
+from ethRcvVariableData import RcvVariableFile
+from ethSendData import SendFile
+from ethSendVariableData import SendVariableFile
+from ethVerify import CountMismatches, VerifyFiles
+from socket import AF_UNIX, SOCK_SEQPACKET
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# MAC address of the host in benchmark runs
+HOST_ADDR = bytes.fromhex("02aaaaaaaa01")
+
+# Default deadline of each run, in seconds
+RUN_TIMEOUT = 120
+
+# Board linger time after receiving a file, in largest host RTOs
+BENCH_LINGER_TIMEOUTS = 2
+
+# Host operations, with the mode flags they request and the board operation
+# they pair with
+OPS = {
+    "send_file": (MODE_SEQ, "rcv_file"),
+    "send_variable": (MODE_SEQ, "rcv_variable"),
+    "rcv_file": (MODE_SEQ | MODE_ACK, "send_file"),
+    "rcv_variable": (MODE_SEQ | MODE_ACK, "send_variable"),
+    "send_file_crc": (MODE_SEQ | MODE_CRC, "rcv_file"),
+    "rcv_file_crc": (MODE_SEQ | MODE_CRC, "send_file"),
+}
+
+
+class RttMeter:
+    """
+    Round trip time samples of data frames, from their (first) transmission to
+    their acknowledge. Frames sent more than once give no sample, since their
+    acknowledge can not be matched to one transmission.
+    """
+
+    def __init__(self):
+        self.sent = {}
+        self.resent = set()
+        self.samples = []
+
+    def Sent(self, key):
+        """Record transmission of frame with given key (e.g. sequence number)"""
+        if key in self.sent or key in self.resent:
+            self.sent.pop(key, None)
+            self.resent.add(key)
+        else:
+            self.sent[key] = time.perf_counter()
+
+    def Acked(self, key):
+        """Record acknowledge of frame with given key"""
+        if key in self.resent:
+            self.resent.discard(key)
+            return
+        start = self.sent.pop(key, None)
+        if start is not None:
+            self.samples.append(time.perf_counter() - start)
+
+
+def FrameKey(payload, seq):
+    """
+    Get key of data frame for RttMeter.
+
+    payload: frame payload
+    seq: True if frames carry a sequence number (MODE_SEQ)
+    return: sequence number, or 0 (stop-and-wait has one frame in flight)
+    """
+    if seq and len(payload) >= SEQ_HEADER.size:
+        return SEQ_HEADER.unpack_from(payload)[0]
+    return 0
+
+
+class TimedSocket(LinkSocket):
+    """LinkSocket that feeds the RttMeter set in 'meter' with its data frames"""
+
+    meter = None
+    seq = False
+
+    def send(self, data, *args):
+        if self.meter is not None:
+            self.meter.Sent(FrameKey(memoryview(data)[ETH_HEADER_LEN:], self.seq))
+        return super().send(data, *args)
+
+    def recv(self, bufsize, *args):
+        data = super().recv(bufsize, *args)
+        if self.meter is not None:
+            self.meter.Acked(FrameKey(data[ETH_HEADER_LEN:], self.seq))
+        return data
+
+    def recvfrom(self, bufsize, *args):
+        data, address = super().recvfrom(bufsize, *args)
+        if self.meter is not None:
+            self.meter.Acked(FrameKey(data[ETH_HEADER_LEN:], self.seq))
+        return data, address
+
+
+def Percentile(samples, percent):
+    """
+    Get percentile of samples (nearest rank).
+
+    samples: list of numbers
+    percent: percentile (0 to 100)
+    return: percentile value, or None if there are no samples
+    """
+    if not samples:
+        return None
+    samples = sorted(samples)
+    rank = max(int(-(-percent * len(samples) // 100)), 1)
+    return samples[rank - 1]
+
+
+def RunOnce(
+    op, size, payload, timeout, window, directory, impairments={}, adaptive=True
+):
+    """
+    Run and measure one transfer against a BoardEmulator.
+
+    op: host operation (key of OPS)
+    size: file size in bytes
+    payload: largest payload size to request
+    timeout: link timeout in seconds
+    window: maximum number of frames in flight
+    directory: directory for the transferred files
+    impairments: BoardEmulator arguments (delay, loss, processing, seed)
+    adaptive: adapt the host retransmission timeout to the measured RTT
+    return: dict with the results
+    """
+    flags, board_op = OPS[op]
+    host_sends = board_op.startswith("rcv")
+    data = os.urandom(size)
+    input_filename = os.path.join(directory, "input.bin")
+    output_filename = os.path.join(directory, "output.bin")
+    with open(input_filename, "wb") as f:
+        f.write(data)
+
+    link = Link(HOST_ADDR, timeout=timeout, payload=payload, adaptive=adaptive)
+    host_rto_max = link.rto.maximum if adaptive else timeout
+
+    # Board runs in a thread, until the host disconnects
+    server = ListenUnix()
+    board_link = Link(DEFAULT_DST_ADDR, dst_addr=HOST_ADDR, timeout=timeout)
+    board_meter = RttMeter()
+    board = {}
+
+    def Board():
+        # Linger for longer than the host may wait to resend, so lost final
+        # echoes do not stall lossy runs (the host disconnect ends it)
+        emulator = BoardEmulator(
+            AcceptUnix(server, board_link),
+            linger=BENCH_LINGER_TIMEOUTS * host_rto_max,
+            **impairments,
+        )
+        emulator.meter = board_meter
+        try:
+            board["result"] = emulator.Run(board_op, size if host_sends else data)
+            emulator.Idle()
+        except OSError as error:
+            board["error"] = error
+        finally:
+            emulator.close()
+
+    board_thread = threading.Thread(target=Board, daemon=True)
+    board_thread.start()
+
+    eth_socket = TimedSocket(AF_UNIX, SOCK_SEQPACKET)
+    eth_socket.connect(addr)
+    eth_socket.link = link
+    requested = TransferMode(
+        flags if window > 1 or flags & MODE_CRC else 0, window, payload
+    )
+
+    host_meter = RttMeter()
+    start_cpu = time.thread_time()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if host_sends:
+            mode = SyncAckFirst(eth_socket, requested)
+            eth_socket.meter = host_meter
+            eth_socket.seq = bool(mode.flags & MODE_SEQ)
+            if board_op == "rcv_file":
+                SendFile(eth_socket, input_filename, mode)
+            else:
+                SendVariableFile(eth_socket, input_filename, mode)
+        else:
+            mode = SyncAckLast(eth_socket, requested)
+            if board_op == "send_file":
+                RcvFile(eth_socket, output_filename, size, mode)
+            else:
+                RcvVariableFile(eth_socket, output_filename, mode)
+    seconds = time.perf_counter() - start
+    cpu_seconds = time.thread_time() - start_cpu
+    eth_socket.meter = None
+    stats = SocketStats(eth_socket)
+
+    eth_socket.close()
+    board_thread.join()
+    server.close()
+    os.unlink(addr)
+    if "error" in board:
+        raise board["error"]
+
+    if host_sends:
+        errors = CountMismatches(data, board["result"])
+        samples = host_meter.samples
+    else:
+        errors = VerifyFiles(input_filename, output_filename)[0]
+        samples = board_meter.samples
+
+    if mode.flags & MODE_SEQ:
+        chunk_size = mode.payload - DataPrefixSize(mode)
+    else:
+        chunk_size = mode.payload
+    num_frames = ((size - 1) // chunk_size) + 1
+    rtt_p50 = Percentile(samples, 50)
+    rtt_p99 = Percentile(samples, 99)
+
+    return {
+        "op": op,
+        "size": size,
+        "payload": payload,
+        "timeout": timeout,
+        "window": window,
+        "adaptive": adaptive,
+        **impairments,
+        "status": "ok",
+        "mode": list(mode),
+        "seconds": seconds,
+        "mb_per_s": size / 1e6 / seconds,
+        "frames": num_frames,
+        "frames_per_s": num_frames / seconds,
+        "rtt_p50_us": None if rtt_p50 is None else rtt_p50 * 1e6,
+        "rtt_p99_us": None if rtt_p99 is None else rtt_p99 * 1e6,
+        "rtt_samples": len(samples),
+        "cpu_s_per_mb": cpu_seconds / (size / 1e6),
+        "sync_s": stats.sync_time,
+        "retransmits": stats.retransmits,
+        "timeouts": stats.timeouts,
+        "rto_s": link.rto.rto,
+        "errors": errors,
+    }
+
+
+def _RunChild(connection, args):
+    """Run RunOnce with args, sending its result or error through connection"""
+    try:
+        connection.send(RunOnce(*args))
+    except Exception as error:
+        connection.send(error)
+    connection.close()
+
+
+def RunWithTimeout(
+    op,
+    size,
+    payload,
+    timeout,
+    window,
+    directory,
+    impairments={},
+    adaptive=True,
+    run_timeout=RUN_TIMEOUT,
+):
+    """
+    Run RunOnce in a child process, stopped if it does not end in time.
+    Stop-and-wait runs with loss are skipped, as they stall on the first
+    lost frame.
+
+    op, size, payload, timeout, window, directory, impairments, adaptive:
+        as in RunOnce
+    run_timeout: deadline of the run in seconds
+    return: dict with the results, or with the run parameters and "status"
+            "timeout", "error" (and "message") or "skipped"
+    """
+    result = {
+        "op": op,
+        "size": size,
+        "payload": payload,
+        "timeout": timeout,
+        "window": window,
+        "adaptive": adaptive,
+        **impairments,
+    }
+    if impairments.get("loss") and window == 1 and not OPS[op][0] & MODE_CRC:
+        result["status"] = "skipped"
+        return result
+
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    args = (op, size, payload, timeout, window, directory, impairments, adaptive)
+    process = context.Process(target=_RunChild, args=(sender, args), daemon=True)
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(run_timeout):
+            result["status"] = "timeout"
+            return result
+        try:
+            child_result = receiver.recv()
+        except EOFError:
+            child_result = RuntimeError("run ended with code %s" % process.exitcode)
+        if isinstance(child_result, Exception):
+            result["status"] = "error"
+            result["message"] = repr(child_result)
+            return result
+        return child_result
+    finally:
+        receiver.close()
+        if process.is_alive():
+            process.kill()
+        process.join()
+
+
+def GitRevision():
+    """Get git revision of the scripts, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def RunBenchmark(
+    ops,
+    sizes,
+    payloads,
+    timeouts,
+    windows,
+    repeat=1,
+    impairments={},
+    log=None,
+    adaptive=True,
+    run_timeout=RUN_TIMEOUT,
+):
+    """
+    Run all combinations of the given parameters (see RunWithTimeout).
+
+    ops: list of host operations (keys of OPS)
+    sizes: list of file sizes in bytes
+    payloads: list of payload sizes
+    timeouts: list of link timeouts in seconds
+    windows: list of windows
+    repeat: number of runs of each combination
+    impairments: BoardEmulator arguments (delay, loss, processing, seed)
+    log: function called with the results of each run, or None
+    adaptive: adapt the host retransmission timeout to the measured RTT
+    run_timeout: deadline of each run in seconds
+    return: dict with the benchmark environment and list of run results
+    """
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+        for op in ops:
+            for size in sizes:
+                for payload in payloads:
+                    for timeout in timeouts:
+                        for window in windows:
+                            for _ in range(repeat):
+                                result = RunWithTimeout(
+                                    op,
+                                    size,
+                                    payload,
+                                    timeout,
+                                    window,
+                                    directory,
+                                    impairments,
+                                    adaptive,
+                                    run_timeout,
+                                )
+                                runs.append(result)
+                                if log is not None:
+                                    log(result)
+    return {
+        "revision": GitRevision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runs": runs,
+    }
+
+
+def _List(cast):
+    return lambda value: [cast(item) for item in value.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark transfers against a local board stand-in."
+    )
+    parser.add_argument(
+        "-s",
+        dest="sizes",
+        type=_List(int),
+        default=[100000, 1000000],
+        help="comma separated file sizes in bytes",
+    )
+    parser.add_argument(
+        "-p",
+        dest="payloads",
+        type=_List(int),
+        default=[ETH_NBYTES],
+        help="comma separated payload sizes",
+    )
+    parser.add_argument(
+        "-t",
+        dest="timeouts",
+        type=_List(float),
+        default=[0.1],
+        help="comma separated link timeouts in seconds",
+    )
+    parser.add_argument(
+        "-w",
+        dest="windows",
+        type=_List(int),
+        default=[1, 32],
+        help="comma separated windows",
+    )
+    parser.add_argument(
+        "--ops",
+        type=_List(str),
+        default=list(OPS),
+        help="comma separated operations (%s)" % ", ".join(OPS),
+    )
+    parser.add_argument("-r", dest="repeat", type=int, default=1, help="repeat runs")
+    parser.add_argument(
+        "-d", dest="delay", type=float, default=0, help="board frame delay in ms"
+    )
+    parser.add_argument(
+        "-l", dest="loss", type=float, default=0, help="frame loss probability"
+    )
+    parser.add_argument(
+        "-c",
+        dest="processing",
+        type=float,
+        default=0,
+        help="board processing time per frame in us",
+    )
+    parser.add_argument(
+        "--fixed-timeout",
+        action="store_true",
+        help="host always waits the link timeout, instead of adapting to the RTT",
+    )
+    parser.add_argument(
+        "--run-timeout",
+        type=float,
+        default=RUN_TIMEOUT,
+        help="seconds before a run is stopped and recorded as timed out",
+    )
+    parser.add_argument("-o", dest="output", help="output JSON file (default stdout)")
+    args = parser.parse_args()
+    for op in args.ops:
+        if op not in OPS:
+            parser.error(f"unknown operation '{op}'")
+
+    def Log(result):
+        if result["status"] != "ok":
+            print(
+                "%-13s %9d B  payload %4d  window %2d  %s %s"
+                % (
+                    result["op"],
+                    result["size"],
+                    result["payload"],
+                    result["window"],
+                    result["status"],
+                    result.get("message", ""),
+                ),
+                file=sys.stderr,
+            )
+            return
+        print(
+            "%-13s %9d B  payload %4d  window %2d  %8.2f MB/s  p99 %s us"
+            % (
+                result["op"],
+                result["size"],
+                result["mode"][2],
+                result["mode"][1],
+                result["mb_per_s"],
+                "-" if result["rtt_p99_us"] is None else "%.0f" % result["rtt_p99_us"],
+            ),
+            file=sys.stderr,
+        )
+
+    results = RunBenchmark(
+        args.ops,
+        args.sizes,
+        args.payloads,
+        args.timeouts,
+        args.windows,
+        args.repeat,
+        dict(delay=args.delay / 1000, loss=args.loss, processing=args.processing / 1e6),
+        Log,
+        not args.fixed_timeout,
+        args.run_timeout,
+    )
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
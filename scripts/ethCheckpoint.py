@@ -0,0 +1,124 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethCheckpoint.py
+
+Checkpoints of resumable transfers (MODE_RESUME). While a file is sent or
+received, the host keeps next to it (in '<file>.ckpt') the file size, the
+offset up to which the board acknowledged the data in order, and the CRC32 of
+the data before that offset. The next transfer of the same file asks the board
+to resume at the checkpoint, after checking that the file still holds the
+data it covers, and the board accepts if its own data before the offset
+matches the CRC32.
+
+Checkpoints are saved every CHECKPOINT_INTERVAL bytes and when the transfer is
+interrupted (e.g. Ctrl-C after a board reset), and removed once the whole file
+was transferred.
+"""
+
+from ethVerify import FileCrc32
+import json
+import os
+
+CHECKPOINT_SUFFIX = ".ckpt"
+# Bytes acknowledged between checkpoint saves
+CHECKPOINT_INTERVAL = 16 << 20
+
+
+class Checkpoint:
+    """Offset acknowledged in order of a file transfer, kept on disk"""
+
+    def __init__(self, filename, size, sink=None, interval=CHECKPOINT_INTERVAL):
+        """
+        filename: path of the transferred file
+        size: file size in bytes
+        sink: file object the data is received into, flushed before the data
+            is read back (None when sending)
+        interval: bytes acknowledged between checkpoint saves
+        """
+        self.filename = filename
+        self.path = filename + CHECKPOINT_SUFFIX
+        self.size = size
+        self.sink = sink
+        self.interval = interval
+        # Offset covered by crc (the last one saved), offset the transfer
+        # resumed at, and offset acknowledged in order
+        self.offset = 0
+        self.crc = 0
+        self.start = 0
+        self.done = 0
+
+    def Load(self):
+        """
+        Get saved checkpoint, if it is for a file of this size that still
+        holds the data before the checkpoint offset.
+
+        return: (offset, crc) to request resuming at, (0, 0) to start over
+        """
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            offset, crc = state["offset"], state["crc"]
+        except (OSError, ValueError, KeyError):
+            return 0, 0
+        if state.get("size") != self.size or not 0 < offset < self.size:
+            return 0, 0
+        with open(self.filename, "rb") as f:
+            if FileCrc32(f, offset) != crc:
+                print("Checkpoint does not match '%s', ignoring it" % self.filename)
+                return 0, 0
+        self.offset, self.crc = offset, crc
+        return offset, crc
+
+    def Resume(self, offset):
+        """
+        Start transfer at the offset accepted by the board.
+
+        offset: offset to resume at
+        return: offset
+        """
+        if offset != self.offset:
+            if self.offset:
+                print("Board does not have the checkpoint data, starting over")
+            with open(self.filename, "rb") as f:
+                self.crc = FileCrc32(f, offset)
+            self.offset = offset
+        elif offset:
+            print("Resuming transfer at byte %d of %d" % (offset, self.size))
+        self.start = offset
+        self.done = offset
+        return offset
+
+    def Acked(self, count):
+        """
+        Update checkpoint, saving it every interval bytes.
+
+        count: bytes acknowledged in order since the resume offset
+        """
+        self.done = self.start + count
+        if self.done - self.offset >= self.interval:
+            self.Save()
+
+    def Save(self):
+        """Save checkpoint at the offset acknowledged so far"""
+        if self.sink is not None:
+            self.sink.flush()
+        with open(self.filename, "rb") as f:
+            self.crc = FileCrc32(f, self.done - self.offset, self.offset, self.crc)
+        self.offset = self.done
+        state = {"size": self.size, "offset": self.offset, "crc": self.crc}
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def Close(self):
+        """
+        Remove checkpoint once the whole file was transferred, or save it if
+        the transfer was interrupted.
+        """
+        if self.done >= self.size:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        elif self.done > self.offset:
+            self.Save()
@@ -0,0 +1,174 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethCli.py
+
+Command line handling of the transfer scripts. All scripts take the link
+parameters first:
+    <RMAC> <eth_interface> <timeout>
+followed by their own arguments and options.
+"""
+
+from ethBase import (
+    Link,
+    MaxPayload,
+    TransferMode,
+    ETH_MINIMUM_NBYTES,
+    MODE_CRC,
+    MODE_RESUME,
+    MODE_SEQ,
+)
+from ethRto import RTO_MAX, RTO_MIN
+import argparse
+
+
+def ArgumentParser(description):
+    """
+    Create parser with the arguments common to all transfer scripts.
+
+    description: script description
+    return: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("rmac", metavar="RMAC", help="MAC address of this host")
+    parser.add_argument("interface", metavar="eth_interface", help="interface name")
+    parser.add_argument(
+        "timeout",
+        type=float,
+        help="seconds to wait for the board before retrying, until its response "
+        "time is measured",
+    )
+    parser.add_argument(
+        "-w",
+        dest="window",
+        type=int,
+        default=1,
+        help="maximum number of frames in flight (negotiated with the board)",
+    )
+    parser.add_argument(
+        "-p",
+        dest="payload",
+        type=int,
+        default=None,
+        help="largest payload size of data frames (default: interface MTU)",
+    )
+    parser.add_argument(
+        "--rto-min",
+        type=float,
+        default=RTO_MIN * 1000,
+        help="smallest retransmission timeout in ms",
+    )
+    parser.add_argument(
+        "--rto-max",
+        type=float,
+        default=RTO_MAX * 1000,
+        help="largest retransmission timeout in ms (after backoff)",
+    )
+    parser.add_argument(
+        "--fixed-timeout",
+        action="store_true",
+        help="always wait 'timeout' seconds, instead of adapting to the board",
+    )
+    parser.add_argument(
+        "--rx-ring",
+        action="store_true",
+        help="receive frames through a memory-mapped ring",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="access the transferred file through a memory mapping",
+    )
+    parser.add_argument(
+        "--pcap",
+        metavar="FILE",
+        default=None,
+        help="capture the frames sent and received to pcap FILE",
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="FILE",
+        default=None,
+        help="write JSON summary of the transfer to FILE ('-' for stdout)",
+    )
+    return parser
+
+
+def AddAckOptions(parser):
+    """Add options of the receive scripts for the compact ack mode"""
+    parser.add_argument(
+        "-k", dest="ack_every", type=int, default=None, help="frames per ack"
+    )
+    parser.add_argument(
+        "-t",
+        dest="ack_interval",
+        type=float,
+        default=None,
+        help="maximum time in ms between acks",
+    )
+
+
+def AddCrcOption(parser):
+    """Add option of the file transfer scripts for the CRC32 mode"""
+    parser.add_argument(
+        "--crc",
+        action="store_true",
+        help="check data frames and the whole file with CRC32, instead of "
+        "echoing the data back (negotiated with the board)",
+    )
+
+
+def AddResumeOption(parser):
+    """Add option of the file transfer scripts for resumable transfers"""
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="keep a checkpoint of the transfer next to the file, and resume "
+        "from it after an interruption (negotiated with the board)",
+    )
+
+
+def ParseArgs(parser, argv=None):
+    """
+    Parse command line arguments.
+
+    parser: parser from ArgumentParser
+    argv: list of arguments (default sys.argv[1:])
+    return: parsed arguments, and Link with the link parameters
+    """
+    args = parser.parse_args(argv)
+    if args.payload is None:
+        args.payload = MaxPayload(args.interface)
+    elif args.payload < ETH_MINIMUM_NBYTES:
+        parser.error(f"payload size must be at least {ETH_MINIMUM_NBYTES}")
+    print(f"Using ethernet interface '{args.interface}'.")
+    link = Link(
+        args.rmac,
+        args.interface,
+        timeout=args.timeout,
+        payload=args.payload,
+        rto_min=args.rto_min / 1000,
+        rto_max=args.rto_max / 1000,
+        adaptive=not args.fixed_timeout,
+    )
+    return args, link
+
+
+def RequestedMode(args, flags, always=0):
+    """
+    Get transfer mode to request from the board.
+
+    args: parsed arguments
+    flags: mode flags to request if a window was given
+    always: mode flags to request in any case (e.g. MODE_STREAM)
+    return: TransferMode (only the always flags, and no window, for no
+            window, no CRC32 or resume mode)
+    """
+    if getattr(args, "crc", False):
+        flags |= MODE_SEQ | MODE_CRC
+    if getattr(args, "resume", False):
+        flags |= MODE_SEQ | MODE_RESUME
+    if args.window > 1 or flags & (MODE_CRC | MODE_RESUME):
+        return TransferMode(flags | always, args.window, args.payload)
+    return TransferMode(always, 1, args.payload)
@@ -0,0 +1,318 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethDaemon.py
+
+Long-lived transfer daemon. Owns the socket and the link with the board, and
+runs transfer jobs received over a local control socket back to back, so
+each file costs only its sync and data frames.
+
+Jobs are JSON objects, one per line:
+    {"op": "send_file", "file": "/path/input.bin"}
+    {"op": "send_variable", "file": "/path/input.bin"}
+    {"op": "recv_file", "file": "/path/output.bin", "size": 1024}
+    {"op": "recv_variable", "file": "/path/output.bin"}
+Optional fields: "id" (copied to the reply), "window", "mmap", "timeout"
+(seconds without frames from the board before the job fails). The daemon
+replies with one line per job when it is done, with the summary of the
+transfer (see ethStats.py), e.g.
+    {"id": 3, "status": "ok", "errors": 0, "mode": [1, 32, 1500], "stats": {...}}
+    {"status": "error", "message": "..."}
+A {"op": "status"} request replies immediately with the number of queued
+jobs and the last negotiated mode.
+
+Usage:
+    python ethDaemon.py <RMAC> <eth_interface> <timeout> [-w window] [--control path]
+                        [--stats jobs.jsonl] [--job-timeout seconds]
+    echo '{"op": "recv_variable", "file": "/tmp/out.bin"}' | nc -U /tmp/iobEthDaemon
+"""
+
+from ethAsync import AsyncEthLink
+from ethBase import CreateSocket, ACK_INTERVAL
+from ethCli import ArgumentParser, ParseArgs
+import asyncio
+import json
+import os
+import signal
+import socket
+
+# Default path of the control socket
+CONTROL_SOCKET = "/tmp/iobEthDaemon"
+
+# Default job timeout, in link timeouts without frames from the board
+JOB_TIMEOUTS = 20
+
+# Job operations and their required fields
+JOB_FIELDS = {
+    "send_file": ("file",),
+    "send_variable": ("file",),
+    "recv_file": ("file", "size"),
+    "recv_variable": ("file",),
+}
+
+# Types of the job fields
+FIELD_TYPES = {
+    "file": str,
+    "size": int,
+    "window": int,
+    "mmap": bool,
+    "timeout": (int, float),
+}
+
+
+def CheckJob(job):
+    """
+    Check that job has a known operation and its fields.
+
+    job: job dict
+    return: nothing, raises ValueError if job is not valid
+    """
+    if not isinstance(job, dict):
+        raise ValueError("job must be a JSON object")
+    op = job.get("op")
+    if op != "status" and op not in JOB_FIELDS:
+        raise ValueError(f"unknown op '{op}'")
+    for field in JOB_FIELDS.get(op, ()):
+        if field not in job:
+            raise ValueError(f"op '{op}' requires field '{field}'")
+    for field, types in FIELD_TYPES.items():
+        if field not in job:
+            continue
+        value = job[field]
+        # bool is an int, but not a valid number here
+        if not isinstance(value, types) or (
+            types is not bool and isinstance(value, bool)
+        ):
+            raise ValueError(f"field '{field}' has the wrong type")
+    if job.get("size", 0) < 0:
+        raise ValueError("field 'size' must not be negative")
+    if job.get("window", 1) < 1 or job.get("timeout", 1) <= 0:
+        raise ValueError("fields 'window' and 'timeout' must be positive")
+
+
+class TransferDaemon:
+    """Runs queued transfer jobs over one link with the board"""
+
+    def __init__(
+        self,
+        eth_socket,
+        control_path=CONTROL_SOCKET,
+        window=1,
+        use_mmap=False,
+        ack_interval=ACK_INTERVAL,
+        stats_path=None,
+        job_timeout=None,
+    ):
+        """
+        eth_socket: socket for communication from CreateSocket
+        control_path: path of the control socket
+        window: default maximum number of frames in flight
+        use_mmap: access files through memory mappings by default
+        ack_interval: maximum time in seconds between acks
+        stats_path: path of file to append the reply of each job to ('-' for
+                    stdout), or None
+        job_timeout: default time in seconds without frames from the board
+                     before a job fails (default: JOB_TIMEOUTS link timeouts)
+        """
+        self.eth_socket = eth_socket
+        self.control_path = control_path
+        self.window = window
+        self.use_mmap = use_mmap
+        self.ack_interval = ack_interval
+        self.stats_path = stats_path
+        if job_timeout is None:
+            job_timeout = JOB_TIMEOUTS * eth_socket.link.timeout
+        self.job_timeout = job_timeout
+        self.link = None
+        self.jobs = None
+
+    async def Serve(self):
+        """Accept jobs and run them, until cancelled (or SIGTERM)"""
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, asyncio.current_task().cancel
+        )
+        self.link = AsyncEthLink(self.eth_socket)
+        self.jobs = asyncio.Queue()
+
+        # Remove control socket left by a previous daemon
+        if os.path.exists(self.control_path):
+            os.unlink(self.control_path)
+        server = await asyncio.start_unix_server(self._OnClient, self.control_path)
+        worker = asyncio.create_task(self._Worker())
+        print(f"Waiting for jobs in '{self.control_path}'.")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            worker.cancel()
+            self.link.close()
+            os.unlink(self.control_path)
+
+    async def _OnClient(self, reader, writer):
+        """Queue jobs from client, replying to each one when done"""
+        replies = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            replies.append(asyncio.create_task(self._Reply(line, writer)))
+        # Keep the connection until all jobs are replied
+        await asyncio.gather(*replies)
+        writer.close()
+
+    async def _Reply(self, line, writer):
+        job = None
+        try:
+            job = json.loads(line)
+            CheckJob(job)
+        except ValueError as error:
+            result = {"status": "error", "message": str(error)}
+        else:
+            if job["op"] == "status":
+                result = {
+                    "status": "ok",
+                    "queued": self.jobs.qsize(),
+                    "mode": list(self.link.mode),
+                }
+            else:
+                done = asyncio.get_running_loop().create_future()
+                await self.jobs.put((job, done))
+                result = await done
+        if isinstance(job, dict) and "id" in job:
+            result["id"] = job["id"]
+        writer.write(json.dumps(result).encode() + b"\n")
+        await writer.drain()
+
+    async def _Worker(self):
+        """Run queued jobs, one at a time"""
+        while True:
+            job, done = await self.jobs.get()
+            # Reply even if the daemon stops during the job
+            result = {"status": "error", "message": "daemon stopped"}
+            try:
+                try:
+                    result = await self._RunWithTimeout(job)
+                    result["status"] = "ok"
+                except Exception as error:
+                    # Any failure ends only this job, the next ones still run
+                    message = str(error) or repr(error)
+                    result = {"status": "error", "message": message}
+                result["mode"] = list(self.link.mode)
+                result["stats"] = self.link.stats.Summary()
+                if self.stats_path is not None:
+                    self._Record(job, result)
+            finally:
+                if not done.done():
+                    done.set_result(result)
+
+    def _Record(self, job, result):
+        """Append job and its result to the stats file ('-' for stdout)"""
+        line = json.dumps({"job": job, **result})
+        if self.stats_path == "-":
+            print(line)
+            return
+        try:
+            with open(self.stats_path, "a") as f:
+                f.write(line + "\n")
+        except OSError as error:
+            # Not recording a job does not fail it, nor the next ones
+            print(f"Error, job not recorded in '{self.stats_path}': {error}")
+
+    async def _RunWithTimeout(self, job):
+        """
+        Run job, cancelling it if no frame arrives from the board for the job
+        timeout (e.g. the board is not running its side of the transfer).
+
+        job: job dict
+        return: result dict
+        """
+        timeout = job.get("timeout", self.job_timeout)
+        task = asyncio.create_task(self._Run(job))
+        received = None
+        try:
+            while True:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(task), timeout)
+                except asyncio.TimeoutError:
+                    # Stats start over at each sync, so any change is progress
+                    count = self.link.stats.frames_received
+                    if count == received:
+                        raise TimeoutError(
+                            f"no frames from the board for {timeout} seconds"
+                        )
+                    received = count
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    async def _Run(self, job):
+        window = job.get("window", self.window)
+        use_mmap = job.get("mmap", self.use_mmap)
+        op = job["op"]
+        if op == "send_file":
+            errors = await self.link.send_file(job["file"], window, use_mmap)
+            return {"errors": errors}
+        if op == "send_variable":
+            errors = await self.link.send_variable(job["file"], window, use_mmap)
+            return {"errors": errors}
+        if op == "recv_file":
+            count_bytes = await self.link.recv_file(
+                job["file"],
+                job["size"],
+                window,
+                ack_interval=self.ack_interval,
+                use_mmap=use_mmap,
+            )
+            return {"bytes": count_bytes}
+        count_bytes = await self.link.recv_variable(
+            job["file"], window, ack_interval=self.ack_interval, use_mmap=use_mmap
+        )
+        return {"bytes": count_bytes}
+
+
+def SubmitJob(job, control_path=CONTROL_SOCKET):
+    """
+    Send job to the daemon and wait for its reply.
+
+    job: job dict (relative file paths are made absolute)
+    control_path: path of the control socket
+    return: reply dict
+    """
+    job = dict(job)
+    if "file" in job:
+        job["file"] = os.path.abspath(job["file"])
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(control_path)
+        s.sendall(json.dumps(job).encode() + b"\n")
+        s.shutdown(socket.SHUT_WR)
+        with s.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser("Run transfer jobs received over a control socket.")
+    parser.add_argument(
+        "--control", default=CONTROL_SOCKET, help="path of the control socket"
+    )
+    parser.add_argument(
+        "--job-timeout",
+        type=float,
+        help="seconds without frames from the board before a job fails "
+        "(default: %d times the timeout)" % JOB_TIMEOUTS,
+    )
+    args, link = ParseArgs(parser)
+
+    daemon = TransferDaemon(
+        CreateSocket(link, args.rx_ring, args.pcap),
+        args.control,
+        args.window,
+        args.mmap,
+        stats_path=args.stats,
+        job_timeout=args.job_timeout,
+    )
+    try:
+        asyncio.run(daemon.Serve())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
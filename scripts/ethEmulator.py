@@ -0,0 +1,806 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethEmulator.py
+
+Board side of the file transfer protocol of the firmware drivers
+(eth_rcv_file, eth_send_file, eth_rcv_variable_file, eth_send_variable_file
+in iob_eth.c), in Python. Stands in for the board over the PC emulation
+socket or a (virtual) ethernet interface, to test and tune host tools
+without a firmware build. Link impairments can be emulated: delay of the
+frames sent, random loss of frames in both directions and processing time
+per received frame.
+
+Like the firmware, stop-and-wait (legacy mode) transfers do not recover from
+lost frames; use a window for lossy links. The firmware also stops echoing
+frames once it has received a whole file, so the host stalls if the last
+echoes are lost; the emulator can linger to repeat them instead.
+
+Received files stay in the emulated board memory, also across host
+connections in PC emulation, so interrupted transfers can be resumed
+(MODE_RESUME).
+
+Usage:
+    python ethEmulator.py <RMAC> [-i interface] [options] op [op ...]
+ops, run in order (for each host connection in PC emulation):
+    rcv_file:<size>:<output_file>    send_file:<input_file>
+    rcv_variable:<output_file>       send_variable:<input_file>
+                                     send_stream:<input_file>
+With no interface, serves the PC emulation socket (/tmp/tmpLocalSocket).
+"""
+
+from ethBase import (
+    CreateRawSocket,
+    FormResume,
+    FormSize,
+    FormSync,
+    FrameBuilder,
+    Link,
+    LinkSocket,
+    ParseResume,
+    ParseSize,
+    ParseSync,
+    TransferMode,
+    CheckData,
+    DataPrefixSize,
+    FormVerdict,
+    ACK_FRAME,
+    ACK_SACK_BITS,
+    CRC_HEADER,
+    DEFAULT_DST_ADDR,
+    DEFAULT_TIMEOUT,
+    ETH_HEADER_LEN,
+    ETH_MINIMUM_NBYTES,
+    LEGACY_MODE,
+    MODE_ACK,
+    MODE_CRC,
+    MODE_RESUME,
+    MODE_SEQ,
+    MODE_STREAM,
+    SEQ_HEADER,
+    SIZE_MAGIC,
+    SIZE_MORE,
+    SYNC_FROM_BOARD,
+    SYNC_FROM_HOST,
+    VERDICT_FRAME,
+    VERDICT_OK,
+    addr,
+)
+from ethMmsg import FRAME_BUFFER_SIZE
+from ethVerify import CountMismatches
+from socket import AF_UNIX, SOCK_SEQPACKET, socket
+import argparse
+import os
+import queue
+import random
+import select
+import threading
+import time
+import zlib
+
+# Transfer modes supported by the firmware (ETH_MODE_SUPPORTED), maximum
+# window it offers (ETH_SYNC_WINDOW_MAX) and largest payload that fits its
+# frame buffer (ETH_MAX_NBYTES with BUFFER_W = 11)
+BOARD_MODE_SUPPORTED = MODE_SEQ | MODE_ACK | MODE_CRC | MODE_RESUME | MODE_STREAM
+BOARD_WINDOW_MAX = 32
+BOARD_MAX_PAYLOAD = 2022
+# Segment size of streams of unknown length sent by the board (send_stream)
+BOARD_STREAM_SEGMENT = 64 << 10
+
+# Board operations and the type of their argument
+BOARD_OPS = {
+    "rcv_file": "size",
+    "rcv_variable": None,
+    "send_file": "data",
+    "send_variable": "data",
+    "send_stream": "data",
+}
+
+
+class BoardEmulator:
+    """
+    Board side of the file transfer protocol over a LinkSocket, whose link has
+    the board MAC address as source and the host MAC address as destination.
+    """
+
+    def __init__(
+        self,
+        socket,
+        max_payload=BOARD_MAX_PAYLOAD,
+        delay=0.0,
+        loss=0.0,
+        processing=0.0,
+        seed=None,
+        linger=0.0,
+    ):
+        """
+        socket: LinkSocket (link timeout is the board receive timeout)
+        max_payload: largest payload size to accept
+        delay: time in seconds each sent frame takes to reach the host
+        loss: probability of losing each frame, sent or received
+        processing: time in seconds to process each received frame
+        seed: seed of the frame loss generator (None for random)
+        linger: after receiving a file, keep echoing its frames until the
+            host is quiet for this time in seconds (the firmware does not)
+        """
+        self.socket = socket
+        self.max_payload = max_payload
+        self.delay = delay
+        self.loss = loss
+        self.processing = processing
+        self.random = random.Random(seed)
+        self.linger = linger
+        self.mode = LEGACY_MODE
+        # Data memory files are received into, kept between transfers (e.g.
+        # to resume them), and reply to the last resume request
+        self.memory = bytearray()
+        self.resume_reply = None
+        # Optional object with Sent(seq) and Acked(seq) methods, called for
+        # the data frames sent by the board (e.g. to measure round trip times)
+        self.meter = None
+
+        # Frames are sent after the delay by another thread, in order
+        self.delayed = None
+        if delay > 0:
+            self.delayed = queue.Queue()
+            self.sender = threading.Thread(target=self._Sender, daemon=True)
+            self.sender.start()
+
+    def close(self):
+        """Send the delayed frames still queued and close the socket"""
+        if self.delayed is not None:
+            self.delayed.put(None)
+            self.sender.join()
+        self.socket.close()
+
+    def _Sender(self):
+        while True:
+            item = self.delayed.get()
+            if item is None:
+                return
+            due, packet = item
+            time.sleep(max(due - time.monotonic(), 0))
+            try:
+                self.socket.send(packet)
+            except OSError:
+                return
+
+    def _Lost(self):
+        return self.loss > 0 and self.random.random() < self.loss
+
+    def _SendPackets(self, packets):
+        for packet in packets:
+            if self._Lost():
+                continue
+            if self.delayed is not None:
+                self.delayed.put((time.monotonic() + self.delay, bytes(packet)))
+            else:
+                self.socket.send(packet)
+
+    def _Send(self, payload):
+        self._SendPackets([self.socket.link.FormPacket(payload)])
+
+    def _RecvMany(self, max_n, timeout=None):
+        """
+        Receive up to max_n payloads addressed to the board. Waits for the
+        first one, then takes only the frames already queued.
+
+        max_n: maximum number of payloads
+        timeout: maximum time in seconds to wait (None waits forever)
+        return: list of payloads (empty on timeout)
+        """
+        src_addr = self.socket.link.src_addr
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = (
+                None if deadline is None else max(deadline - time.monotonic(), 0)
+            )
+            if not select.select([self.socket], [], [], remaining)[0]:
+                return []
+            payloads = []
+            while len(payloads) < max_n:
+                frame = self.socket.recv(FRAME_BUFFER_SIZE)
+                if not frame:
+                    raise ConnectionResetError("host disconnected")
+                if frame[0:6] == src_addr and not self._Lost():
+                    payloads.append(frame[ETH_HEADER_LEN:])
+                if not select.select([self.socket], [], [], 0)[0]:
+                    break
+            if payloads:
+                if self.processing > 0:
+                    time.sleep(self.processing * len(payloads))
+                return payloads
+
+    def _Recv(self, timeout=None):
+        """Receive one payload, None on timeout (None waits forever)"""
+        payloads = self._RecvMany(1, timeout)
+        return payloads[0] if payloads else None
+
+    def _Accept(self, offered, window_max):
+        """Get transfer mode from host sync frame (None for legacy hosts)"""
+        if offered is None:
+            return LEGACY_MODE
+        return TransferMode(
+            offered.flags & BOARD_MODE_SUPPORTED,
+            min(offered.window, window_max),
+            max(min(offered.payload, self.max_payload), ETH_MINIMUM_NBYTES),
+        )
+
+    def SyncAckFirst(self, need_sync=False):
+        """
+        Offer supported modes until the host replies.
+
+        need_sync: only accept a host sync frame, or the empty ack of hosts
+                   without mode negotiation, skipping late frames of the
+                   previous transfer
+        """
+        offer = TransferMode(BOARD_MODE_SUPPORTED, BOARD_WINDOW_MAX, self.max_payload)
+        while True:
+            self._Send(FormSync(offer, SYNC_FROM_BOARD))
+            payload = self._Recv(self.socket.link.timeout)
+            # Any frame is the ack, except resume requests sent after a sync
+            # reply that was lost
+            if payload is None or ParseResume(payload, SYNC_FROM_HOST) is not None:
+                continue
+            if (
+                not need_sync
+                or ParseSync(payload, SYNC_FROM_HOST) is not None
+                or not any(payload[:ETH_MINIMUM_NBYTES])
+            ):
+                break
+        self.mode = self._Accept(ParseSync(payload, SYNC_FROM_HOST), BOARD_WINDOW_MAX)
+
+    def SyncAckLast(self, need_sync=False):
+        """
+        Wait for host sync and reply to it.
+
+        need_sync: only accept a host sync frame, skipping late frames of the
+                   previous transfer
+        """
+        payload = self._Recv()
+        while need_sync and ParseSync(payload, SYNC_FROM_HOST) is None:
+            payload = self._Recv()
+        offered = ParseSync(payload, SYNC_FROM_HOST)
+        self.mode = self._Accept(offered, 0xFFFF)
+        if offered is not None:
+            payload = FormSync(self.mode, SYNC_FROM_BOARD)
+        self._Send(payload)
+
+    def RcvFile(self, size):
+        """
+        Receive file of known size (eth_rcv_file).
+
+        size: file size in bytes
+        return: received data (bytearray)
+        """
+        self.SyncAckLast()
+        return self._RcvData(size)
+
+    def _RcvSize(self):
+        """
+        Receive size frame, skipping repeated sync frames (and late frames of
+        the previous transfer with MODE_STREAM), and echo it.
+
+        return: (size, flags) tuple
+        """
+        while True:
+            payload = self._Recv()
+            if ParseSync(payload, SYNC_FROM_HOST) is not None:
+                continue
+            if (
+                not self.mode.flags & MODE_STREAM
+                or bytes(payload[: len(SIZE_MAGIC)]) == SIZE_MAGIC
+            ):
+                break
+        self._Send(payload)
+        return ParseSize(payload, self.mode)
+
+    def RcvVariableFile(self):
+        """
+        Receive file size, then file (eth_rcv_variable_file). Streams of
+        unknown length (MODE_STREAM) are received segment by segment.
+
+        return: received data (bytearray)
+        """
+        self.SyncAckLast()
+        size, flags = self._RcvSize()
+        if not flags & SIZE_MORE:
+            return self._RcvData(size)
+
+        data = bytearray()
+        while flags & SIZE_MORE:
+            data += self._RcvData(size)
+            self.SyncAckLast(True)
+            size, flags = self._RcvSize()
+        if size:
+            data += self._RcvData(size)
+        return data
+
+    def SendFile(self, data):
+        """
+        Send file of size known by the host (eth_send_file).
+
+        data: bytes-like file data
+        return: difference count between sent and echoed data
+        """
+        self.SyncAckFirst()
+        return self._SendData(data)
+
+    def SendVariableFile(self, data, flags=0, need_sync=False):
+        """
+        Send file size, then file (eth_send_variable_file).
+
+        data: bytes-like file data
+        flags: SIZE_MORE for segments of a stream (eth_send_stream)
+        need_sync: see SyncAckFirst (segments of a stream)
+        return: difference count between sent and echoed data
+        """
+        self.SyncAckFirst(need_sync)
+        # Send size and wait for its echo
+        self._Send(FormSize(self.mode, len(data), flags))
+        self._Recv()
+        if not data:
+            return 0
+        return self._SendData(data)
+
+    def SendStream(self, data):
+        """
+        Send data as a stream of unknown length (MODE_STREAM), in segments of
+        BOARD_STREAM_SEGMENT bytes (eth_send_stream), then the end-of-stream
+        frame (eth_end_stream).
+
+        data: bytes-like data
+        return: difference count between sent and echoed data
+        """
+        view = memoryview(data)
+        errors = 0
+        for offset in range(0, len(view), BOARD_STREAM_SEGMENT):
+            segment = view[offset : offset + BOARD_STREAM_SEGMENT]
+            errors += self.SendVariableFile(segment, SIZE_MORE, True)
+        self.SendVariableFile(b"", 0, True)
+        return errors
+
+    def Run(self, op, arg=None):
+        """
+        Run board operation.
+
+        op: key of BOARD_OPS
+        arg: file size (rcv_file) or data to send (send_file, send_variable,
+             send_stream)
+        return: received data, or difference count of sent data
+        """
+        if op == "rcv_file":
+            return self.RcvFile(arg)
+        if op == "rcv_variable":
+            return self.RcvVariableFile()
+        if op == "send_file":
+            return self.SendFile(arg)
+        if op == "send_variable":
+            return self.SendVariableFile(arg)
+        if op == "send_stream":
+            return self.SendStream(arg)
+        raise ValueError(f"unknown board operation '{op}'")
+
+    def Idle(self):
+        """Drop frames, like an idle board, until the host disconnects"""
+        self.socket.settimeout(None)
+        while self.socket.recv(FRAME_BUFFER_SIZE):
+            pass
+
+    def _Resume(self, data, repeat_sync):
+        """
+        Wait for the host resume request (MODE_RESUME) and reply with the
+        offset to resume at: the requested one if the data before it matches
+        the host CRC32, 0 otherwise.
+
+        data: bytes-like data of the transfer (received before, or to send)
+        repeat_sync: repeat the sync reply if the host sends its sync again
+        return: offset to resume at
+        """
+        while True:
+            payload = self._Recv()
+            request = ParseResume(payload, SYNC_FROM_HOST)
+            if request is not None:
+                break
+            if repeat_sync and ParseSync(payload, SYNC_FROM_HOST) is not None:
+                self._Send(FormSync(self.mode, SYNC_FROM_BOARD))
+        offset, crc = request
+        if offset >= len(data) or zlib.crc32(memoryview(data)[:offset]) != crc:
+            offset = 0
+        self.resume_reply = FormResume(
+            offset, zlib.crc32(memoryview(data)[:offset]), SYNC_FROM_BOARD
+        )
+        self._Send(self.resume_reply)
+        return offset
+
+    def _RcvData(self, size):
+        """
+        Receive size bytes into memory, echoing each frame (or sending its
+        verdict, then checking the digest, with MODE_CRC). With MODE_RESUME,
+        data before the resume offset is kept from the previous transfer.
+        """
+        if len(self.memory) != size:
+            self.memory = bytearray(size)
+        received = self.memory
+        if not self.mode.flags & MODE_SEQ:
+            count_bytes = 0
+            while count_bytes < size:
+                payload = self._Recv()
+                self._Send(payload)
+                payload = payload[: size - count_bytes]
+                received[count_bytes : count_bytes + len(payload)] = payload
+                count_bytes += len(payload)
+            return received
+
+        # Received data after the resume offset
+        view = memoryview(received)
+        self.resume_reply = None
+        if self.mode.flags & MODE_RESUME:
+            view = view[self._Resume(received, True) :]
+            size = len(view)
+
+        check = self.mode.flags & MODE_CRC
+        prefix_size = DataPrefixSize(self.mode)
+        chunk_size = self.mode.payload - prefix_size
+        num_frames = ((size - 1) // chunk_size) + 1
+        done = bytearray(num_frames)
+        count_frames = 0
+        digest_ok = None
+
+        def Reply(payload, ok=True):
+            (seq,) = SEQ_HEADER.unpack_from(payload)
+            if not check:
+                length = min(chunk_size, size - seq * chunk_size)
+                return payload[: SEQ_HEADER.size + length]
+            return FormVerdict(seq, ok if seq < num_frames else digest_ok)
+
+        while count_frames < num_frames or (check and digest_ok is None):
+            payload = self._Recv()
+            # Repeat sync reply if the host did not get it
+            if ParseSync(payload, SYNC_FROM_HOST) is not None:
+                self._Send(FormSync(self.mode, SYNC_FROM_BOARD))
+                continue
+            # Repeat resume reply if the host did not get it
+            if self.resume_reply is not None and ParseResume(payload, SYNC_FROM_HOST):
+                self._Send(self.resume_reply)
+                continue
+            (seq,) = SEQ_HEADER.unpack_from(payload)
+            # Digest, sent once all data frames are acknowledged
+            if check and seq == num_frames and count_frames == num_frames:
+                (digest,) = CRC_HEADER.unpack_from(payload, SEQ_HEADER.size)
+                digest_ok = zlib.crc32(view) == digest
+                self._Send(Reply(payload))
+                continue
+            if seq >= num_frames:
+                continue
+            start = seq * chunk_size
+            length = min(chunk_size, size - start)
+            ok = True
+            if not done[seq]:
+                if check:
+                    ok = CheckData(payload, length)
+                if ok:
+                    view[start : start + length] = payload[
+                        prefix_size : prefix_size + length
+                    ]
+                    done[seq] = 1
+                    count_frames += 1
+            self._Send(Reply(payload, ok))
+
+        # Repeat echoes the host did not get, until it goes quiet or starts
+        # the next transfer
+        while self.linger > 0:
+            try:
+                payloads = self._RecvMany(self.mode.window, self.linger)
+            except ConnectionResetError:
+                break
+            if not payloads or any(
+                ParseSync(payload, SYNC_FROM_HOST) is not None for payload in payloads
+            ):
+                break
+            for payload in payloads:
+                (seq,) = SEQ_HEADER.unpack_from(payload)
+                if seq < num_frames or check and seq == num_frames:
+                    self._Send(Reply(payload))
+        return received
+
+    def _SendData(self, data):
+        """
+        Send data (after the resume offset, with MODE_RESUME), return
+        difference count with the echoed data (with MODE_CRC, 1 if the host
+        file does not match the digest)
+        """
+        view = memoryview(data)
+        errors = 0
+        if not self.mode.flags & MODE_SEQ:
+            for start in range(0, len(data), self.mode.payload):
+                chunk = view[start : start + self.mode.payload]
+                if self.meter is not None:
+                    self.meter.Sent(0)
+                self._Send(chunk)
+                # Like the firmware, wait for the echo without resending
+                payload = self._Recv()
+                if self.meter is not None:
+                    self.meter.Acked(0)
+                errors += CountMismatches(chunk, payload)
+            return errors
+
+        # Data after the resume offset
+        self.resume_reply = None
+        if self.mode.flags & MODE_RESUME:
+            view = view[self._Resume(data, False) :]
+
+        check = self.mode.flags & MODE_CRC
+        compact = self.mode.flags & MODE_ACK and not check
+        prefix_size = DataPrefixSize(self.mode)
+        chunk_size = self.mode.payload - prefix_size
+        num_frames = ((len(view) - 1) // chunk_size) + 1
+        # The digest frame follows the data frames (MODE_CRC)
+        total_frames = num_frames + 1 if check else num_frames
+        acked = bytearray(total_frames)
+        builders = {}
+        base = 0
+        next_seq = 0
+
+        def Frame(seq):
+            builder = builders.get(seq)
+            if builder is None:
+                builder = FrameBuilder(self.socket.link.header, prefix_size, chunk_size)
+                SEQ_HEADER.pack_into(builder.Prefix(), 0, seq)
+                # The digest frame has no data
+                builder.Write(view[seq * chunk_size : (seq + 1) * chunk_size])
+                if check:
+                    # CRC32 of the frame data, or of all data in the digest
+                    crc = zlib.crc32(builder.Payload() if seq < num_frames else view)
+                    CRC_HEADER.pack_into(builder.Prefix(), SEQ_HEADER.size, crc)
+                builders[seq] = builder
+            if self.meter is not None:
+                self.meter.Sent(seq)
+            return builder.frame
+
+        while base < total_frames:
+            # Send frames until window is full, and the digest once the host
+            # has all data
+            frames = []
+            while next_seq < num_frames and next_seq < base + self.mode.window:
+                frames.append(Frame(next_seq))
+                next_seq += 1
+            if next_seq == base == num_frames < total_frames:
+                frames.append(Frame(next_seq))
+                next_seq += 1
+            self._SendPackets(frames)
+
+            # Wait for acks, resend frames not yet acknowledged on timeout
+            payloads = self._RecvMany(self.mode.window, self.socket.link.timeout)
+            if not payloads:
+                self._SendPackets(
+                    [Frame(seq) for seq in range(base, next_seq) if not acked[seq]]
+                )
+                continue
+
+            progress = False
+            for payload in payloads:
+                # Repeat resume reply if the host did not get it
+                if self.resume_reply is not None and ParseResume(
+                    payload, SYNC_FROM_HOST
+                ):
+                    self._Send(self.resume_reply)
+                    continue
+                if compact:
+                    cum_ack, sack = ACK_FRAME.unpack_from(payload)
+                    # Ignore frames that are not acks for this transfer
+                    if cum_ack > next_seq:
+                        continue
+                    newly = [seq for seq in range(base, cum_ack) if not acked[seq]]
+                    newly += [
+                        cum_ack + 1 + i
+                        for i in range(ACK_SACK_BITS)
+                        if (sack >> i) & 1
+                        and cum_ack + 1 + i < next_seq
+                        and not acked[cum_ack + 1 + i]
+                    ]
+                elif check:
+                    # Verdict: ignore frames from other transfers
+                    seq, verdict = VERDICT_FRAME.unpack_from(payload)
+                    if seq >= next_seq or acked[seq]:
+                        continue
+                    if verdict != VERDICT_OK:
+                        # Data corrupted on the way: resend it at once
+                        if seq < num_frames:
+                            self._SendPackets([Frame(seq)])
+                            continue
+                        errors += 1
+                    newly = [seq]
+                else:
+                    # Frame echo: ignore frames from other transfers
+                    (seq,) = SEQ_HEADER.unpack_from(payload)
+                    if seq >= next_seq or acked[seq]:
+                        continue
+                    length = min(chunk_size, len(view) - seq * chunk_size)
+                    errors += CountMismatches(
+                        view[seq * chunk_size : seq * chunk_size + length],
+                        payload[SEQ_HEADER.size : SEQ_HEADER.size + length],
+                    )
+                    newly = [seq]
+                for seq in newly:
+                    acked[seq] = 1
+                    builders.pop(seq, None)
+                    if self.meter is not None:
+                        self.meter.Acked(seq)
+                    progress = True
+
+            # Acks that acknowledge nothing new are repeated by the receiver
+            # when it stops getting frames: resend without waiting for the
+            # timeout, which the repeated acks would keep from expiring
+            if compact and not progress:
+                self._SendPackets(
+                    [Frame(seq) for seq in range(base, next_seq) if not acked[seq]]
+                )
+
+            # Slide window over acknowledged frames
+            while base < total_frames and acked[base]:
+                base += 1
+
+        return errors
+
+
+def ListenUnix(path=addr):
+    """
+    Listen for hosts in PC emulation.
+
+    path: path of the local socket (CreateSocket connects to ethBase.addr)
+    return: listening socket
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket(AF_UNIX, SOCK_SEQPACKET)
+    server.bind(path)
+    server.listen()
+    return server
+
+
+def AcceptUnix(server, link):
+    """
+    Wait for a host to connect.
+
+    server: listening socket from ListenUnix
+    link: Link of the board (board MAC address as source)
+    return: LinkSocket connected to the host
+    """
+    connection, _ = server.accept()
+    s = LinkSocket(fileno=connection.detach())
+    s.link = link
+    return s
+
+
+def _Program(ops):
+    """Parse command line ops into (op, argument, file) tuples"""
+    program = []
+    for op in ops:
+        name, *fields = op.split(":")
+        if name not in BOARD_OPS or len(fields) != (2 if name == "rcv_file" else 1):
+            raise ValueError(f"invalid operation '{op}'")
+        if name == "rcv_file":
+            program.append((name, int(fields[0]), fields[1]))
+        else:
+            program.append((name, None, fields[0]))
+    return program
+
+
+def RunProgram(emulator, program):
+    """
+    Run board operations, saving received files.
+
+    emulator: BoardEmulator
+    program: list of (op, file size or None, file name) tuples
+    return: nothing
+    """
+    for op, size, filename in program:
+        if BOARD_OPS[op] == "data":
+            with open(filename, "rb") as f:
+                errors = emulator.Run(op, f.read())
+            print(f"{op} {filename}: mode {list(emulator.mode)}, {errors} errors")
+        else:
+            data = emulator.Run(op, size)
+            with open(filename, "wb") as f:
+                f.write(data)
+            print(f"{op} {filename}: mode {list(emulator.mode)}, {len(data)} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emulate the board side of transfers.")
+    parser.add_argument("rmac", metavar="RMAC", help="MAC address of the host")
+    parser.add_argument("ops", nargs="+", help="board operations")
+    parser.add_argument(
+        "-i", dest="interface", help="interface (default: PC emulation socket)"
+    )
+    parser.add_argument(
+        "--mac", default=DEFAULT_DST_ADDR.hex(), help="MAC address of the board"
+    )
+    parser.add_argument(
+        "-t",
+        dest="timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="seconds to wait for the host before resending",
+    )
+    parser.add_argument(
+        "-p",
+        dest="payload",
+        type=int,
+        default=BOARD_MAX_PAYLOAD,
+        help="largest payload size to accept",
+    )
+    parser.add_argument(
+        "-d", dest="delay", type=float, default=0, help="frame delay in ms"
+    )
+    parser.add_argument(
+        "-l", dest="loss", type=float, default=0, help="frame loss probability"
+    )
+    parser.add_argument(
+        "-c",
+        dest="processing",
+        type=float,
+        default=0,
+        help="processing time per received frame in us",
+    )
+    parser.add_argument("--seed", type=int, help="seed of the frame loss generator")
+    parser.add_argument(
+        "--linger",
+        type=float,
+        default=0,
+        help="repeat echoes of a received file until the host is quiet for this "
+        "time in ms",
+    )
+    parser.add_argument(
+        "--loop", action="store_true", help="run the operations until interrupted"
+    )
+    args = parser.parse_args()
+    try:
+        program = _Program(args.ops)
+    except ValueError as error:
+        parser.error(str(error))
+
+    link = Link(args.mac, args.interface, dst_addr=args.rmac, timeout=args.timeout)
+    options = dict(
+        max_payload=args.payload,
+        delay=args.delay / 1000,
+        loss=args.loss,
+        processing=args.processing / 1e6,
+        seed=args.seed,
+        linger=args.linger / 1000,
+    )
+
+    if args.interface is not None:
+        emulator = BoardEmulator(CreateRawSocket(link), **options)
+        try:
+            while True:
+                RunProgram(emulator, program)
+                if not args.loop:
+                    break
+        except KeyboardInterrupt:
+            pass
+        emulator.close()
+    else:
+        server = ListenUnix()
+        print(f"Waiting for hosts in '{addr}'.")
+        memory = bytearray()
+        try:
+            while True:
+                emulator = BoardEmulator(AcceptUnix(server, link), **options)
+                emulator.memory = memory
+                try:
+                    RunProgram(emulator, program)
+                    emulator.Idle()
+                except ConnectionResetError:
+                    print("Host disconnected")
+                finally:
+                    emulator.close()
+                    memory = emulator.memory
+                if not args.loop:
+                    break
+        except KeyboardInterrupt:
+            pass
+        server.close()
+        os.unlink(addr)
@@ -0,0 +1,233 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethFile.py
+
+Memory-mapped file source and sink for transfers. The file contents are
+accessed through the page cache directly, instead of being buffered and
+copied through Python file objects.
+
+Also stream source and sink, to transfer data from an iterable of chunks or
+to a callable, without staging it in a file.
+"""
+
+import mmap
+import os
+import zlib
+
+
+class MappedReader:
+    """Read-only mapping of a file, read like a binary file object"""
+
+    def __init__(self, filename):
+        self.file = open(filename, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.map.madvise(mmap.MADV_SEQUENTIAL)
+        self.view = memoryview(self.map)
+        self.size = len(self.map)
+        self.pos = 0
+
+    def seek(self, offset):
+        self.pos = offset
+
+    def readinto(self, buffer):
+        """
+        Copy file data at current position into buffer.
+
+        buffer: writable bytes-like object
+        return: number of bytes copied
+        """
+        n = min(len(buffer), self.size - self.pos)
+        buffer[:n] = self.view[self.pos : self.pos + n]
+        self.pos += n
+        return n
+
+    def read(self, size):
+        data = self.map[self.pos : self.pos + size]
+        self.pos += len(data)
+        return data
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+
+class MappedWriter:
+    """
+    Writable mapping of a file preallocated to its final size, written like a
+    binary file object. Data past the final size (e.g. frame padding) is
+    dropped.
+    """
+
+    def __init__(self, filename, size, keep=False):
+        self.file = _OpenWritable(filename, keep)
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.size = size
+        self.pos = 0
+
+    def seek(self, offset):
+        self.pos = offset
+
+    def read(self, size):
+        data = self.map[self.pos : self.pos + size]
+        self.pos += len(data)
+        return data
+
+    def write(self, data):
+        """
+        Copy data into the file at current position.
+
+        data: bytes-like object
+        return: number of bytes written
+        """
+        n = max(min(len(data), self.size - self.pos), 0)
+        self.map[self.pos : self.pos + n] = data[:n]
+        self.pos += n
+        return n
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+class StreamSource:
+    """
+    Iterable of bytes-like chunks (e.g. a generator, or NumPy arrays), read
+    like a binary file object. Chunks are taken as they are needed.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.chunk = memoryview(b"")
+        self.pos = 0
+
+    def seek(self, offset):
+        if offset != self.pos:
+            raise OSError("Stream source can not seek")
+
+    def readinto(self, buffer):
+        """
+        Copy next stream data into buffer.
+
+        buffer: writable bytes-like object
+        return: number of bytes copied (less than the buffer size once the
+                chunks end)
+        """
+        view = memoryview(buffer).cast("B")
+        count = 0
+        while count < len(view):
+            if not self.chunk:
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    break
+                self.chunk = memoryview(chunk).cast("B")
+                continue
+            n = min(len(view) - count, len(self.chunk))
+            view[count : count + n] = self.chunk[:n]
+            self.chunk = self.chunk[n:]
+            count += n
+        self.pos += count
+        return count
+
+    def close(self):
+        if hasattr(self.chunks, "close"):
+            self.chunks.close()
+
+
+class StreamSink:
+    """
+    Callable taking the received data in order, written like a binary file
+    object. Data written ahead (frames received out of order) is held until
+    the data before it arrives. The callable may block to hold the transfer
+    back: frames are not received nor acknowledged meanwhile.
+    """
+
+    def __init__(self, sink):
+        """
+        sink: callable taking each piece of data (bytes) in order
+        """
+        self.sink = sink
+        self.pos = 0
+        # Bytes passed to the sink, and their CRC32
+        self.done = 0
+        self.crc = 0
+        # Data written ahead: offset -> bytes
+        self.pending = {}
+
+    def seek(self, offset):
+        self.pos = offset
+
+    def write(self, data):
+        """
+        Pass data to the sink, or hold it if it is ahead.
+
+        data: bytes-like object (copied, may be reused after the call)
+        return: number of bytes written
+        """
+        n = len(data)
+        if self.pos == self.done:
+            self._Pass(bytes(data))
+            while self.done in self.pending:
+                self._Pass(self.pending.pop(self.done))
+        elif self.pos > self.done:
+            self.pending[self.pos] = bytes(data)
+        self.pos += n
+        return n
+
+    def _Pass(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.done += len(data)
+        self.sink(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _OpenWritable(filename, keep):
+    """Open file for writing and reading back, keeping its data if keep"""
+    if keep and os.path.exists(filename):
+        return open(filename, "r+b")
+    return open(filename, "w+b")
+
+
+def OpenSource(filename, use_mmap=False):
+    """
+    Open file to send.
+
+    filename: path of file
+    use_mmap: access file through a memory mapping
+    return: binary file object, or MappedReader
+    """
+    if use_mmap:
+        return MappedReader(filename)
+    return open(filename, "rb")
+
+
+def OpenSink(filename, size, use_mmap=False, keep=False):
+    """
+    Open file to receive data into. The data written can be read back (e.g.
+    to check it).
+
+    filename: path of file
+    size: final size of the file
+    use_mmap: preallocate file and access it through a memory mapping
+    keep: keep the data already in the file (e.g. to resume a transfer),
+          instead of emptying it
+    return: binary file object, or MappedWriter
+    """
+    if use_mmap:
+        return MappedWriter(filename, size, keep)
+    f = _OpenWritable(filename, keep)
+    if keep:
+        f.truncate(size)
+    return f
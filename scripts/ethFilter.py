@@ -0,0 +1,77 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethFilter.py
+
+Classic BPF socket filter for raw sockets. Keeps only frames with the given
+EtherType (and destination MAC address), so the kernel drops all other
+interface traffic before it reaches userspace.
+"""
+
+from socket import SOL_SOCKET
+import ctypes
+import struct
+
+SO_ATTACH_FILTER = 26
+
+# BPF instruction opcodes
+BPF_LD_H_ABS = 0x28  # load half word at absolute offset
+BPF_LD_W_ABS = 0x20  # load word at absolute offset
+BPF_JEQ_K = 0x15  # jump if equal to constant
+BPF_RET_K = 0x06  # return constant
+
+# Bytes of the frame to keep when accepted
+BPF_ACCEPT_LEN = 0x40000
+
+# struct sock_filter: code, jump if true, jump if false, constant
+SOCK_FILTER = struct.Struct("=HBBI")
+# struct sock_fprog: number of instructions, pointer to instructions
+SOCK_FPROG = struct.Struct("@HP")
+
+
+def FilterProgram(eth_type, dst_addr=None):
+    """
+    Generate BPF program that accepts frames of given type and destination.
+
+    eth_type: EtherType to accept (int)
+    dst_addr: destination MAC address to accept (bytes), or None for any
+    return: list of (code, jt, jf, k) instructions
+    """
+    checks = [(BPF_LD_H_ABS, 12, eth_type)]
+    if dst_addr is not None:
+        checks.append((BPF_LD_W_ABS, 0, int.from_bytes(dst_addr[0:4], "big")))
+        checks.append((BPF_LD_H_ABS, 4, int.from_bytes(dst_addr[4:6], "big")))
+
+    program = []
+    for i, (load, offset, value) in enumerate(checks):
+        # Jump to the drop instruction (last) if different
+        remaining = len(checks) - i - 1
+        program.append((load, 0, 0, offset))
+        program.append((BPF_JEQ_K, 0, 2 * remaining + 1, value))
+    program.append((BPF_RET_K, 0, 0, BPF_ACCEPT_LEN))
+    program.append((BPF_RET_K, 0, 0, 0))
+
+    return program
+
+
+def AttachFilter(sock, eth_type, dst_addr=None):
+    """
+    Attach BPF filter to raw socket. Should be done before binding the
+    socket, so no unwanted frame gets queued.
+
+    sock: AF_PACKET socket
+    eth_type: EtherType to accept (int)
+    dst_addr: destination MAC address to accept (bytes), or None for any
+    return: nothing
+    """
+    program = FilterProgram(eth_type, dst_addr)
+    instructions = ctypes.create_string_buffer(
+        b"".join(SOCK_FILTER.pack(*instruction) for instruction in program)
+    )
+    # The kernel keeps its own copy of the program
+    sock.setsockopt(
+        SOL_SOCKET,
+        SO_ATTACH_FILTER,
+        SOCK_FPROG.pack(len(program), ctypes.addressof(instructions)),
+    )
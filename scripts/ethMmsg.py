@@ -0,0 +1,166 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethMmsg.py
+
+Batched frame I/O with the Linux sendmmsg/recvmmsg system calls (via ctypes).
+Each call moves many frames between the socket and userspace.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+
+MSG_DONTWAIT = 0x40
+
+# Receive buffer size of each frame (same as recvfrom calls)
+FRAME_BUFFER_SIZE = 4096
+
+
+class iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", msghdr), ("msg_len", ctypes.c_uint)]
+
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    _sendmmsg = _libc.sendmmsg
+    _sendmmsg.argtypes = [
+        ctypes.c_int,
+        ctypes.POINTER(mmsghdr),
+        ctypes.c_uint,
+        ctypes.c_int,
+    ]
+    _sendmmsg.restype = ctypes.c_int
+    _recvmmsg = _libc.recvmmsg
+    _recvmmsg.argtypes = [
+        ctypes.c_int,
+        ctypes.POINTER(mmsghdr),
+        ctypes.c_uint,
+        ctypes.c_int,
+        ctypes.c_void_p,
+    ]
+    _recvmmsg.restype = ctypes.c_int
+except (OSError, AttributeError, TypeError):
+    # Not available in this platform: callers use a send/recv loop instead
+    _sendmmsg = None
+    _recvmmsg = None
+
+
+def MmsgAvailable():
+    """Check if sendmmsg/recvmmsg can be used"""
+    return _sendmmsg is not None and _recvmmsg is not None
+
+
+def _BufferAddress(data, keep):
+    """Get address of bytes-like object data, appending objects to keep alive"""
+    if isinstance(data, bytes):
+        ptr = ctypes.c_char_p(data)
+        keep.append(ptr)
+        return ctypes.cast(ptr, ctypes.c_void_p).value
+    buf = (ctypes.c_char * len(data)).from_buffer(data)
+    keep.append(buf)
+    return ctypes.addressof(buf)
+
+
+def SendMmsg(fd, packets):
+    """
+    Send packets, as many as possible per sendmmsg call.
+
+    fd: socket file descriptor
+    packets: list of bytes-like packets (bytearray/memoryview must be writable)
+    return: nothing
+    """
+    n_packets = len(packets)
+    if n_packets == 0:
+        return
+
+    keep = []
+    iovs = (iovec * n_packets)()
+    msgs = (mmsghdr * n_packets)()
+    for i, packet in enumerate(packets):
+        iovs[i].iov_base = _BufferAddress(packet, keep)
+        iovs[i].iov_len = len(packet)
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovs[i])
+        msgs[i].msg_hdr.msg_iovlen = 1
+
+    sent = 0
+    while sent < n_packets:
+        ret = _sendmmsg(
+            fd,
+            ctypes.cast(
+                ctypes.byref(msgs, sent * ctypes.sizeof(mmsghdr)),
+                ctypes.POINTER(mmsghdr),
+            ),
+            n_packets - sent,
+            0,
+        )
+        if ret < 0:
+            err = ctypes.get_errno()
+            if err == errno.EINTR:
+                continue
+            if err in (errno.EAGAIN, errno.ENOBUFS):
+                # Non-blocking socket: wait for room in the send queue
+                select.select([], [fd], [])
+                continue
+            raise OSError(err, os.strerror(err))
+        sent += ret
+
+
+class MmsgReceiver:
+    """Preallocated buffers to receive up to 'max_n' frames per recvmmsg call"""
+
+    def __init__(self, max_n):
+        self.max_n = max_n
+        self.buffers = ctypes.create_string_buffer(max_n * FRAME_BUFFER_SIZE)
+        self.iovs = (iovec * max_n)()
+        self.msgs = (mmsghdr * max_n)()
+        base = ctypes.addressof(self.buffers)
+        for i in range(max_n):
+            self.iovs[i].iov_base = base + i * FRAME_BUFFER_SIZE
+            self.iovs[i].iov_len = FRAME_BUFFER_SIZE
+            self.msgs[i].msg_hdr.msg_iov = ctypes.pointer(self.iovs[i])
+            self.msgs[i].msg_hdr.msg_iovlen = 1
+
+    def Recv(self, fd):
+        """
+        Receive frames already queued in the socket, without blocking.
+
+        fd: socket file descriptor
+        return: list of received frames (bytes)
+        """
+        while True:
+            ret = _recvmmsg(fd, self.msgs, self.max_n, MSG_DONTWAIT, None)
+            if ret >= 0:
+                break
+            err = ctypes.get_errno()
+            if err == errno.EINTR:
+                continue
+            if err == errno.EAGAIN:
+                return []
+            raise OSError(err, os.strerror(err))
+
+        view = memoryview(self.buffers)
+        frames = []
+        for i in range(ret):
+            start = i * FRAME_BUFFER_SIZE
+            frames.append(bytes(view[start : start + self.msgs[i].msg_len]))
+        return frames
@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethPcap.py
+
+Capture of the frames that cross the link to pcap files, with nanosecond
+timestamps, and reading of captures to replay them. Captures open in
+Wireshark/tcpdump (frame type 0x6000 shows as raw data).
+
+Records go through a large write buffer, so capturing costs one buffered
+write per frame and no system call until the buffer fills. Captures are only
+complete after close().
+"""
+
+import struct
+import time
+
+PCAP_MAGIC_US = 0xA1B2C3D4
+PCAP_MAGIC_NS = 0xA1B23C4D
+PCAPNG_MAGIC = 0x0A0D0D0A
+PCAP_VERSION = (2, 4)
+PCAP_SNAPLEN = 65535
+LINKTYPE_ETHERNET = 1
+
+# Global header: magic, version, timezone, accuracy, snaplen, link type
+PCAP_HEADER = struct.Struct("IHHiIII")
+# Record header: seconds, fraction (ns or us), captured and original length
+PCAP_RECORD = struct.Struct("IIII")
+
+# Default size of the write buffer in bytes
+PCAP_BUFFER = 1 << 20
+
+
+class PcapWriter:
+    """Buffered writer of frames to a pcap file with nanosecond timestamps"""
+
+    def __init__(self, path, buffering=PCAP_BUFFER):
+        """
+        path: path of the capture file (replaced if it exists)
+        buffering: size of the write buffer in bytes
+        """
+        self.file = open(path, "wb", buffering=buffering)
+        self.file.write(
+            PCAP_HEADER.pack(
+                PCAP_MAGIC_NS, *PCAP_VERSION, 0, 0, PCAP_SNAPLEN, LINKTYPE_ETHERNET
+            )
+        )
+
+    def close(self):
+        """Write buffered frames and close file"""
+        self.file.close()
+
+    def Write(self, frame, timestamp=None):
+        """
+        Add frame to capture.
+
+        frame: bytes-like frame, starting with the ethernet header
+        timestamp: time in ns since the epoch (default: now)
+        """
+        if timestamp is None:
+            timestamp = time.time_ns()
+        seconds, nanoseconds = divmod(timestamp, 1000000000)
+        self.file.write(PCAP_RECORD.pack(seconds, nanoseconds, len(frame), len(frame)))
+        self.file.write(frame)
+
+    def WriteFrames(self, frames):
+        """Add frames sent or received together, with the same timestamp"""
+        timestamp = time.time_ns()
+        for frame in frames:
+            self.Write(frame, timestamp)
+
+
+def ReadPcap(path):
+    """
+    Read frames of a pcap file (microsecond or nanosecond timestamps, either
+    byte order). pcapng files must be converted first, e.g. with
+    'editcap -F pcap'.
+
+    path: path of the capture file
+    return: iterator of (timestamp in ns, frame bytes)
+    """
+    with open(path, "rb") as f:
+        header = f.read(PCAP_HEADER.size)
+        if len(header) < PCAP_HEADER.size:
+            raise ValueError(f"'{path}' is not a pcap file")
+        for order in "<>":
+            (magic,) = struct.unpack_from(order + "I", header)
+            if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+                break
+        else:
+            if magic == PCAPNG_MAGIC:
+                raise ValueError(f"'{path}' is a pcapng file, convert it to pcap")
+            raise ValueError(f"'{path}' is not a pcap file")
+        record = struct.Struct(order + PCAP_RECORD.format)
+        unit = 1 if magic == PCAP_MAGIC_NS else 1000
+
+        while True:
+            header = f.read(record.size)
+            if len(header) < record.size:
+                return
+            seconds, fraction, length, _ = record.unpack(header)
+            frame = f.read(length)
+            if len(frame) < length:
+                return
+            yield seconds * 1000000000 + fraction * unit, frame
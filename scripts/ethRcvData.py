@@ -9,68 +9,344 @@ Size of data to be received is known at the start.
 
 # Import libraries
 from ethBase import (
-    PrintBaseUsage,
-    TimedPrintProgress,
     CreateSocket,
-    FormPacket,
+    ParseSync,
+    RecvFrames,
+    ReplySync,
+    RequestResume,
+    SendFrames,
+    SocketStats,
     SyncAckLast,
     RcvAndAck,
-    ETH_NBYTES,
+    CheckData,
+    DataPrefixSize,
+    FormAck,
+    FormVerdict,
+    ACK_INTERVAL,
+    CRC_HEADER,
+    LEGACY_MODE,
+    MODE_ACK,
+    MODE_CRC,
+    MODE_RESUME,
+    MODE_SEQ,
+    SEQ_HEADER,
 )
-from os.path import getsize
-import sys
-import struct
-import time
+from ethCheckpoint import Checkpoint
+from ethCli import (
+    AddAckOptions,
+    AddCrcOption,
+    AddResumeOption,
+    ArgumentParser,
+    ParseArgs,
+    RequestedMode,
+)
+from ethFile import OpenSink, StreamSink
+from ethStats import WriteSummary
+from ethVerify import FileCrc32
 
 
-def RcvFile(socket, output_filename, expected_size):
-    if expected_size == 0:
-        print("Expected size is zero. Check if parameters are correct")
-        return
+def RcvFileWindowed(
+    socket,
+    f_output,
+    expected_size,
+    mode,
+    ack_every,
+    ack_interval,
+    start=0,
+    checkpoint=None,
+):
+    """
+    Receive sequence-numbered frames in any order. With MODE_CRC, check each
+    frame against its CRC32 and send its verdict, then check the file against
+    the digest that follows the data frames. Otherwise, with MODE_ACK, send a
+    compact ack every 'ack_every' frames, or after 'ack_interval' seconds
+    without frames; otherwise echo each frame.
 
-    # Frame parameters
-    num_frames = ((expected_size - 1) // ETH_NBYTES) + 1
-    print("file_size: %d" % expected_size)
-    print("num_frames: %d" % num_frames)
+    socket: socket for communication
+    f_output: output file object (readable, or StreamSink, with MODE_CRC)
+    expected_size: number of bytes to receive
+    mode: negotiated TransferMode
+    ack_every: number of frames per ack (MODE_ACK)
+    ack_interval: maximum time in seconds between acks (MODE_ACK)
+    start: offset in f_output of the data to receive (MODE_RESUME)
+    checkpoint: Checkpoint to update as data is received in order
+                (MODE_RESUME), or None
+    return: number of bytes received
+    """
+    check = mode.flags & MODE_CRC
+    compact = mode.flags & MODE_ACK and not check
+    prefix_size = DataPrefixSize(mode)
+    chunk_size = mode.payload - prefix_size
+    num_frames = ((expected_size - 1) // chunk_size) + 1
+    print("num_frames: %d (window %d)" % (num_frames, mode.window))
+    stats = SocketStats(socket)
+    stats.BeginData(num_frames)
 
-    # Open output file
-    f_output = open(output_filename, "wb")
-
-    # Reset byte counter
+    received = bytearray(num_frames)
+    cum_ack = 0
     count_bytes = 0
+    unacked = 0
+    # Whether the file matches the digest (MODE_CRC), once it arrived
+    digest_ok = None
+
+    def Verdict(payload):
+        # Verdict of frame already received, or of the digest
+        (seq,) = SEQ_HEADER.unpack_from(payload)
+        return FormVerdict(seq, seq < num_frames or digest_ok)
+
+    while cum_ack < num_frames or (check and digest_ok is None):
+        payloads = RecvFrames(socket, mode.window, ack_interval)
+        if not payloads:
+            # Also repeats last ack, in case it was lost. Otherwise the source
+            # resends on its own timeout: waiting is not a timeout here.
+            if compact:
+                stats.Timeout()
+                SendFrames(socket, [FormAck(received, cum_ack)])
+                stats.Retransmit(1)
+                unacked = 0
+            continue
+
+        replies = []
+        previous_bytes = count_bytes
+        for payload in payloads:
+            # Sync frame repeated because our reply was lost
+            if ParseSync(payload) is not None:
+                ReplySync(socket, mode)
+                continue
+            (seq,) = SEQ_HEADER.unpack_from(payload)
+            # Digest, sent once all data frames are acknowledged
+            if check and seq == num_frames and cum_ack == num_frames:
+                if digest_ok is None:
+                    (digest,) = CRC_HEADER.unpack_from(payload, SEQ_HEADER.size)
+                    if isinstance(f_output, StreamSink):
+                        crc = f_output.crc
+                    else:
+                        crc = FileCrc32(f_output, expected_size, start)
+                    digest_ok = crc == digest
+                replies.append(Verdict(payload))
+                continue
+            if seq >= num_frames:
+                continue
+
+            ok = True
+            if not received[seq]:
+                if seq == (num_frames - 1):
+                    bytes_to_receive = expected_size - seq * chunk_size
+                else:
+                    bytes_to_receive = chunk_size
+                if check:
+                    ok = CheckData(payload, bytes_to_receive)
+                if ok:
+                    f_output.seek(start + seq * chunk_size)
+                    f_output.write(
+                        payload[prefix_size : prefix_size + bytes_to_receive]
+                    )
+                    count_bytes += bytes_to_receive
+                    received[seq] = 1
+                    while cum_ack < num_frames and received[cum_ack]:
+                        cum_ack += 1
+
+            unacked += 1
+            replies.append(FormVerdict(seq, ok) if check else payload)
+        stats.Received(len(payloads), count_bytes - previous_bytes)
+
+        if compact:
+            if unacked >= ack_every or cum_ack == num_frames:
+                SendFrames(socket, [FormAck(received, cum_ack)])
+                stats.Sent(1)
+                unacked = 0
+        else:
+            SendFrames(socket, replies)
+            stats.Sent(len(replies))
+        stats.Progress(cum_ack)
+        if checkpoint is not None:
+            checkpoint.Acked(min(cum_ack * chunk_size, expected_size))
+    stats.End()
+    if check and not digest_ok:
+        print("Error, received file does not match the digest")
+
+    # Linger to repeat the final ack if the destination did not get it, until
+    # it goes quiet or starts the next transfer
+    while True:
+        payloads = RecvFrames(socket, mode.window, socket.link.timeout)
+        if not payloads or any(ParseSync(p) is not None for p in payloads):
+            break
+        stats.Received(len(payloads))
+        if compact:
+            SendFrames(socket, [FormAck(received, cum_ack)])
+            stats.Retransmit(1)
+        elif check:
+            SendFrames(socket, [Verdict(payload) for payload in payloads])
+            stats.Retransmit(len(payloads))
+        else:
+            SendFrames(socket, payloads)
+            stats.Retransmit(len(payloads))
+
+    return count_bytes
 
-    # Loop to send input frames
-    for j in range(num_frames):
-        TimedPrintProgress(j, num_frames - 1)
 
-        # receive data
-        payload = RcvAndAck(socket)
+def RcvSink(
+    socket,
+    f_output,
+    expected_size,
+    mode=LEGACY_MODE,
+    ack_every=None,
+    ack_interval=ACK_INTERVAL,
+    checkpoint=None,
+):
+    """
+    Receive data into a file object.
 
-        # Write into file
-        f_output.write(payload)
+    socket: socket for communication
+    f_output: output file object (see RcvFileWindowed)
+    expected_size: number of bytes to receive
+    mode: negotiated TransferMode
+    ack_every: number of frames per ack (MODE_ACK, default half the window)
+    ack_interval: maximum time in seconds between acks (MODE_ACK)
+    checkpoint: Checkpoint of the output file to resume from and update
+                (MODE_RESUME), closed once the transfer ends, or None to
+                resume at the start
+    return: number of bytes received
+    """
+    if mode.flags & MODE_SEQ:
+        start = 0
+        if mode.flags & MODE_RESUME:
+            if checkpoint is None:
+                start = RequestResume(socket, 0, 0, mode)
+            else:
+                start = checkpoint.Resume(
+                    RequestResume(socket, *checkpoint.Load(), mode)
+                )
+        try:
+            count_bytes = start + RcvFileWindowed(
+                socket,
+                f_output,
+                expected_size - start,
+                mode,
+                ack_every or max(mode.window // 2, 1),
+                ack_interval,
+                start,
+                checkpoint,
+            )
+        finally:
+            if checkpoint is not None:
+                checkpoint.Close()
+    else:
+        # Frame parameters
+        num_frames = ((expected_size - 1) // mode.payload) + 1
+        print("file_size: %d" % expected_size)
+        print("num_frames: %d" % num_frames)
 
-        # accumulate sent bytes
-        count_bytes += len(payload)
+        # Reset byte counter
+        count_bytes = 0
+        stats = SocketStats(socket)
+        stats.BeginData(num_frames)
+
+        # Loop to send input frames
+        for j in range(num_frames):
+            # receive data
+            payload = RcvAndAck(socket)
+
+            # Write into file, without the padding of the last frame
+            payload = payload[: expected_size - count_bytes]
+            f_output.write(payload)
+
+            # accumulate sent bytes
+            count_bytes += len(payload)
+            stats.Progress(j + 1)
+
+        stats.End()
 
     if count_bytes != expected_size:
         print(
             "Error, bytes received (%d) is different than expected (%d)"
             % (count_bytes, expected_size)
         )
+    return count_bytes
+
+
+def RcvFile(
+    socket,
+    output_filename,
+    expected_size,
+    mode=LEGACY_MODE,
+    ack_every=None,
+    ack_interval=ACK_INTERVAL,
+    use_mmap=False,
+):
+    if expected_size == 0:
+        print("Expected size is zero. Check if parameters are correct")
+        return
+
+    # Open output file
+    resume = mode.flags & MODE_SEQ and mode.flags & MODE_RESUME
+    f_output = OpenSink(output_filename, expected_size, use_mmap, resume)
+    checkpoint = None
+    if resume:
+        checkpoint = Checkpoint(output_filename, expected_size, f_output)
+    try:
+        RcvSink(
+            socket,
+            f_output,
+            expected_size,
+            mode,
+            ack_every,
+            ack_interval,
+            checkpoint,
+        )
+    finally:
+        # Close file
+        f_output.close()
+
+
+def RcvStream(
+    socket,
+    sink,
+    expected_size,
+    mode=LEGACY_MODE,
+    ack_every=None,
+    ack_interval=ACK_INTERVAL,
+):
+    """
+    Receive data into a callable as it arrives in order (e.g. to write it to
+    a pipe or socket, or decompress it), without staging it in a file. The
+    callable may block to hold the transfer back.
 
-    # Close file
-    f_output.close()
+    socket: socket for communication
+    sink: callable taking each piece of data (bytes) in order
+    expected_size: number of bytes to receive
+    mode: negotiated TransferMode
+    ack_every: number of frames per ack (MODE_ACK, default half the window)
+    ack_interval: maximum time in seconds between acks (MODE_ACK)
+    return: number of bytes received
+    """
+    return RcvSink(
+        socket, StreamSink(sink), expected_size, mode, ack_every, ack_interval
+    )
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 5:
-        PrintBaseUsage()
-        print("<expected size>")
-        sys.exit()
+    parser = ArgumentParser("Receive file of known size from board.")
+    parser.add_argument("output_file")
+    parser.add_argument("expected_size", type=int)
+    AddAckOptions(parser)
+    AddCrcOption(parser)
+    AddResumeOption(parser)
+    args, link = ParseArgs(parser)
 
     print("\nStarting file reception...")
 
-    socket = CreateSocket()
+    socket = CreateSocket(link, args.rx_ring, args.pcap)
 
-    SyncAckLast(socket)
-    RcvFile(socket, sys.argv[3], int(sys.argv[4]))
+    mode = SyncAckLast(socket, RequestedMode(args, MODE_SEQ | MODE_ACK))
+    RcvFile(
+        socket,
+        args.output_file,
+        args.expected_size,
+        mode,
+        args.ack_every,
+        ACK_INTERVAL if args.ack_interval is None else args.ack_interval / 1000,
+        args.mmap,
+    )
+    if args.stats:
+        WriteSummary(socket.stats, args.stats)
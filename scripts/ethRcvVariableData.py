@@ -5,28 +5,187 @@
 """ethRcvVariableData.py
 
 Size of data to be received is unknown at the start.
+
+With MODE_STREAM, the size frame is versioned, with 64-bit sizes, and
+streams of unknown length are received segment by segment until the
+end-of-stream frame.
 """
 
 # Import libraries
-from ethBase import CreateSocket, FormPacket, SyncAckLast, RcvAndAck
-from ethRcvData import RcvFile
-import sys
-import struct
+from ethBase import (
+    CreateSocket,
+    ParseSize,
+    ParseSync,
+    RecvFrame,
+    ReplySync,
+    SendPacket,
+    SocketStats,
+    SyncAckLast,
+    ACK_INTERVAL,
+    ETH_HEADER_LEN,
+    LEGACY_MODE,
+    MODE_ACK,
+    MODE_SEQ,
+    MODE_STREAM,
+    SIZE_MAGIC,
+    SIZE_MORE,
+)
+from ethCli import (
+    AddAckOptions,
+    AddCrcOption,
+    AddResumeOption,
+    ArgumentParser,
+    ParseArgs,
+    RequestedMode,
+)
+from ethRcvData import RcvFile, RcvStream
+from ethStats import WriteSummary
+
+
+def RcvSize(socket, mode):
+    """
+    Receive size of the data that follows, and echo it.
+
+    socket: socket for communication
+    mode: negotiated TransferMode (to repeat the sync reply)
+    return: (size, flags) tuple, flags with SIZE_MORE for segments of a stream
+            that are not the last
+    """
+    # Receive file size, repeating sync reply if the destination lost it, and
+    # skipping late frames of the previous transfer (MODE_STREAM)
+    while True:
+        payload = RecvFrame(socket)[ETH_HEADER_LEN:]
+        if ParseSync(payload) is not None:
+            ReplySync(socket, mode)
+        elif (
+            not mode.flags & MODE_STREAM
+            or bytes(payload[: len(SIZE_MAGIC)]) == SIZE_MAGIC
+        ):
+            break
+
+    # Send data back as ack
+    SendPacket(socket, socket.link.FormPacket(payload))
+    stats = SocketStats(socket)
+    stats.Received(1)
+    stats.Sent(1)
+
+    return ParseSize(payload, mode)
+
 
+def _RcvSegments(socket, sink, size, flags, mode, ack_every, ack_interval):
+    """
+    Receive data of a stream into sink, segment by segment until the last.
 
-def RcvVariableFile(socket, output_filename):
-    # Receive file size
-    payload = RcvAndAck(socket)
+    socket, sink, mode, ack_every, ack_interval: as in RcvVariableStream
+    size, flags: from the size frame of the first segment
+    return: number of bytes received
+    """
+    count_bytes = 0
+    while True:
+        print("Segment size: %d " % size)
+        if size:
+            count_bytes += RcvStream(socket, sink, size, mode, ack_every, ack_interval)
+        if not flags & SIZE_MORE:
+            return count_bytes
+        mode = SyncAckLast(socket, mode, True, True)
+        size, flags = RcvSize(socket, mode)
 
-    rcv_file_size = struct.unpack("<i", payload[0:4])[0]
 
-    RcvFile(socket, output_filename, rcv_file_size)
+def RcvVariableFile(
+    socket,
+    output_filename,
+    mode=LEGACY_MODE,
+    ack_every=None,
+    ack_interval=ACK_INTERVAL,
+    use_mmap=False,
+):
+    """
+    Receive size, then file. Streams of unknown length (MODE_STREAM) are
+    written segment by segment as they arrive.
+
+    socket: socket for communication
+    output_filename: path of the output file
+    mode: negotiated TransferMode
+    ack_every: number of frames per ack (MODE_ACK, default half the window)
+    ack_interval: maximum time in seconds between acks (MODE_ACK)
+    use_mmap: receive file through a memory mapping (needs its final size,
+              so not with MODE_STREAM)
+    return: nothing
+    """
+    if use_mmap and mode.flags & MODE_STREAM:
+        raise ValueError("Streams can not be received through a memory mapping")
+    rcv_file_size, flags = RcvSize(socket, mode)
+
+    if flags & SIZE_MORE:
+        # Stream of unknown length: write segments as they arrive
+        with open(output_filename, "wb") as f_output:
+            _RcvSegments(
+                socket,
+                f_output.write,
+                rcv_file_size,
+                flags,
+                mode,
+                ack_every,
+                ack_interval,
+            )
+        return
+
+    RcvFile(
+        socket,
+        output_filename,
+        rcv_file_size,
+        mode,
+        ack_every,
+        ack_interval,
+        use_mmap,
+    )
+
+
+def RcvVariableStream(
+    socket,
+    sink,
+    mode=LEGACY_MODE,
+    ack_every=None,
+    ack_interval=ACK_INTERVAL,
+):
+    """
+    Receive size, then data into a callable as it arrives in order (see
+    RcvStream), so it can be processed during the transfer. Streams of
+    unknown length (MODE_STREAM) are received until their end.
+
+    socket: socket for communication
+    sink: callable taking each piece of data (bytes) in order
+    mode: negotiated TransferMode
+    ack_every: number of frames per ack (MODE_ACK, default half the window)
+    ack_interval: maximum time in seconds between acks (MODE_ACK)
+    return: number of bytes received
+    """
+    size, flags = RcvSize(socket, mode)
+    return _RcvSegments(socket, sink, size, flags, mode, ack_every, ack_interval)
 
 
 if __name__ == "__main__":
+    parser = ArgumentParser("Receive file size, then file from board.")
+    parser.add_argument("output_file")
+    AddAckOptions(parser)
+    AddCrcOption(parser)
+    AddResumeOption(parser)
+    args, link = ParseArgs(parser)
+
     print("\nStarting file reception...")
 
-    socket = CreateSocket()
+    socket = CreateSocket(link, args.rx_ring, args.pcap)
 
-    SyncAckLast(socket)
-    RcvVariableFile(socket, sys.argv[3])
+    # Streams can not be received through a memory mapping
+    stream = 0 if args.mmap else MODE_STREAM
+    mode = SyncAckLast(socket, RequestedMode(args, MODE_SEQ | MODE_ACK, stream))
+    RcvVariableFile(
+        socket,
+        args.output_file,
+        mode,
+        args.ack_every,
+        ACK_INTERVAL if args.ack_interval is None else args.ack_interval / 1000,
+        args.mmap,
+    )
+    if args.stats:
+        WriteSummary(socket.stats, args.stats)
@@ -0,0 +1,158 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethRing.py
+
+Memory-mapped receive ring (PACKET_MMAP, TPACKET_V3 block mode) for raw
+sockets. The kernel writes frames straight into memory shared with this
+process, so frames are read without a copy per frame.
+"""
+
+import mmap
+import select
+import struct
+import time
+
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+
+# Block status values
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+
+# Ring geometry
+RING_BLOCK_SIZE = 1 << 20
+RING_BLOCK_NR = 16
+RING_FRAME_SIZE = 2048
+# Time in ms after which the kernel hands a partially filled block to us
+RING_RETIRE_TIMEOUT = 1
+
+# struct tpacket_req3
+TPACKET_REQ3 = struct.Struct("=7I")
+# struct tpacket_block_desc fields used: block_status, num_pkts,
+# offset_to_first_pkt
+BLOCK_STATUS_OFFSET = 8
+BLOCK_STATUS = struct.Struct("=I")
+BLOCK_PKTS = struct.Struct("=II")
+# struct tpacket3_hdr fields used: tp_next_offset, tp_snaplen, tp_mac
+PKT_NEXT = struct.Struct("=I")
+PKT_SNAPLEN_OFFSET = 12
+PKT_SNAPLEN = struct.Struct("=I")
+PKT_MAC_OFFSET = 24
+PKT_MAC = struct.Struct("=H")
+
+
+class RxRing:
+    """
+    Receive ring attached to a raw AF_PACKET socket. Frames are returned as
+    memoryview slices of the ring, valid until the next call to Recv.
+    """
+
+    def __init__(
+        self,
+        sock,
+        block_size=RING_BLOCK_SIZE,
+        block_nr=RING_BLOCK_NR,
+        frame_size=RING_FRAME_SIZE,
+        retire_timeout=RING_RETIRE_TIMEOUT,
+    ):
+        self.sock = sock
+        self.block_size = block_size
+        self.block_nr = block_nr
+
+        sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+        sock.setsockopt(
+            SOL_PACKET,
+            PACKET_RX_RING,
+            TPACKET_REQ3.pack(
+                block_size,
+                block_nr,
+                frame_size,
+                (block_size * block_nr) // frame_size,
+                retire_timeout,
+                0,
+                0,
+            ),
+        )
+        self.map = mmap.mmap(
+            sock.fileno(),
+            block_size * block_nr,
+            mmap.MAP_SHARED,
+            mmap.PROT_READ | mmap.PROT_WRITE,
+        )
+        self.view = memoryview(self.map)
+
+        # Current block and next packet in it
+        self.block = 0
+        self.pkt_offset = 0
+        self.pkts_left = 0
+        # Blocks fully read, given back to the kernel on the next call
+        self.done_blocks = []
+
+    def _BlockStatus(self, block):
+        offset = block * self.block_size + BLOCK_STATUS_OFFSET
+        return BLOCK_STATUS.unpack_from(self.map, offset)[0]
+
+    def _Release(self):
+        """Give fully read blocks back to the kernel"""
+        for block in self.done_blocks:
+            offset = block * self.block_size + BLOCK_STATUS_OFFSET
+            BLOCK_STATUS.pack_into(self.map, offset, TP_STATUS_KERNEL)
+        self.done_blocks = []
+
+    def _NextBlock(self):
+        self.done_blocks.append(self.block)
+        self.block = (self.block + 1) % self.block_nr
+
+    def Recv(self, max_n, timeout=None):
+        """
+        Get frames written by the kernel. Waits for the first frame, then
+        takes only the frames already in the ring.
+
+        max_n: maximum number of frames to return
+        timeout: maximum time in seconds to wait for the first frame (None
+                 waits forever)
+        return: list of memoryview frames (empty on timeout)
+        """
+        self._Release()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        frames = []
+        while len(frames) < max_n:
+            if self.pkts_left == 0:
+                if not self._BlockStatus(self.block) & TP_STATUS_USER:
+                    if frames:
+                        break
+                    if deadline is None:
+                        remaining = None
+                    else:
+                        remaining = max(deadline - time.monotonic(), 0)
+                    ready, _, _ = select.select([self.sock], [], [], remaining)
+                    if not ready:
+                        break
+                    continue
+                base = self.block * self.block_size
+                num_pkts, first = BLOCK_PKTS.unpack_from(
+                    self.map, base + BLOCK_STATUS_OFFSET + 4
+                )
+                if num_pkts == 0:
+                    self._NextBlock()
+                    continue
+                self.pkts_left = num_pkts
+                self.pkt_offset = base + first
+
+            offset = self.pkt_offset
+            snaplen = PKT_SNAPLEN.unpack_from(self.map, offset + PKT_SNAPLEN_OFFSET)[0]
+            start = offset + PKT_MAC.unpack_from(self.map, offset + PKT_MAC_OFFSET)[0]
+            frames.append(self.view[start : start + snaplen])
+
+            self.pkts_left -= 1
+            if self.pkts_left == 0:
+                self._NextBlock()
+            else:
+                self.pkt_offset += PKT_NEXT.unpack_from(self.map, offset)[0]
+
+        return frames
@@ -0,0 +1,69 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethRto.py
+
+Retransmission timeout (RTO) of a link, estimated from the measured round
+trip times as in RFC 6298: a smoothed RTT and its variation give the
+timeout, which doubles on each expiry (backoff) until a new sample arrives.
+The link timeout is only the initial RTO, so waits track the actual board
+response time, be it the PC emulation, a simulation or a real FPGA.
+"""
+
+# Gains of the smoothed RTT and RTT variation (RFC 6298 alpha and beta)
+RTO_ALPHA = 1 / 8
+RTO_BETA = 1 / 4
+# Weight of the RTT variation in the RTO (RFC 6298 K)
+RTO_K = 4
+# Clock granularity, lower bound of the RTT variation term
+RTO_GRANULARITY = 1e-6
+
+# Default clamps of the RTO in seconds
+RTO_MIN = 0.001
+RTO_MAX = 60.0
+
+
+class RtoEstimator:
+    """Smoothed RTT and retransmission timeout of a link"""
+
+    def __init__(self, initial, minimum=RTO_MIN, maximum=RTO_MAX, adaptive=True):
+        """
+        initial: RTO in seconds until the first RTT sample
+        minimum: smallest RTO in seconds
+        maximum: largest RTO in seconds, also after backoff
+        adaptive: update the RTO from samples and backoff (False keeps it
+                  fixed at initial)
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.adaptive = adaptive
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial
+
+    def _Clamp(self, rto):
+        return min(max(rto, self.minimum), self.maximum)
+
+    def Sample(self, rtt):
+        """
+        Update RTO with a round trip time sample. Samples must only be taken
+        from frames sent once (Karn's algorithm). Also clears the backoff.
+
+        rtt: round trip time in seconds
+        return: nothing
+        """
+        if not self.adaptive:
+            return
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += RTO_BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += RTO_ALPHA * (rtt - self.srtt)
+        self.rto = self._Clamp(self.srtt + max(RTO_GRANULARITY, RTO_K * self.rttvar))
+
+    def Backoff(self):
+        """Double RTO after it expired"""
+        if self.adaptive:
+            self.rto = self._Clamp(self.rto * 2)
@@ -9,61 +9,292 @@ Size of data transfered is known by destination address.
 
 # Import libraries
 from ethBase import (
-    TimedPrintProgress,
     CreateSocket,
-    SendAndAck,
+    FrameBuilder,
+    RecvFrames,
+    RequestResume,
+    SendPacketAndAck,
+    SocketStats,
+    SendPackets,
     SyncAckFirst,
-    ETH_NBYTES,
+    DataPrefixSize,
+    CRC_HEADER,
+    LEGACY_MODE,
+    MODE_CRC,
+    MODE_RESUME,
+    MODE_SEQ,
+    SEQ_HEADER,
+    VERDICT_FRAME,
+    VERDICT_OK,
 )
+from ethCheckpoint import Checkpoint
+from ethCli import (
+    AddCrcOption,
+    AddResumeOption,
+    ArgumentParser,
+    ParseArgs,
+    RequestedMode,
+)
+from ethFile import OpenSource, StreamSource
+from ethVerify import CountMismatches
+from ethStats import WriteSummary
 from os.path import getsize
-import sys
+import time
+import zlib
 
 
-def SendFile(socket, input_filename):
-    # Open input file
-    f_input = open(input_filename, "rb")
+def SendFileWindowed(socket, f_input, input_file_size, mode, checkpoint=None):
+    """
+    Send file data with up to 'window' sequence-numbered frames in flight.
+    Echoes may arrive in any order; on timeout (the link RTO) only frames
+    that were not yet acknowledged are sent again. With MODE_CRC, verdicts
+    arrive instead of echoes: frames with a bad verdict are sent again at
+    once, and the file digest is sent once all data frames are acknowledged.
 
-    # Frame parameters
-    input_file_size = getsize(input_filename)
-    if input_file_size == 0:
-        print("File is empty. Check if filepath is correct")
-        return 0
+    socket: socket for communication
+    f_input: input file object
+    input_file_size: number of bytes to send
+    mode: negotiated TransferMode (window and payload size)
+    checkpoint: Checkpoint to update as data is acknowledged (MODE_RESUME),
+                or None
+    return: difference count between sent and echoed data (with MODE_CRC, 1
+            if the received file does not match the digest)
+    """
+    window = mode.window
+    check = mode.flags & MODE_CRC
+    prefix_size = DataPrefixSize(mode)
+    chunk_size = mode.payload - prefix_size
+    num_frames = ((input_file_size - 1) // chunk_size) + 1
+    # The digest frame follows the data frames (MODE_CRC)
+    total_frames = num_frames + 1 if check else num_frames
+    print("num_frames_input: %d (window %d)" % (num_frames, window))
+    stats = SocketStats(socket)
+    stats.BeginData(num_frames)
+    rto = socket.link.rto
+
+    # Frames sent but not yet acknowledged: seq -> FrameBuilder holding it.
+    # Buffers are reused once their frame is acknowledged.
+    in_flight = {}
+    # Send time of frames in flight that were sent only once (RTT samples)
+    sent_time = {}
+    free = [
+        FrameBuilder(socket.link.header, prefix_size, chunk_size) for _ in range(window)
+    ]
+    next_seq = 0
+    count_acked = 0
+    count_errors = 0
+    file_crc = 0
+
+    while count_acked < total_frames:
+        # Fill the window
+        new_frames = []
+        new_bytes = 0
+        while free and next_seq < num_frames:
+            builder = free.pop()
+            SEQ_HEADER.pack_into(builder.Prefix(), 0, next_seq)
+            new_frames.append(builder.ReadInto(f_input, chunk_size))
+            if check:
+                data = builder.Payload()
+                CRC_HEADER.pack_into(
+                    builder.Prefix(), SEQ_HEADER.size, zlib.crc32(data)
+                )
+                file_crc = zlib.crc32(data, file_crc)
+            in_flight[next_seq] = builder
+            new_bytes += builder.length
+            next_seq += 1
+        # Send digest once the destination has all data (MODE_CRC)
+        if next_seq == num_frames < total_frames and count_acked == num_frames:
+            builder = free.pop()
+            SEQ_HEADER.pack_into(builder.Prefix(), 0, next_seq)
+            CRC_HEADER.pack_into(builder.Prefix(), SEQ_HEADER.size, file_crc)
+            new_frames.append(builder.Write(b""))
+            in_flight[next_seq] = builder
+            next_seq += 1
+        SendPackets(socket, new_frames)
+        if new_frames:
+            now = time.perf_counter()
+            for seq in range(next_seq - len(new_frames), next_seq):
+                sent_time[seq] = now
+            stats.Sent(len(new_frames), new_bytes)
+
+        echoes = RecvFrames(socket, window, rto.rto)
+        if not echoes:
+            print("Eth send timeout!")
+            stats.Timeout()
+            stats.Retransmit(len(in_flight))
+            rto.Backoff()
+            sent_time.clear()
+            SendPackets(socket, [builder.frame for builder in in_flight.values()])
+            continue
+
+        now = time.perf_counter()
+        stats.Received(len(echoes))
+
+        for echo in echoes:
+            (seq,) = SEQ_HEADER.unpack_from(echo)
+            # Ignore repeated echoes of frames already acknowledged
+            if seq not in in_flight:
+                continue
+            if check:
+                verdict = VERDICT_FRAME.unpack_from(echo)[1]
+                # Data corrupted on the way: send it again at once
+                if verdict != VERDICT_OK and seq < num_frames:
+                    sent_time.pop(seq, None)
+                    stats.Retransmit(1)
+                    SendPackets(socket, [in_flight[seq].frame])
+                    continue
+            builder = in_flight.pop(seq)
+            if seq in sent_time:
+                rtt = now - sent_time.pop(seq)
+                stats.Rtt(rtt)
+                rto.Sample(rtt)
+
+            if not check:
+                errors = CountMismatches(
+                    builder.Payload(), memoryview(echo)[SEQ_HEADER.size :]
+                )
+            elif seq == num_frames and verdict != VERDICT_OK:
+                print("Error, file digest does not match the received file")
+                errors = 1
+            else:
+                errors = 0
+            stats.Verified(builder.length, errors)
+            count_errors += errors
+            free.append(builder)
+
+            count_acked += 1
+        stats.Progress(min(count_acked, num_frames))
+        if checkpoint is not None:
+            done = min(min(in_flight, default=next_seq), num_frames)
+            checkpoint.Acked(min(done * chunk_size, input_file_size))
+
+    stats.End()
+    return count_errors
+
+
+def SendSource(socket, f_input, input_file_size, mode=LEGACY_MODE, checkpoint=None):
+    """
+    Send data read from a file object.
 
-    num_frames_input = ((input_file_size - 1) // ETH_NBYTES) + 1
+    socket: socket for communication
+    f_input: input file object (with readinto, and seek for MODE_RESUME),
+             positioned at the start of the data
+    input_file_size: number of bytes to send
+    mode: negotiated TransferMode
+    checkpoint: Checkpoint of the input file to resume from and update
+                (MODE_RESUME), closed once the transfer ends, or None to
+                resume at the start
+    return: difference count between sent and echoed data
+    """
+    if mode.flags & MODE_SEQ:
+        start = 0
+        if mode.flags & MODE_RESUME:
+            if checkpoint is None:
+                start = RequestResume(socket, 0, 0)
+            else:
+                start = checkpoint.Resume(RequestResume(socket, *checkpoint.Load()))
+            if start:
+                f_input.seek(start)
+        try:
+            count_errors = SendFileWindowed(
+                socket, f_input, input_file_size - start, mode, checkpoint
+            )
+        finally:
+            if checkpoint is not None:
+                checkpoint.Close()
+        print("\n\nFile transmitted with %d errors..." % (count_errors))
+        return count_errors
+
+    num_frames_input = ((input_file_size - 1) // mode.payload) + 1
     print("input_file_size: %d" % input_file_size)
     print("num_frames_input: %d" % num_frames_input)
+    stats = SocketStats(socket)
+    stats.BeginData(num_frames_input)
 
     # Reset byte counter
     count_bytes = 0
     count_errors = 0
 
+    # Frame buffer reused for all frames
+    builder = FrameBuilder(socket.link.header, payload_size=mode.payload)
+
     # Loop to send input frames
     for j in range(num_frames_input):
-        TimedPrintProgress(j, num_frames_input - 1)
-
         # check if it is last packet (not enough for full payload)
         if j == (num_frames_input - 1):
             bytes_to_send = input_file_size - count_bytes
         else:
-            bytes_to_send = ETH_NBYTES
+            bytes_to_send = mode.payload
 
         # form frame
-        payload = f_input.read(bytes_to_send)
+        frame = builder.ReadInto(f_input, bytes_to_send)
 
         # accumulate sent bytes
-        count_bytes += ETH_NBYTES
+        count_bytes += mode.payload
 
-        count_errors += SendAndAck(socket, payload)
+        count_errors += SendPacketAndAck(socket, frame, builder.Payload())
+        stats.Progress(j + 1)
 
-    # Close file
-    f_input.close()
+    stats.End()
     print("\n\nFile transmitted with %d errors..." % (count_errors))
+    return count_errors
+
+
+def SendFile(socket, input_filename, mode=LEGACY_MODE, use_mmap=False):
+    # Frame parameters
+    input_file_size = getsize(input_filename)
+    if input_file_size == 0:
+        print("File is empty. Check if filepath is correct")
+        return 0
+
+    # Open input file
+    f_input = OpenSource(input_filename, use_mmap)
+
+    checkpoint = None
+    if mode.flags & MODE_SEQ and mode.flags & MODE_RESUME:
+        checkpoint = Checkpoint(input_filename, input_file_size)
+    try:
+        count_errors = SendSource(socket, f_input, input_file_size, mode, checkpoint)
+    finally:
+        # Close file
+        f_input.close()
+    return count_errors
+
+
+def SendStream(socket, chunks, size, mode=LEGACY_MODE):
+    """
+    Send data from an iterable of bytes-like chunks (e.g. a generator reading
+    a pipe or socket, or NumPy arrays), without staging it in a file. Chunks
+    are taken as frames are sent.
+
+    socket: socket for communication
+    chunks: iterable of bytes-like objects, with at least size bytes in total
+    size: number of bytes to send
+    mode: negotiated TransferMode
+    return: difference count between sent and echoed data
+    """
+    source = StreamSource(chunks)
+    try:
+        count_errors = SendSource(socket, source, size, mode)
+    finally:
+        source.close()
+    if source.pos < size:
+        print("Error, stream ended after %d of %d bytes" % (source.pos, size))
+    return count_errors
 
 
 if __name__ == "__main__":
+    parser = ArgumentParser("Send file of size known by the board.")
+    parser.add_argument("input_file")
+    AddCrcOption(parser)
+    AddResumeOption(parser)
+    args, link = ParseArgs(parser)
+
     print("\nStarting file transmission...")
 
-    socket = CreateSocket()
+    socket = CreateSocket(link, args.rx_ring, args.pcap)
 
-    SyncAckFirst(socket)
-    SendFile(socket, sys.argv[3])
+    mode = SyncAckFirst(socket, RequestedMode(args, MODE_SEQ))
+    SendFile(socket, args.input_file, mode, args.mmap)
+    if args.stats:
+        WriteSummary(socket.stats, args.stats)
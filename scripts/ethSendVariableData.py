@@ -5,33 +5,127 @@
 """ethSendVariableData.py
 
 Size of data transfered is not known by destination address.
+
+With MODE_STREAM, the size frame is versioned, with 64-bit sizes, and data
+of unknown length (e.g. from stdin, with '-' as input file) can be streamed
+in segments ended by an end-of-stream frame.
 """
 
 # Import libraries
-from ethBase import CreateSocket, SendAndAck, SyncAckFirst
-from ethSendData import SendFile
+from ethBase import (
+    CreateSocket,
+    FormSize,
+    SendAndAck,
+    SyncAckFirst,
+    LEGACY_MODE,
+    MODE_SEQ,
+    MODE_STREAM,
+    SIZE_MORE,
+)
+from ethCli import (
+    AddCrcOption,
+    AddResumeOption,
+    ArgumentParser,
+    ParseArgs,
+    RequestedMode,
+)
+from ethFile import StreamSource
+from ethSendData import SendFile, SendStream
+from ethStats import WriteSummary
 from os.path import getsize
 import sys
-import struct
 
+# Largest segment of streams of unknown length (MODE_STREAM)
+STREAM_SEGMENT = 1 << 20
 
-def SendVariableFile(socket, input_filename):
-    input_file_size = getsize(input_filename)
 
-    print("Size: %d " % input_file_size)
+def SendSize(socket, size, mode=LEGACY_MODE, flags=0):
+    """
+    Send size of the data that follows, and wait for its echo.
 
-    errors = SendAndAck(socket, struct.pack("<i", input_file_size))
+    socket: socket for communication
+    size: number of bytes of the data
+    mode: negotiated TransferMode
+    flags: SIZE_MORE for segments of a stream, except the last
+    return: difference count between sent and echoed size frame
+    """
+    errors = SendAndAck(socket, FormSize(mode, size, flags))
 
     if errors:
         print("Error sending file size")
+    return errors
+
+
+def SendVariableFile(socket, input_filename, mode=LEGACY_MODE, use_mmap=False):
+    input_file_size = getsize(input_filename)
+
+    print("Size: %d " % input_file_size)
+
+    SendSize(socket, input_file_size, mode)
+
+    SendFile(socket, input_filename, mode, use_mmap)
+
 
-    SendFile(socket, input_filename)
+def SendVariableStream(
+    socket, chunks, size=None, mode=LEGACY_MODE, segment_size=STREAM_SEGMENT
+):
+    """
+    Send size, then data from an iterable of bytes-like chunks (see
+    SendStream). With no size (MODE_STREAM), send the data in segments as it
+    is produced, each after a sync with the destination, ending the stream
+    with an end-of-stream frame.
+
+    socket: socket for communication
+    chunks: iterable of bytes-like objects, with at least size bytes in total
+    size: number of bytes to send, or None if unknown
+    mode: negotiated TransferMode
+    segment_size: largest segment of a stream of unknown length, buffered
+                  before it is sent
+    return: difference count between sent and echoed data
+    """
+    if size is not None:
+        print("Size: %d " % size)
+        SendSize(socket, size, mode)
+        return SendStream(socket, chunks, size, mode)
+
+    source = StreamSource(chunks)
+    segment = bytearray(segment_size)
+    count_errors = 0
+    try:
+        while True:
+            size = source.readinto(segment)
+            # A short segment is the last one. After a full one, the stream
+            # may end with an empty segment: the end-of-stream frame.
+            flags = SIZE_MORE if size == segment_size else 0
+            print("Segment size: %d " % size)
+            SendSize(socket, size, mode, flags)
+            if size:
+                data = memoryview(segment)[:size]
+                count_errors += SendStream(socket, [data], size, mode)
+            if not flags:
+                break
+            mode = SyncAckFirst(socket, mode, True)
+    finally:
+        source.close()
+    return count_errors
 
 
 if __name__ == "__main__":
+    parser = ArgumentParser("Send file size, then file to board.")
+    parser.add_argument("input_file", help="file to send, or '-' for stdin")
+    AddCrcOption(parser)
+    AddResumeOption(parser)
+    args, link = ParseArgs(parser)
+
     print("\nStarting file transmission...")
 
-    socket = CreateSocket()
+    socket = CreateSocket(link, args.rx_ring, args.pcap)
 
-    SyncAckFirst(socket)
-    SendVariableFile(socket, sys.argv[3])
+    mode = SyncAckFirst(socket, RequestedMode(args, MODE_SEQ, MODE_STREAM))
+    if args.input_file == "-":
+        chunks = iter(lambda: sys.stdin.buffer.read1(STREAM_SEGMENT), b"")
+        SendVariableStream(socket, chunks, None, mode)
+    else:
+        SendVariableFile(socket, args.input_file, mode, args.mmap)
+    if args.stats:
+        WriteSummary(socket.stats, args.stats)
@@ -0,0 +1,135 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethSimRing.py
+
+Single-producer/single-consumer rings of frames in memory-mapped files,
+shared by the eth2file relay and the simulation testbench driver
+(software/simulation/src/iob_eth_tb_driver.c). There is one ring per
+direction, so many frames can be queued while the other side is busy.
+
+Ring file layout (little endian, offsets in bytes):
+    0     magic "IOBR"
+    4     u32 capacity of the data area (power of two)
+    64    u32 head: bytes written by the producer (free running)
+    128   u32 tail: bytes read by the consumer (free running)
+    192   data area
+Each frame is a u16 length followed by the frame bytes, wrapping around the
+end of the data area. The producer writes the frame before advancing head,
+and the consumer reads it before advancing tail, so each index is only
+written by one side.
+"""
+
+import mmap
+import os
+import struct
+
+SIM_RING_MAGIC = b"IOBR"
+SIM_RING_CAPACITY_OFFSET = 4
+SIM_RING_HEAD_OFFSET = 64
+SIM_RING_TAIL_OFFSET = 128
+SIM_RING_DATA_OFFSET = 192
+
+# Default capacity of the data area
+SIM_RING_CAPACITY = 1 << 20
+
+INDEX = struct.Struct("<I")
+FRAME_LENGTH = struct.Struct("<H")
+INDEX_MASK = 0xFFFFFFFF
+
+
+class SimRing:
+    """Frame ring in a memory-mapped file, used as producer or consumer"""
+
+    def __init__(self, path):
+        """
+        path: path of ring file (see CreateSimRing)
+        """
+        with open(path, "r+b") as f:
+            self.map = mmap.mmap(f.fileno(), 0)
+        if self.map[0:4] != SIM_RING_MAGIC:
+            self.map.close()
+            raise ValueError(f"'{path}' is not a frame ring")
+        (self.capacity,) = INDEX.unpack_from(self.map, SIM_RING_CAPACITY_OFFSET)
+        self.mask = self.capacity - 1
+        self.data = memoryview(self.map)[
+            SIM_RING_DATA_OFFSET : SIM_RING_DATA_OFFSET + self.capacity
+        ]
+
+    def close(self):
+        self.data.release()
+        self.map.close()
+
+    def _Head(self):
+        return INDEX.unpack_from(self.map, SIM_RING_HEAD_OFFSET)[0]
+
+    def _Tail(self):
+        return INDEX.unpack_from(self.map, SIM_RING_TAIL_OFFSET)[0]
+
+    def _Write(self, position, data):
+        start = position & self.mask
+        first = min(len(data), self.capacity - start)
+        self.data[start : start + first] = data[:first]
+        self.data[: len(data) - first] = data[first:]
+
+    def _Read(self, position, size):
+        start = position & self.mask
+        first = min(size, self.capacity - start)
+        return bytes(self.data[start : start + first]) + bytes(
+            self.data[: size - first]
+        )
+
+    def Put(self, frame):
+        """
+        Queue frame (producer side).
+
+        frame: bytes-like frame
+        return: True if queued, False if the ring is full
+        """
+        head = self._Head()
+        size = FRAME_LENGTH.size + len(frame)
+        if size > self.capacity - ((head - self._Tail()) & INDEX_MASK):
+            return False
+        self._Write(head, FRAME_LENGTH.pack(len(frame)))
+        self._Write(head + FRAME_LENGTH.size, memoryview(frame).cast("B"))
+        INDEX.pack_into(self.map, SIM_RING_HEAD_OFFSET, (head + size) & INDEX_MASK)
+        return True
+
+    def Get(self):
+        """
+        Take next frame (consumer side).
+
+        return: frame bytes, or None if the ring is empty
+        """
+        tail = self._Tail()
+        if tail == self._Head():
+            return None
+        (length,) = FRAME_LENGTH.unpack(self._Read(tail, FRAME_LENGTH.size))
+        frame = self._Read(tail + FRAME_LENGTH.size, length)
+        INDEX.pack_into(
+            self.map,
+            SIM_RING_TAIL_OFFSET,
+            (tail + FRAME_LENGTH.size + length) & INDEX_MASK,
+        )
+        return frame
+
+
+def CreateSimRing(path, capacity=SIM_RING_CAPACITY):
+    """
+    Create empty ring file, replacing any previous file. The file appears
+    complete at path (it is renamed into place), so the other side can open
+    it as soon as it exists.
+
+    path: path of ring file
+    capacity: size of the data area in bytes (power of two)
+    return: SimRing
+    """
+    if capacity & (capacity - 1) or not 0 < capacity <= 1 << 31:
+        raise ValueError("ring capacity must be a power of two")
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.truncate(SIM_RING_DATA_OFFSET + capacity)
+        f.write(SIM_RING_MAGIC + INDEX.pack(capacity))
+    os.replace(temp_path, path)
+    return SimRing(path)
@@ -0,0 +1,262 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethStats.py
+
+Telemetry of one transfer: frame and byte counters, retransmits, timeouts,
+a histogram of round-trip times and the time spent in the sync and data
+phases. Recording costs a few integer additions per frame and one clock read
+per batch of frames, so it is always on; progress is reported through an
+optional callback, at most every 'interval' seconds.
+
+Example:
+    socket = CreateSocket(link)
+    socket.stats.callback = None  # no progress output
+    mode = SyncAckFirst(socket, requested)
+    SendFile(socket, "input.bin", mode)
+    print(socket.stats.Json())
+"""
+
+import json
+import sys
+import time
+
+# Number of RTT histogram buckets. Bucket i counts RTTs below 2^i us (and at
+# least 2^(i-1) us); the last bucket also counts all longer RTTs.
+RTT_BUCKETS = 24
+
+# Default minimum time in seconds between progress callbacks
+PROGRESS_INTERVAL = 0.1
+
+# Transfer phases
+PHASE_SYNC = "sync"
+PHASE_DATA = "data"
+
+
+def PrintProgress(stats):
+    """Progress callback that prints the number of frames done"""
+    print("\rProgress: %d / %d" % (stats.done, stats.total))
+    sys.stdout.flush()
+
+
+class TransferStats:
+    """
+    Counters of the current (or last) transfer. The sync functions start a
+    new transfer; the data functions start its data phase and end it.
+    Setup frames exchanged before the data frames (e.g. the file size of
+    variable transfers) are counted in the sync phase.
+    """
+
+    def __init__(self, callback=None, interval=PROGRESS_INTERVAL):
+        """
+        callback: function called with this object as the transfer
+                  progresses, and when it ends (None for no progress output)
+        interval: minimum time in seconds between progress callbacks
+        """
+        self.callback = callback
+        self.interval = interval
+        self.Reset()
+
+    def Reset(self):
+        """Clear all counters"""
+        self.mode = None
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.retransmits = 0
+        self.timeouts = 0
+        # Payload data bytes, not counting sequence numbers and padding
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.bytes_verified = 0
+        # Mismatching bytes in verified data
+        self.errors = 0
+        self.rtt_histogram = [0] * RTT_BUCKETS
+        self.rtt_count = 0
+        self.rtt_sum = 0.0
+        self.rtt_min = None
+        self.rtt_max = None
+        self.sync_time = 0.0
+        self.data_time = 0.0
+        # Data frames acknowledged/received, out of total
+        self.done = 0
+        self.total = 0
+        # Data frames of the previous segments of a stream, done and total
+        self._base_done = 0
+        self._base_total = 0
+        self.phase = None
+        self._phase_start = 0.0
+        self._last_report = 0.0
+
+    def _EndPhase(self, now):
+        if self.phase == PHASE_SYNC:
+            self.sync_time += now - self._phase_start
+        elif self.phase == PHASE_DATA:
+            self.data_time += now - self._phase_start
+        self.phase = None
+
+    def BeginSync(self, keep=False):
+        """
+        Start a new transfer, in its sync phase.
+
+        keep: keep the counters, to continue the transfer (next segment of a
+              stream)
+        """
+        if keep:
+            self._EndPhase(time.perf_counter())
+            self._base_done = self.done
+            self._base_total = self.total
+        else:
+            self.Reset()
+        self.phase = PHASE_SYNC
+        self._phase_start = time.perf_counter()
+
+    def BeginData(self, total):
+        """
+        Start data phase. Starts a new transfer if not in the sync phase
+        (data sent without sync).
+
+        total: number of data frames of the transfer
+        """
+        if self.phase != PHASE_SYNC:
+            self.Reset()
+        now = time.perf_counter()
+        self._EndPhase(now)
+        self.phase = PHASE_DATA
+        self._phase_start = now
+        self.total = self._base_total + total
+        self.done = self._base_done
+
+    def End(self):
+        """End transfer, reporting it to the callback"""
+        self._EndPhase(time.perf_counter())
+        if self.callback is not None:
+            self.callback(self)
+
+    def Progress(self, done):
+        """
+        Update number of data frames done, calling the callback if its
+        interval elapsed.
+
+        done: number of data frames acknowledged/received
+        """
+        self.done = self._base_done + done
+        if self.callback is not None:
+            now = time.perf_counter()
+            if now - self._last_report >= self.interval:
+                self._last_report = now
+                self.callback(self)
+
+    def Sent(self, frames, nbytes=0):
+        """Count frames sent (first transmission) with nbytes of payload data"""
+        self.frames_sent += frames
+        self.bytes_sent += nbytes
+
+    def Retransmit(self, frames):
+        """Count frames sent again"""
+        self.frames_sent += frames
+        self.retransmits += frames
+
+    def Received(self, frames, nbytes=0):
+        """Count frames received with nbytes of new payload data"""
+        self.frames_received += frames
+        self.bytes_received += nbytes
+
+    def Timeout(self):
+        """Count wait for the peer that timed out"""
+        self.timeouts += 1
+
+    def Verified(self, nbytes, errors):
+        """Count nbytes of echoed data compared, with errors mismatches"""
+        self.bytes_verified += nbytes
+        self.errors += errors
+
+    def Rtt(self, seconds):
+        """Add round-trip time sample (of frames sent only once)"""
+        bucket = int(seconds * 1e6).bit_length()
+        self.rtt_histogram[min(bucket, RTT_BUCKETS - 1)] += 1
+        self.rtt_count += 1
+        self.rtt_sum += seconds
+        if self.rtt_min is None or seconds < self.rtt_min:
+            self.rtt_min = seconds
+        if self.rtt_max is None or seconds > self.rtt_max:
+            self.rtt_max = seconds
+
+    def RttPercentile(self, percent):
+        """
+        Estimate RTT percentile from the histogram.
+
+        percent: percentile (0 to 100)
+        return: upper bound in seconds of the bucket with the percentile, or
+                None without samples
+        """
+        if not self.rtt_count:
+            return None
+        rank = percent / 100 * self.rtt_count
+        count = 0
+        for bucket, bucket_count in enumerate(self.rtt_histogram):
+            count += bucket_count
+            if count >= rank and bucket_count:
+                break
+        if bucket == RTT_BUCKETS - 1:
+            return self.rtt_max
+        return min((1 << bucket) / 1e6, self.rtt_max)
+
+    def Summary(self):
+        """
+        Get summary of the transfer.
+
+        return: dict with the counters (times in seconds, RTTs in us)
+        """
+
+        def Us(seconds):
+            return None if seconds is None else seconds * 1e6
+
+        return {
+            "mode": None if self.mode is None else list(self.mode),
+            "frames_sent": self.frames_sent,
+            "frames_received": self.frames_received,
+            "retransmits": self.retransmits,
+            "timeouts": self.timeouts,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "bytes_verified": self.bytes_verified,
+            "errors": self.errors,
+            "frames_done": self.done,
+            "frames_total": self.total,
+            "sync_s": self.sync_time,
+            "data_s": self.data_time,
+            "rtt_samples": self.rtt_count,
+            "rtt_min_us": Us(self.rtt_min),
+            "rtt_mean_us": Us(
+                self.rtt_sum / self.rtt_count if self.rtt_count else None
+            ),
+            "rtt_max_us": Us(self.rtt_max),
+            "rtt_p50_us": Us(self.RttPercentile(50)),
+            "rtt_p99_us": Us(self.RttPercentile(99)),
+            # [upper bound in us (None for the last bucket), count]
+            "rtt_histogram": [
+                [None if i == RTT_BUCKETS - 1 else 1 << i, count]
+                for i, count in enumerate(self.rtt_histogram)
+                if count
+            ],
+        }
+
+    def Json(self):
+        """Get summary of the transfer as a JSON string"""
+        return json.dumps(self.Summary())
+
+
+def WriteSummary(stats, filename):
+    """
+    Write JSON summary of the transfer.
+
+    stats: TransferStats
+    filename: path of file to write, or '-' for stdout
+    return: nothing
+    """
+    if filename == "-":
+        print(stats.Json())
+        return
+    with open(filename, "w") as f:
+        f.write(stats.Json() + "\n")
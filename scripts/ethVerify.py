@@ -0,0 +1,206 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""ethVerify.py
+
+Comparison of sent and echoed/received data. Equal buffers (the common case)
+are detected by comparing them as bytes (memcmp); bytes are only counted
+when the buffers differ, with NumPy if available or an XOR of big integers
+otherwise. Files received in the CRC32 mode are checked by their digest.
+
+Usage (whole-file verification after a transfer):
+    python ethVerify.py <sent_file> <received_file> [-r max_report]
+"""
+
+import argparse
+import itertools
+import mmap
+import os
+import re
+import zlib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Size of the blocks compared at a time in file verification
+VERIFY_BLOCK_SIZE = 1 << 20
+
+# Size of the blocks of views compared at a time as bytes (copies larger than
+# the malloc mmap threshold would fault in new pages each time)
+SAME_BLOCK_SIZE = 64 << 10
+
+# Nonzero byte (mismatch) in the XOR of two buffers
+NONZERO = re.compile(b"[^\0]")
+
+
+def _Views(sent, rcv):
+    """Get byte memoryviews of the common length of sent and rcv"""
+    sent = memoryview(sent).cast("B")
+    rcv = memoryview(rcv).cast("B")
+    size = min(len(sent), len(rcv))
+    return sent[:size], rcv[:size]
+
+
+def _Same(sent, rcv):
+    """
+    Check whether sent and rcv hold the same bytes over their common length.
+    bytes and bytearray are compared at once (memcmp). Comparing memoryviews
+    with == goes element by element, so views are copied to bytes instead,
+    in blocks that fit in reused heap memory.
+    """
+    if isinstance(sent, (bytes, bytearray)) and isinstance(rcv, (bytes, bytearray)):
+        if len(sent) == len(rcv):
+            return sent == rcv
+    sent, rcv = _Views(sent, rcv)
+    for start in range(0, len(sent), SAME_BLOCK_SIZE):
+        end = start + SAME_BLOCK_SIZE
+        if sent[start:end].tobytes() != rcv[start:end].tobytes():
+            return False
+    return True
+
+
+def _Diff(sent, rcv):
+    """Get bytes with the XOR of equal length sent and rcv (0 where equal)"""
+    size = len(sent)
+    diff = int.from_bytes(sent, "little") ^ int.from_bytes(rcv, "little")
+    return diff.to_bytes(size, "little")
+
+
+def CountMismatches(sent, rcv):
+    """
+    Count differing bytes between sent and received data. Only the common
+    length is compared.
+
+    sent: bytes-like object
+    rcv: bytes-like object
+    return: number of differing bytes
+    """
+    if _Same(sent, rcv):
+        return 0
+    sent, rcv = _Views(sent, rcv)
+    if numpy is not None:
+        return int(
+            numpy.count_nonzero(
+                numpy.frombuffer(sent, numpy.uint8)
+                != numpy.frombuffer(rcv, numpy.uint8)
+            )
+        )
+    diff = _Diff(sent, rcv)
+    return len(diff) - diff.count(0)
+
+
+def MismatchOffsets(sent, rcv, base=0, limit=None):
+    """
+    Get offsets of the differing bytes between sent and received data.
+
+    sent: bytes-like object
+    rcv: bytes-like object
+    base: offset added to each reported offset
+    limit: maximum number of offsets to return, or None for all
+    return: list of offsets
+    """
+    if limit == 0 or _Same(sent, rcv):
+        return []
+    sent, rcv = _Views(sent, rcv)
+    if numpy is not None:
+        offsets = numpy.flatnonzero(
+            numpy.frombuffer(sent, numpy.uint8) != numpy.frombuffer(rcv, numpy.uint8)
+        )
+        return [base + int(offset) for offset in offsets[:limit]]
+
+    offsets = (base + match.start() for match in NONZERO.finditer(_Diff(sent, rcv)))
+    return list(itertools.islice(offsets, limit))
+
+
+def FileCrc32(f, size, offset=0, crc=0):
+    """
+    Get CRC32 (as zlib.crc32) of part of a file, block by block.
+
+    f: binary file object open for reading, or MappedWriter
+    size: number of bytes to check
+    offset: offset of the first byte to check
+    crc: CRC32 of the data before, to continue from
+    return: CRC32 value
+    """
+    f.seek(offset)
+    while size > 0:
+        block = f.read(min(size, VERIFY_BLOCK_SIZE))
+        if not block:
+            break
+        crc = zlib.crc32(block, crc)
+        size -= len(block)
+    return crc
+
+
+def _MapFile(f):
+    """Map file read-only, or return empty bytes for an empty file"""
+    if os.fstat(f.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def VerifyFiles(sent_filename, rcv_filename, max_report=0):
+    """
+    Compare two files, block by block through memory mappings.
+
+    sent_filename: path of the sent file
+    rcv_filename: path of the received file
+    max_report: maximum number of mismatch offsets to report
+    return: number of differing bytes (bytes missing from the shorter file
+        included), and list of up to max_report mismatch offsets
+    """
+    with open(sent_filename, "rb") as f_sent, open(rcv_filename, "rb") as f_rcv:
+        sent = _MapFile(f_sent)
+        rcv = _MapFile(f_rcv)
+        size = min(len(sent), len(rcv))
+        count_errors = abs(len(sent) - len(rcv))
+        offsets = []
+        with memoryview(sent) as sent_view, memoryview(rcv) as rcv_view:
+            for start in range(0, size, VERIFY_BLOCK_SIZE):
+                end = min(start + VERIFY_BLOCK_SIZE, size)
+                block_errors = CountMismatches(
+                    sent_view[start:end], rcv_view[start:end]
+                )
+                if block_errors and len(offsets) < max_report:
+                    offsets += MismatchOffsets(
+                        sent_view[start:end],
+                        rcv_view[start:end],
+                        start,
+                        max_report - len(offsets),
+                    )
+                count_errors += block_errors
+        if isinstance(sent, mmap.mmap):
+            sent.close()
+        if isinstance(rcv, mmap.mmap):
+            rcv.close()
+
+    return count_errors, offsets
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sent and received files.")
+    parser.add_argument("sent", help="sent file")
+    parser.add_argument("received", help="received file")
+    parser.add_argument(
+        "-r",
+        dest="max_report",
+        type=int,
+        default=0,
+        help="maximum number of mismatch offsets to report",
+    )
+    args = parser.parse_args()
+
+    count_errors, offsets = VerifyFiles(args.sent, args.received, args.max_report)
+    with open(args.sent, "rb") as f_sent, open(args.received, "rb") as f_rcv:
+        for offset in offsets:
+            f_sent.seek(offset)
+            f_rcv.seek(offset)
+            print(
+                "Mismatch at offset %d: %02x %02x"
+                % (offset, f_sent.read(1)[0], f_rcv.read(1)[0])
+            )
+    print("Files differ in %d bytes" % count_errors)
+    exit(1 if count_errors else 0)
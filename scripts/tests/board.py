@@ -0,0 +1,89 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""Board emulators running in threads, for end-to-end tests of the host
+functions"""
+
+import contextlib
+import threading
+from socket import AF_UNIX, SOCK_SEQPACKET
+
+from ethBase import DEFAULT_DST_ADDR, Link, LinkSocket
+from ethEmulator import AcceptUnix, BoardEmulator, ListenUnix
+
+HOST_ADDR = bytes.fromhex("02aaaaaaaa01")
+# Link timeout of host and board in seconds
+TIMEOUT = 0.05
+# Time in seconds for a board to end after the host disconnects
+JOIN_TIMEOUT = 10
+
+
+def HostLink(dst_addr=DEFAULT_DST_ADDR):
+    return Link(HOST_ADDR, dst_addr=dst_addr, timeout=TIMEOUT)
+
+
+def BoardLink(addr=DEFAULT_DST_ADDR):
+    return Link(addr, dst_addr=HOST_ADDR, timeout=TIMEOUT)
+
+
+class Board:
+    """BoardEmulator running operations in a thread, until the host disconnects"""
+
+    def __init__(self, socket, ops, memory=None, **impairments):
+        """
+        socket: LinkSocket of the board (see BoardLink)
+        ops: list of (op, arg) to run (see BoardEmulator.Run)
+        memory: data memory of the board, kept from a previous transfer
+        impairments: BoardEmulator arguments (delay, loss, seed, linger)
+        """
+        self.ops = ops
+        self.results = []
+        self.error = None
+        self.emulator = BoardEmulator(socket, **impairments)
+        if memory is not None:
+            self.emulator.memory = memory
+        self.thread = threading.Thread(target=self._Run, daemon=True)
+        self.thread.start()
+
+    def _Run(self):
+        try:
+            for op, arg in self.ops:
+                self.results.append(self.emulator.Run(op, arg))
+            self.emulator.Idle()
+        except Exception as error:
+            self.error = error
+        finally:
+            self.emulator.close()
+
+    def Join(self):
+        """Wait for the board to end, raising its error if it failed"""
+        self.thread.join(JOIN_TIMEOUT)
+        assert not self.thread.is_alive(), "board did not end"
+        if self.error is not None:
+            raise self.error
+
+
+@contextlib.contextmanager
+def PcBoard(tmp_path, ops, memory=None, **impairments):
+    """
+    Run board operations in a thread, serving the host over a PC emulation
+    socket.
+
+    tmp_path: directory for the socket
+    ops, memory, impairments: see Board
+    yield: host LinkSocket, and Board (with its results once the context
+           exits)
+    """
+    path = str(tmp_path / "socket")
+    server = ListenUnix(path)
+    host = LinkSocket(AF_UNIX, SOCK_SEQPACKET)
+    host.connect(path)
+    host.link = HostLink()
+    board = Board(AcceptUnix(server, BoardLink()), ops, memory, **impairments)
+    server.close()
+    try:
+        yield host, board
+    finally:
+        host.close()
+    board.Join()
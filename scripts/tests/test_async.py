@@ -0,0 +1,207 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import os
+import select
+import threading
+from socket import AF_UNIX, SOCK_SEQPACKET, socketpair
+
+import pytest
+
+from ethAsync import AsyncEthLink, LinkManager
+from ethBase import (
+    FormSync,
+    Link,
+    LinkSocket,
+    SelectMode,
+    TransferMode,
+    MODE_ACK,
+    MODE_SEQ,
+    SYNC_FROM_BOARD,
+)
+from ethMmsg import FRAME_BUFFER_SIZE
+
+from board import Board, BoardLink, HostLink, PcBoard
+
+BOARD_ADDR = bytes.fromhex("01606e11020f")
+OTHER_ADDR = bytes.fromhex("02cccccccc03")
+
+
+def Run(coroutine):
+    """Run coroutine, failing instead of hanging if it does not end"""
+    return asyncio.run(asyncio.wait_for(coroutine, 30))
+
+
+@pytest.fixture
+def pair():
+    """Host LinkSocket and the raw socket at the board end"""
+    a, b = socketpair(AF_UNIX, SOCK_SEQPACKET)
+    host = LinkSocket(fileno=a.detach())
+    host.link = HostLink()
+    yield host, b
+    host.close()
+    b.close()
+
+
+def test_link_queues_own_frames(pair):
+    host, board = pair
+
+    async def Main():
+        link = AsyncEthLink(host)
+        board.send(BoardLink().FormPacket(b"first"))
+        # Frames to other addresses are dropped
+        board.send(Link(BOARD_ADDR, dst_addr=OTHER_ADDR).FormPacket(b"other"))
+        board.send(BoardLink().FormPacket(b"second"))
+        first = await link._Recv(1)
+        second = await link._Recv(1)
+        with pytest.raises(asyncio.TimeoutError):
+            await link._Recv(0.05)
+        link.close()
+        return first, second
+
+    first, second = Run(Main())
+    assert first.startswith(b"first")
+    assert second.startswith(b"second")
+
+
+def test_sync_skips_late_frames(pair):
+    host, board = pair
+    mode = TransferMode(MODE_SEQ, 8, 1024)
+    offer = TransferMode(MODE_SEQ | MODE_ACK, 32, 2022)
+
+    async def Main():
+        link = AsyncEthLink(host)
+        # Late echoes of a previous transfer, queued before and after the
+        # sync is sent
+        board.send(BoardLink().FormPacket(b"late"))
+        await asyncio.sleep(0.05)
+        task = asyncio.create_task(link.sync_ack_first(mode))
+        await asyncio.sleep(0.01)
+        board.send(BoardLink().FormPacket(b"late"))
+        board.send(BoardLink().FormPacket(FormSync(offer, SYNC_FROM_BOARD)))
+        selected = await task
+        link.close()
+        return selected
+
+    assert Run(Main()) == SelectMode(mode, offer)
+
+
+def test_manager_demultiplexes(pair):
+    host, board = pair
+
+    async def Main():
+        manager = LinkManager(host)
+        first = manager.AddLink(HostLink(BOARD_ADDR))
+        second = manager.AddLink(HostLink(OTHER_ADDR))
+        with pytest.raises(ValueError):
+            manager.AddLink(HostLink(OTHER_ADDR))
+        board.send(BoardLink(OTHER_ADDR).FormPacket(b"to second"))
+        board.send(BoardLink(BOARD_ADDR).FormPacket(b"to first"))
+        # Frames from boards without link are dropped
+        board.send(BoardLink(bytes.fromhex("02dddddddd04")).FormPacket(b"none"))
+        payloads = await first._Recv(1), await second._Recv(1)
+        assert first.frames.empty() and second.frames.empty()
+        manager.close()
+        return payloads
+
+    first, second = Run(Main())
+    assert first.startswith(b"to first")
+    assert second.startswith(b"to second")
+
+
+@pytest.fixture
+def data():
+    return os.urandom(50000)
+
+
+@pytest.mark.parametrize("window", [1, 8])
+def test_transfers(tmp_path, data, window):
+    input_file = tmp_path / "input.bin"
+    input_file.write_bytes(data)
+    output_file = tmp_path / "output.bin"
+    variable_file = tmp_path / "variable.bin"
+    ops = [
+        ("rcv_file", len(data)),
+        ("send_file", data),
+        ("rcv_variable", None),
+        ("send_variable", data),
+    ]
+
+    async def Main(host):
+        link = AsyncEthLink(host)
+        # Back to back transfers: late frames of each one must not be taken
+        # for the sync of the next
+        errors = await link.send_file(str(input_file), window)
+        await link.recv_file(str(output_file), len(data), window)
+        errors += await link.send_variable(str(input_file), window)
+        await link.recv_variable(str(variable_file), window)
+        link.close()
+        return errors
+
+    with PcBoard(tmp_path, ops) as (host, board):
+        assert Run(Main(host)) == 0
+    assert board.results == [data, 0, data, 0]
+    assert output_file.read_bytes() == data
+    assert variable_file.read_bytes() == data
+
+
+def _Hub(host, boards):
+    """
+    Relay frames between host and boards sockets, as a switch would (boards
+    drop the frames to other boards), until the host disconnects.
+    """
+    sockets = [host] + boards
+    while True:
+        for s in select.select(sockets, [], [])[0]:
+            frame = s.recv(FRAME_BUFFER_SIZE)
+            if s is not host:
+                if frame:
+                    host.send(frame)
+                continue
+            if not frame:
+                for board in boards:
+                    board.close()
+                return
+            for board in boards:
+                board.send(frame)
+
+
+def test_manager_boards(tmp_path, data):
+    input_file = tmp_path / "input.bin"
+    input_file.write_bytes(data)
+    addrs = [BOARD_ADDR, OTHER_ADDR]
+    host_end, hub_host = socketpair(AF_UNIX, SOCK_SEQPACKET)
+    hub_boards = []
+    boards = []
+    for addr in addrs:
+        hub_board, board_end = socketpair(AF_UNIX, SOCK_SEQPACKET)
+        board_socket = LinkSocket(fileno=board_end.detach())
+        board_socket.link = BoardLink(addr)
+        hub_boards.append(hub_board)
+        boards.append(Board(board_socket, [("rcv_file", len(data))]))
+    hub = threading.Thread(target=_Hub, args=(hub_host, hub_boards), daemon=True)
+    hub.start()
+
+    host = LinkSocket(fileno=host_end.detach())
+    host.link = HostLink()
+
+    async def Main():
+        manager = LinkManager(host)
+        links = [manager.AddLink(HostLink(addr)) for addr in addrs]
+        errors = await asyncio.gather(
+            *(link.send_file(str(input_file), 8) for link in links)
+        )
+        manager.close()
+        return errors
+
+    try:
+        assert Run(Main()) == [0, 0]
+    finally:
+        host.close()
+    hub.join()
+    hub_host.close()
+    for board in boards:
+        board.Join()
+        assert board.results == [data]
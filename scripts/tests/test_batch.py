@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import io
+import os
+import zlib
+
+import pytest
+
+from ethBatch import (
+    BATCH_ALIGN,
+    BATCH_HEADER,
+    BATCH_STREAM,
+    BatchSource,
+    FormManifest,
+    ParseManifest,
+    UnpackBatch,
+    _OutputPath,
+)
+
+
+def _Stream(files):
+    """Get batch stream of (name, data) files"""
+    manifest, entries, size = FormManifest(
+        [(name, len(data), zlib.crc32(data)) for name, data in files]
+    )
+    stream = bytearray(size)
+    stream[: len(manifest)] = manifest
+    for entry, (_, data) in zip(entries, files):
+        stream[entry.offset : entry.offset + entry.size] = data
+    return bytes(stream), entries
+
+
+def test_manifest_round_trip():
+    files = [("a.bin", 10, 1), ("dir/b.bin", 0, 2), ("c", 1000, 3)]
+    manifest, entries, size = FormManifest(files)
+    assert [(e.name, e.size, e.crc) for e in entries] == files
+    assert all(entry.offset % BATCH_ALIGN == 0 for entry in entries)
+    assert entries[0].offset >= len(manifest)
+    assert size == entries[-1].offset + 1000
+    stream = io.BytesIO(manifest + bytes(size - len(manifest)))
+    assert ParseManifest(stream, size) == entries
+
+
+def test_manifest_repeated_name():
+    with pytest.raises(ValueError):
+        FormManifest([("a", 1, 0), ("a", 2, 0)])
+
+
+def test_manifest_invalid():
+    manifest, _, size = FormManifest([("a", 100, 0)])
+    with pytest.raises(ValueError):
+        ParseManifest(io.BytesIO(manifest[:4]), size)
+    with pytest.raises(ValueError):
+        ParseManifest(io.BytesIO(b"XXXX" + manifest[4:]), size)
+    # Truncated entry list
+    short = BATCH_HEADER.pack(b"IOBB", 2, len(manifest)) + manifest[BATCH_HEADER.size :]
+    with pytest.raises(ValueError):
+        ParseManifest(io.BytesIO(short), size)
+    # File beyond the end of the stream
+    with pytest.raises(ValueError):
+        ParseManifest(io.BytesIO(manifest), size - 1)
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["", "/etc/passwd", "../x", "a/../../x", "a//b", "a/", ".", "a/./b"]
+    + [BATCH_STREAM, BATCH_STREAM + "/x"],
+)
+def test_output_path_invalid(name):
+    with pytest.raises(ValueError):
+        _OutputPath("out", name)
+
+
+def test_output_path():
+    assert _OutputPath("out", "a/b.bin") == os.path.join("out", "a", "b.bin")
+    assert _OutputPath("out", ".hidden") == os.path.join("out", ".hidden")
+
+
+def test_batch_source(tmp_path):
+    files = [("a.bin", os.urandom(13)), ("b.bin", b""), ("c.bin", os.urandom(5000))]
+    for name, data in files:
+        (tmp_path / name).write_bytes(data)
+    source = BatchSource([str(tmp_path / name) for name, _ in files])
+    stream, _ = _Stream(files)
+    assert source.size == len(stream)
+
+    # Read in pieces that cross the manifest, padding and file boundaries
+    read = bytearray()
+    buffer = bytearray(37)
+    while True:
+        n = source.readinto(buffer)
+        if not n:
+            break
+        read += buffer[:n]
+    source.close()
+    assert read == stream
+
+
+def test_unpack(tmp_path):
+    files = [("a.bin", os.urandom(100)), ("sub/b.bin", os.urandom(3))]
+    stream, _ = _Stream(files)
+    stream_filename = tmp_path / BATCH_STREAM
+    stream_filename.write_bytes(stream)
+    entries, count_errors = UnpackBatch(str(stream_filename), str(tmp_path))
+    assert count_errors == 0
+    assert [entry.name for entry in entries] == ["a.bin", "sub/b.bin"]
+    for name, data in files:
+        assert (tmp_path / name).read_bytes() == data
+
+
+def test_unpack_crc_error(tmp_path):
+    stream, entries = _Stream([("a.bin", b"0123456789")])
+    stream = bytearray(stream)
+    stream[entries[0].offset] ^= 1
+    stream_filename = tmp_path / BATCH_STREAM
+    stream_filename.write_bytes(stream)
+    assert UnpackBatch(str(stream_filename), str(tmp_path))[1] == 1
+
+
+def test_unpack_refuses_stream(tmp_path):
+    stream, _ = _Stream([("ok.bin", b"data"), ("stream", b"data")])
+    stream_filename = tmp_path / "stream"
+    stream_filename.write_bytes(stream)
+    with pytest.raises(ValueError):
+        UnpackBatch(str(stream_filename), str(tmp_path))
+    # No file was written, and the stream is intact
+    assert not (tmp_path / "ok.bin").exists()
+    assert stream_filename.read_bytes() == stream
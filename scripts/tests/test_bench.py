@@ -0,0 +1,62 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import pytest
+
+from ethBench import Percentile, RttMeter, RunBenchmark, RunWithTimeout
+
+
+def test_percentile():
+    samples = [5, 1, 4, 2, 3]
+    assert Percentile(samples, 50) == 3
+    assert Percentile(samples, 99) == 5
+    assert Percentile(samples, 0) == 1
+    assert Percentile([], 50) is None
+
+
+def test_rtt_meter():
+    meter = RttMeter()
+    meter.Sent(0)
+    meter.Sent(1)
+    # Frame 1 is resent: its acknowledge gives no sample
+    meter.Sent(1)
+    meter.Acked(0)
+    meter.Acked(1)
+    meter.Acked(2)
+    assert len(meter.samples) == 1
+    assert meter.samples[0] >= 0
+
+
+@pytest.mark.parametrize("op", ["send_file", "rcv_file", "send_variable"])
+def test_run(tmp_path, op):
+    result = RunWithTimeout(op, 20000, 1024, 0.05, 8, str(tmp_path))
+    assert result["status"] == "ok"
+    assert result["errors"] == 0
+    assert result["frames"] == 20
+
+
+def test_run_timeout(tmp_path):
+    result = RunWithTimeout(
+        "send_file", 20000, 1024, 0.05, 8, str(tmp_path), run_timeout=0
+    )
+    assert result["status"] == "timeout"
+    assert result["window"] == 8
+
+
+def test_lossy_stop_and_wait_skipped(tmp_path):
+    result = RunWithTimeout(
+        "send_file", 20000, 1024, 0.05, 1, str(tmp_path), {"loss": 0.1}
+    )
+    assert result["status"] == "skipped"
+    assert result["loss"] == 0.1
+
+
+def test_benchmark(tmp_path):
+    logged = []
+    results = RunBenchmark(
+        ["send_file"], [10000], [1024], [0.05], [1, 8], log=logged.append
+    )
+    assert results["runs"] == logged
+    assert [run["window"] for run in results["runs"]] == [1, 8]
+    assert all(run["status"] == "ok" for run in results["runs"])
@@ -0,0 +1,50 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import io
+
+from ethBase import ETH_MINIMUM_NBYTES, FormPacket, FrameBuilder, SEQ_HEADER
+
+HEADER = bytes.fromhex("01606e11020f02aaaaaaaa016000")
+
+
+def test_write():
+    builder = FrameBuilder(HEADER, payload_size=100)
+    frame = builder.Write(b"x" * 100)
+    assert frame == FormPacket(b"x" * 100, HEADER)
+    assert builder.Payload() == b"x" * 100
+
+
+def test_padding_cleared():
+    builder = FrameBuilder(HEADER, payload_size=100)
+    builder.Write(b"x" * 100)
+    # Short frames are padded with zeros, not with previous data
+    frame = builder.Write(b"y" * 10)
+    assert len(frame) == len(HEADER) + ETH_MINIMUM_NBYTES
+    assert frame == FormPacket(b"y" * 10, HEADER)
+    assert builder.Payload() == b"y" * 10
+
+
+def test_read_into_with_prefix():
+    data = bytes(range(256)) * 4
+    f_input = io.BytesIO(data)
+    builder = FrameBuilder(HEADER, SEQ_HEADER.size, 300)
+    frames = []
+    for seq in range(4):
+        SEQ_HEADER.pack_into(builder.Prefix(), 0, seq)
+        frames.append(bytes(builder.ReadInto(f_input, 300)))
+    for seq, frame in enumerate(frames[:3]):
+        payload = data[seq * 300 : (seq + 1) * 300]
+        assert frame == FormPacket(SEQ_HEADER.pack(seq) + payload, HEADER)
+    # Last frame is short: the data left in the file
+    assert frames[3] == FormPacket(SEQ_HEADER.pack(3) + data[900:], HEADER)
+    assert builder.Payload() == data[900:]
+
+
+def test_buffer_reused():
+    builder = FrameBuilder(HEADER, payload_size=100)
+    first = builder.Write(b"a" * 100)
+    second = builder.Write(b"b" * 100)
+    # Frames are views of the same buffer
+    assert first.obj is second.obj
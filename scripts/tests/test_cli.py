@@ -0,0 +1,63 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ethBase import ETH_MINIMUM_NBYTES, MODE_ACK, MODE_CRC, MODE_SEQ, MODE_STREAM
+from ethCli import (
+    AddAckOptions,
+    AddCrcOption,
+    ArgumentParser,
+    ParseArgs,
+    RequestedMode,
+)
+
+ARGV = ["02aaaaaaaa01", "PC", "0.5"]
+
+
+def test_link():
+    args, link = ParseArgs(ArgumentParser("test"), ARGV + ["-p", "1024"])
+    assert link.src_addr == bytes.fromhex("02aaaaaaaa01")
+    assert link.interface == "PC"
+    assert link.timeout == 0.5
+    assert link.payload == args.payload == 1024
+    assert link.header[6:12] == link.src_addr
+
+
+def test_small_payload():
+    with pytest.raises(SystemExit):
+        ParseArgs(ArgumentParser("test"), ARGV + ["-p", str(ETH_MINIMUM_NBYTES - 1)])
+
+
+def test_requested_mode():
+    parser = ArgumentParser("test")
+    AddAckOptions(parser)
+    AddCrcOption(parser)
+    args, link = ParseArgs(parser, ARGV + ["-p", "1024", "-k", "4"])
+    assert args.ack_every == 4
+    # No window: legacy mode
+    assert RequestedMode(args, MODE_SEQ | MODE_ACK) == (0, 1, 1024)
+    assert RequestedMode(args, MODE_SEQ, MODE_STREAM) == (MODE_STREAM, 1, 1024)
+    args, link = ParseArgs(parser, ARGV + ["-p", "1024", "-w", "8"])
+    assert RequestedMode(args, MODE_SEQ | MODE_ACK) == (MODE_SEQ | MODE_ACK, 8, 1024)
+    args, link = ParseArgs(parser, ARGV + ["-p", "1024", "--crc"])
+    assert RequestedMode(args, 0) == (MODE_SEQ | MODE_CRC, 1, 1024)
+
+
+def test_import_does_not_parse_argv():
+    # Without arguments, the scripts used to print their usage and exit at
+    # import
+    scripts = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", "import ethBase, ethCli; print('imported')"],
+        cwd=scripts,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout == "imported\n"
@@ -0,0 +1,157 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import json
+import os
+from socket import AF_UNIX, SOCK_SEQPACKET, socketpair
+
+import pytest
+
+from ethBase import LinkSocket
+from ethDaemon import CheckJob, TransferDaemon
+
+from board import HostLink, PcBoard
+
+
+@pytest.mark.parametrize(
+    "job",
+    [
+        {"op": "status"},
+        {"op": "send_file", "file": "a.bin"},
+        {"op": "recv_file", "file": "a.bin", "size": 0, "window": 8},
+        {"op": "recv_variable", "file": "a.bin", "mmap": True, "timeout": 0.5},
+    ],
+)
+def test_valid(job):
+    CheckJob(job)
+
+
+@pytest.mark.parametrize(
+    "job",
+    [
+        ["send_file"],
+        {"op": "format_disk"},
+        {"op": "recv_file", "file": "a.bin"},
+        {"op": "send_file", "file": 1},
+        {"op": "recv_file", "file": "a.bin", "size": "10"},
+        {"op": "recv_file", "file": "a.bin", "size": True},
+        {"op": "recv_file", "file": "a.bin", "size": -1},
+        {"op": "send_file", "file": "a.bin", "window": 2.0},
+        {"op": "send_file", "file": "a.bin", "window": 0},
+        {"op": "send_file", "file": "a.bin", "mmap": 1},
+        {"op": "send_file", "file": "a.bin", "timeout": 0},
+    ],
+)
+def test_invalid(job):
+    with pytest.raises(ValueError):
+        CheckJob(job)
+
+
+@pytest.fixture
+def eth_socket():
+    """Host socket of a board that never replies"""
+    a, b = socketpair(AF_UNIX, SOCK_SEQPACKET)
+    host = LinkSocket(fileno=a.detach())
+    host.link = HostLink()
+    yield host
+    host.close()
+    b.close()
+
+
+def Serve(daemon, jobs):
+    """
+    Run daemon, submit jobs in one connection and wait for their replies.
+
+    daemon: TransferDaemon
+    jobs: list of job dicts with "id"
+    return: replies sorted by id
+    """
+
+    async def Main():
+        serve = asyncio.create_task(daemon.Serve())
+        while not os.path.exists(daemon.control_path):
+            await asyncio.sleep(0.01)
+        reader, writer = await asyncio.open_unix_connection(daemon.control_path)
+        for job in jobs:
+            writer.write(json.dumps(job).encode() + b"\n")
+        writer.write_eof()
+        replies = [json.loads(await reader.readline()) for _ in jobs]
+        writer.close()
+        serve.cancel()
+        await asyncio.gather(serve, return_exceptions=True)
+        return sorted(replies, key=lambda reply: reply["id"])
+
+    return asyncio.run(asyncio.wait_for(Main(), 30))
+
+
+def BadJob(tmp_path, job_id):
+    """Job failing at once, as its window does not fit in the sync frame"""
+    input_file = str(tmp_path / "input.bin")
+    return {"id": job_id, "op": "send_file", "file": input_file, "window": 1 << 20}
+
+
+def test_worker_survives_failing_jobs(tmp_path, eth_socket):
+    daemon = TransferDaemon(eth_socket, str(tmp_path / "control"))
+    input_file = str(tmp_path / "input.bin")
+    jobs = [
+        BadJob(tmp_path, 0),
+        # The board does not reply
+        {"id": 1, "op": "send_file", "file": input_file, "timeout": 0.2},
+        {"id": 2, "op": "recv_file", "file": input_file, "size": "10"},
+        {"id": 3, "op": "send_file", "file": input_file, "timeout": 0.2},
+    ]
+    replies = Serve(daemon, jobs)
+    assert [reply["status"] for reply in replies] == ["error"] * 4
+    assert "no frames from the board" in replies[1]["message"]
+    assert "no frames from the board" in replies[3]["message"]
+    assert "wrong type" in replies[2]["message"]
+
+
+def test_worker_replies_if_not_recorded(tmp_path, eth_socket, capsys):
+    # The stats file can not be opened
+    stats = tmp_path / "stats"
+    stats.mkdir()
+    daemon = TransferDaemon(
+        eth_socket, str(tmp_path / "control"), stats_path=str(stats)
+    )
+    jobs = [BadJob(tmp_path, i) for i in range(3)]
+    replies = Serve(daemon, jobs)
+    assert [reply["status"] for reply in replies] == ["error"] * 3
+    assert "not recorded" in capsys.readouterr().out
+
+
+def test_worker_records_jobs(tmp_path, eth_socket, capsys):
+    stats = tmp_path / "stats.jsonl"
+    daemon = TransferDaemon(
+        eth_socket, str(tmp_path / "control"), stats_path=str(stats)
+    )
+    jobs = [BadJob(tmp_path, i) for i in range(2)]
+    Serve(daemon, jobs)
+    records = [json.loads(line) for line in stats.read_text().splitlines()]
+    assert [record["job"] for record in records] == jobs
+    # '-' is stdout, not a file named '-'
+    daemon = TransferDaemon(eth_socket, str(tmp_path / "control"), stats_path="-")
+    Serve(daemon, [BadJob(tmp_path, 2)])
+    record = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert record["job"] == BadJob(tmp_path, 2)
+    assert not os.path.exists("-")
+
+
+def test_worker_transfers(tmp_path):
+    data = os.urandom(50000)
+    input_file = tmp_path / "input.bin"
+    input_file.write_bytes(data)
+    output_file = tmp_path / "output.bin"
+    jobs = [
+        {"id": 0, "op": "send_file", "file": str(input_file), "window": 8},
+        {"id": 1, "op": "recv_file", "file": str(output_file), "size": len(data)},
+    ]
+    ops = [("rcv_file", len(data)), ("send_file", data)]
+    with PcBoard(tmp_path, ops) as (host, board):
+        daemon = TransferDaemon(host, str(tmp_path / "control"))
+        replies = Serve(daemon, jobs)
+    assert [reply["status"] for reply in replies] == ["ok", "ok"]
+    assert board.results == [data, 0]
+    assert output_file.read_bytes() == data
@@ -0,0 +1,232 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""Transfers between the host functions and a BoardEmulator over the PC
+emulation socket"""
+
+import json
+import os
+import zlib
+
+import pytest
+
+from ethBase import (
+    LEGACY_MODE,
+    MODE_ACK,
+    MODE_CRC,
+    MODE_RESUME,
+    MODE_SEQ,
+    MODE_STREAM,
+    SocketStats,
+    SyncAckFirst,
+    SyncAckLast,
+    TransferMode,
+)
+from ethBatch import RcvBatch, SendBatch, UnpackBatch
+from ethCheckpoint import CHECKPOINT_SUFFIX
+from ethRcvData import RcvFile
+from ethRcvVariableData import RcvVariableFile, RcvVariableStream
+from ethSendData import SendFile
+from ethSendVariableData import SendVariableFile, SendVariableStream
+
+from board import PcBoard
+
+
+@pytest.fixture
+def data():
+    # Not a multiple of the frame data size
+    return os.urandom(50000)
+
+
+@pytest.fixture
+def input_file(tmp_path, data):
+    path = tmp_path / "input.bin"
+    path.write_bytes(data)
+    return str(path)
+
+
+def Mode(flags, window=8, payload=1024):
+    return TransferMode(flags, window, payload)
+
+
+@pytest.mark.parametrize(
+    "flags, window",
+    [(0, 1), (MODE_SEQ, 1), (MODE_SEQ, 8), (MODE_SEQ | MODE_CRC, 8)],
+    ids=["legacy", "seq", "windowed", "crc"],
+)
+def test_send_file(tmp_path, data, input_file, flags, window):
+    with PcBoard(tmp_path, [("rcv_file", len(data))]) as (host, board):
+        mode = SyncAckFirst(host, Mode(flags, window))
+        assert mode.flags == flags
+        assert SendFile(host, input_file, mode) == 0
+    assert board.results[0] == data
+
+
+@pytest.mark.parametrize(
+    "flags",
+    [0, MODE_SEQ, MODE_SEQ | MODE_ACK, MODE_SEQ | MODE_CRC],
+    ids=["legacy", "windowed", "ack", "crc"],
+)
+def test_rcv_file(tmp_path, data, flags):
+    output = tmp_path / "output.bin"
+    with PcBoard(tmp_path, [("send_file", data)]) as (host, board):
+        mode = SyncAckLast(host, Mode(flags) if flags else LEGACY_MODE)
+        assert mode.flags == flags
+        RcvFile(host, str(output), len(data), mode)
+    assert board.results[0] == 0
+    assert output.read_bytes() == data
+
+
+def test_send_file_lossy(tmp_path, data, input_file):
+    # The board lingers so that lost final echoes are resent
+    impairments = {"loss": 0.02, "seed": 1, "linger": 0.3}
+    with PcBoard(tmp_path, [("rcv_file", len(data))], **impairments) as (host, board):
+        mode = SyncAckFirst(host, Mode(MODE_SEQ | MODE_CRC))
+        assert SendFile(host, input_file, mode) == 0
+        stats = SocketStats(host)
+    assert board.results[0] == data
+    assert stats.retransmits > 0
+
+
+def test_rcv_file_ack_lossy(tmp_path, data):
+    output = tmp_path / "output.bin"
+    with PcBoard(tmp_path, [("send_file", data)], loss=0.02, seed=2) as (host, board):
+        mode = SyncAckLast(host, Mode(MODE_SEQ | MODE_ACK))
+        RcvFile(host, str(output), len(data), mode)
+    assert output.read_bytes() == data
+
+
+def test_send_resume(tmp_path, data, input_file):
+    # The board kept the first part of an interrupted transfer
+    offset = 20000
+    memory = bytearray(len(data))
+    memory[:offset] = data[:offset]
+    with open(input_file + CHECKPOINT_SUFFIX, "w") as f:
+        json.dump(
+            {"size": len(data), "offset": offset, "crc": zlib.crc32(data[:offset])},
+            f,
+        )
+    with PcBoard(tmp_path, [("rcv_file", len(data))], memory) as (host, board):
+        mode = SyncAckFirst(host, Mode(MODE_SEQ | MODE_RESUME))
+        assert mode.flags == MODE_SEQ | MODE_RESUME
+        assert SendFile(host, input_file, mode) == 0
+        stats = SocketStats(host)
+    assert board.results[0] == data
+    assert stats.bytes_sent == len(data) - offset
+    assert not os.path.exists(input_file + CHECKPOINT_SUFFIX)
+
+
+def test_send_resume_mismatch(tmp_path, data, input_file):
+    # The board data does not match the checkpoint: the transfer starts over
+    offset = 20000
+    with open(input_file + CHECKPOINT_SUFFIX, "w") as f:
+        json.dump(
+            {"size": len(data), "offset": offset, "crc": zlib.crc32(data[:offset])},
+            f,
+        )
+    memory = bytearray(len(data))
+    with PcBoard(tmp_path, [("rcv_file", len(data))], memory) as (host, board):
+        mode = SyncAckFirst(host, Mode(MODE_SEQ | MODE_RESUME))
+        assert SendFile(host, input_file, mode) == 0
+        stats = SocketStats(host)
+    assert board.results[0] == data
+    assert stats.bytes_sent == len(data)
+
+
+def test_send_variable(tmp_path, data, input_file):
+    with PcBoard(tmp_path, [("rcv_variable", None)]) as (host, board):
+        mode = SyncAckFirst(host, Mode(MODE_SEQ | MODE_STREAM))
+        SendVariableFile(host, input_file, mode)
+    assert board.results[0] == data
+
+
+def test_rcv_variable(tmp_path, data):
+    output = tmp_path / "output.bin"
+    with PcBoard(tmp_path, [("send_variable", data)]) as (host, board):
+        mode = SyncAckLast(host, Mode(MODE_SEQ | MODE_ACK | MODE_STREAM))
+        RcvVariableFile(host, str(output), mode)
+    assert board.results[0] == 0
+    assert output.read_bytes() == data
+
+
+def test_send_stream(tmp_path, data):
+    # Stream of unknown length, in segments
+    chunks = (data[i : i + 3000] for i in range(0, len(data), 3000))
+    with PcBoard(tmp_path, [("rcv_variable", None)]) as (host, board):
+        mode = SyncAckFirst(host, Mode(MODE_SEQ | MODE_STREAM))
+        assert mode.flags & MODE_STREAM
+        assert SendVariableStream(host, chunks, None, mode, 16384) == 0
+    assert board.results[0] == data
+
+
+def test_send_stream_full_segments(tmp_path):
+    # Ends with an empty end-of-stream segment
+    data = os.urandom(4 * 8192)
+    with PcBoard(tmp_path, [("rcv_variable", None)]) as (host, board):
+        mode = SyncAckFirst(host, Mode(MODE_SEQ | MODE_STREAM))
+        SendVariableStream(host, [data], None, mode, 8192)
+    assert board.results[0] == data
+
+
+def test_rcv_stream(tmp_path):
+    # More than one board segment
+    data = os.urandom(150000)
+    output = tmp_path / "output.bin"
+    with PcBoard(tmp_path, [("send_stream", data)]) as (host, board):
+        mode = SyncAckLast(host, Mode(MODE_SEQ | MODE_ACK | MODE_STREAM))
+        RcvVariableFile(host, str(output), mode)
+        stats = SocketStats(host)
+    assert board.results[0] == 0
+    assert output.read_bytes() == data
+    # Stats cover the whole stream, not only its last segment
+    assert stats.bytes_received == len(data)
+
+
+def test_rcv_variable_stream(tmp_path, data):
+    pieces = []
+    with PcBoard(tmp_path, [("send_variable", data)]) as (host, board):
+        mode = SyncAckLast(host, Mode(MODE_SEQ | MODE_ACK | MODE_STREAM))
+        assert RcvVariableStream(host, pieces.append, mode) == len(data)
+    assert b"".join(pieces) == data
+
+
+@pytest.fixture
+def batch_files(tmp_path):
+    files = {"a.bin": os.urandom(3000), "b.bin": b"", "c.bin": os.urandom(12345)}
+    directory = tmp_path / "input"
+    directory.mkdir()
+    for name, contents in files.items():
+        (directory / name).write_bytes(contents)
+    return files, [str(directory / name) for name in files]
+
+
+def test_send_batch(tmp_path, batch_files):
+    files, filenames = batch_files
+    with PcBoard(tmp_path, [("rcv_variable", None)]) as (host, board):
+        mode = SyncAckFirst(host, Mode(MODE_SEQ | MODE_STREAM))
+        assert SendBatch(host, filenames, mode) == 0
+    stream = tmp_path / "stream"
+    stream.write_bytes(board.results[0])
+    output = tmp_path / "output"
+    entries, count_errors = UnpackBatch(str(stream), str(output))
+    assert count_errors == 0
+    for name, contents in files.items():
+        assert (output / name).read_bytes() == contents
+
+
+def test_rcv_batch(tmp_path, batch_files):
+    files, filenames = batch_files
+    # Batch stream sent by the board, formed by the host batch sender
+    with PcBoard(tmp_path, [("rcv_variable", None)]) as (host, board):
+        SendBatch(host, filenames, SyncAckFirst(host, Mode(MODE_SEQ)))
+    stream = board.results[0]
+
+    output = tmp_path / "output"
+    with PcBoard(tmp_path, [("send_variable", stream)]) as (host, board):
+        mode = SyncAckLast(host, Mode(MODE_SEQ | MODE_ACK | MODE_STREAM))
+        entries, count_errors = RcvBatch(host, str(output), mode)
+    assert count_errors == 0
+    assert sorted(os.listdir(output)) == sorted(files)
+    for name, contents in files.items():
+        assert (output / name).read_bytes() == contents
@@ -0,0 +1,59 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import zlib
+
+import pytest
+
+from ethFile import OpenSink, OpenSource, StreamSink, StreamSource
+
+
+def test_stream_source():
+    source = StreamSource([b"abc", memoryview(b"defgh"), b"", b"ij"])
+    buffer = bytearray(4)
+    read = []
+    while True:
+        n = source.readinto(buffer)
+        read.append(bytes(buffer[:n]))
+        if n < len(buffer):
+            break
+    assert read == [b"abcd", b"efgh", b"ij"]
+    assert source.pos == 10
+    source.seek(10)
+    with pytest.raises(OSError):
+        source.seek(0)
+
+
+def test_stream_sink_in_order():
+    pieces = []
+    sink = StreamSink(pieces.append)
+    # Frames received out of order are held until the data before them
+    sink.seek(4)
+    sink.write(b"efgh")
+    sink.seek(8)
+    sink.write(b"ij")
+    assert pieces == []
+    sink.seek(0)
+    sink.write(bytearray(b"abcd"))
+    assert b"".join(pieces) == b"abcdefghij"
+    assert sink.done == 10
+    assert sink.crc == zlib.crc32(b"abcdefghij")
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_sink_and_source(tmp_path, use_mmap):
+    data = bytes(range(256)) * 20
+    filename = str(tmp_path / "data")
+    sink = OpenSink(filename, len(data), use_mmap)
+    sink.seek(1000)
+    sink.write(data[1000:])
+    sink.seek(0)
+    sink.write(data[:1000])
+    sink.close()
+
+    source = OpenSource(filename, use_mmap)
+    buffer = bytearray(len(data))
+    assert source.readinto(buffer) == len(data)
+    source.close()
+    assert buffer == data
@@ -0,0 +1,59 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+from socket import AF_UNIX, SOCK_SEQPACKET, socketpair
+
+from ethFilter import BPF_RET_K, AttachFilter, FilterProgram
+
+ETH_TYPE = 0x6000
+DST_ADDR = bytes.fromhex("02aaaaaaaa01")
+OTHER_ADDR = bytes.fromhex("02cccccccc03")
+SRC_ADDR = bytes.fromhex("02bbbbbbbb02")
+
+
+def test_program():
+    program = FilterProgram(ETH_TYPE)
+    assert len(program) == 4
+    assert program[-1] == (BPF_RET_K, 0, 0, 0)
+    program = FilterProgram(ETH_TYPE, DST_ADDR)
+    assert len(program) == 8
+    # Every failed check jumps to the drop instruction
+    drop = len(program) - 1
+    for i, (_, jt, jf, _) in enumerate(program[:-2]):
+        if i % 2:
+            assert i + 1 + jf == drop
+
+
+def _Filtered(dst_addr):
+    """Get frames that pass the filter of a socket, out of a set of frames"""
+    frames = [
+        DST_ADDR + SRC_ADDR + b"\x60\x00" + b"a" * 50,
+        OTHER_ADDR + SRC_ADDR + b"\x60\x00" + b"b" * 50,
+        DST_ADDR + SRC_ADDR + b"\x08\x00" + b"c" * 50,
+        OTHER_ADDR + SRC_ADDR + b"\x60\x00" + b"d" * 50,
+        # Same last 2 address bytes, different first 4
+        bytes.fromhex("03aaaaaaaa01") + SRC_ADDR + b"\x60\x00" + b"e" * 50,
+    ]
+    # Socket filters run on unix sockets too, on the data of each message
+    a, b = socketpair(AF_UNIX, SOCK_SEQPACKET)
+    AttachFilter(b, ETH_TYPE, dst_addr)
+    for frame in frames:
+        a.send(frame)
+    a.close()
+    received = []
+    while True:
+        frame = b.recv(4096)
+        if not frame:
+            break
+        received.append(frame)
+    b.close()
+    return [frame[14:15] for frame in received]
+
+
+def test_filter_type():
+    assert _Filtered(None) == [b"a", b"b", b"d", b"e"]
+
+
+def test_filter_type_and_address():
+    assert _Filtered(DST_ADDR) == [b"a"]
@@ -0,0 +1,120 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import struct
+import zlib
+
+import pytest
+
+from ethBase import (
+    CheckData,
+    CRC_HEADER,
+    FormAck,
+    FormResume,
+    FormSize,
+    FormSync,
+    FormVerdict,
+    LEGACY_MODE,
+    MODE_ACK,
+    MODE_CRC,
+    MODE_SEQ,
+    MODE_STREAM,
+    ParseResume,
+    ParseSize,
+    ParseSync,
+    SEQ_HEADER,
+    SIZE_FRAME,
+    SIZE_LEGACY_MAX,
+    SIZE_MORE,
+    SelectMode,
+    SYNC_FROM_BOARD,
+    SYNC_FROM_HOST,
+    SyncPayload,
+    TransferMode,
+    VERDICT_BAD,
+    VERDICT_FRAME,
+    VERDICT_OK,
+)
+
+STREAM_MODE = TransferMode(MODE_SEQ | MODE_STREAM, 8, 1024)
+
+
+def test_size_legacy_round_trip():
+    payload = FormSize(LEGACY_MODE, 1234)
+    assert payload == struct.pack("<i", 1234)
+    assert ParseSize(payload, LEGACY_MODE) == (1234, 0)
+
+
+def test_size_legacy_limits():
+    assert ParseSize(FormSize(LEGACY_MODE, SIZE_LEGACY_MAX), LEGACY_MODE) == (
+        SIZE_LEGACY_MAX,
+        0,
+    )
+    with pytest.raises(ValueError):
+        FormSize(LEGACY_MODE, SIZE_LEGACY_MAX + 1)
+    with pytest.raises(ValueError):
+        FormSize(LEGACY_MODE, 10, SIZE_MORE)
+
+
+def test_size_stream_round_trip():
+    size = (1 << 40) + 5
+    payload = FormSize(STREAM_MODE, size, SIZE_MORE)
+    assert len(payload) == SIZE_FRAME.size
+    assert ParseSize(payload, STREAM_MODE) == (size, SIZE_MORE)
+    # Received payloads may be views of a receive buffer (e.g. an RxRing)
+    padded = bytearray(payload) + bytes(64)
+    assert ParseSize(memoryview(padded), STREAM_MODE) == (size, SIZE_MORE)
+
+
+def test_size_stream_invalid():
+    with pytest.raises(ValueError):
+        ParseSize(bytes(SIZE_FRAME.size), STREAM_MODE)
+
+
+def test_resume_round_trip():
+    payload = FormResume(4096, 0xDEADBEEF, SYNC_FROM_BOARD)
+    assert ParseResume(payload) == (4096, 0xDEADBEEF)
+    assert ParseResume(memoryview(payload + bytes(32))) == (4096, 0xDEADBEEF)
+    # Requests of the host are not replies of the board
+    assert ParseResume(FormResume(4096, 1)) is None
+    assert ParseResume(FormResume(4096, 1), SYNC_FROM_HOST) == (4096, 1)
+    assert ParseResume(payload[:-1]) is None
+    assert ParseResume(bytes(64)) is None
+
+
+def test_verdict():
+    assert VERDICT_FRAME.unpack(FormVerdict(7, True)) == (7, VERDICT_OK)
+    assert VERDICT_FRAME.unpack(FormVerdict(8, False)) == (8, VERDICT_BAD)
+
+
+def test_check_data():
+    data = b"some frame data"
+    payload = SEQ_HEADER.pack(3) + CRC_HEADER.pack(0x12345678) + data
+    assert not CheckData(payload, len(data))
+    payload = SEQ_HEADER.pack(3) + CRC_HEADER.pack(zlib.crc32(data)) + data
+    assert CheckData(payload + bytes(16), len(data))
+
+
+def test_sync_round_trip():
+    mode = TransferMode(MODE_SEQ | MODE_ACK, 16, 1400)
+    assert ParseSync(FormSync(mode, SYNC_FROM_BOARD)) == mode
+    assert ParseSync(FormSync(mode)) is None
+    assert ParseSync(FormSync(mode), SYNC_FROM_HOST) == mode
+    assert ParseSync(b"") is None
+    assert SyncPayload(LEGACY_MODE) == b""
+
+
+def test_select_mode():
+    mode = TransferMode(MODE_SEQ | MODE_ACK | MODE_CRC, 32, 1500)
+    offered = TransferMode(MODE_SEQ | MODE_CRC | MODE_STREAM, 8, 2022)
+    assert SelectMode(mode, offered) == TransferMode(MODE_SEQ | MODE_CRC, 8, 1500)
+    assert SelectMode(mode, None) == LEGACY_MODE
+
+
+def test_form_ack():
+    received = bytearray(40)
+    received[0:3] = b"\1\1\1"
+    received[4] = 1
+    received[35] = 1
+    assert FormAck(received, 3) == struct.pack("<II", 3, 1 | 1 << 31)
@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+from socket import AF_UNIX, SOCK_SEQPACKET, socketpair
+
+import pytest
+
+from ethBase import ETH_MINIMUM_NBYTES, Link, LinkSocket, RecvFrames, SendFrames
+from ethMmsg import MmsgAvailable, MmsgReceiver, SendMmsg
+
+HOST_ADDR = bytes.fromhex("02aaaaaaaa01")
+BOARD_ADDR = bytes.fromhex("02bbbbbbbb02")
+
+needs_mmsg = pytest.mark.skipif(
+    not MmsgAvailable(), reason="sendmmsg/recvmmsg not available"
+)
+
+
+@pytest.fixture
+def pair():
+    """Connected sockets, as ends of the link"""
+    a, b = socketpair(AF_UNIX, SOCK_SEQPACKET)
+    yield a, b
+    a.close()
+    b.close()
+
+
+@needs_mmsg
+def test_mmsg(pair):
+    a, b = pair
+    packets = [bytes([i]) * (60 + i) for i in range(20)]
+    packets.append(bytearray(b"writable"))
+    packets.append(memoryview(bytearray(b"view")))
+    SendMmsg(a.fileno(), packets)
+
+    receiver = MmsgReceiver(8)
+    received = []
+    while True:
+        frames = receiver.Recv(b.fileno())
+        if not frames:
+            break
+        assert len(frames) <= 8
+        received += frames
+    assert received == [bytes(packet) for packet in packets]
+
+
+@needs_mmsg
+def test_mmsg_empty(pair):
+    a, b = pair
+    SendMmsg(a.fileno(), [])
+    assert MmsgReceiver(4).Recv(b.fileno()) == []
+
+
+def _LinkSockets(pair):
+    host, board = (LinkSocket(fileno=s.detach()) for s in pair)
+    host.link = Link(HOST_ADDR, dst_addr=BOARD_ADDR)
+    board.link = Link(BOARD_ADDR, dst_addr=HOST_ADDR)
+    return host, board
+
+
+def test_send_recv_frames(pair):
+    host, board = _LinkSockets(pair)
+    payloads = [bytes([i]) * 100 for i in range(10)] + [b"short"]
+    SendFrames(board, payloads)
+    # Frames to other addresses are dropped
+    other = Link(BOARD_ADDR, dst_addr=bytes.fromhex("02cccccccc03"))
+    board.send(other.FormPacket(b"not for host"))
+    SendFrames(board, [b"last"])
+
+    received = []
+    while True:
+        frames = RecvFrames(host, 4, 0.1)
+        if not frames:
+            break
+        assert len(frames) <= 4
+        received += [bytes(frame) for frame in frames]
+    padding = bytes(ETH_MINIMUM_NBYTES - len(b"short"))
+    assert received[:10] == payloads[:10]
+    assert received[10] == b"short" + padding
+    assert received[11].startswith(b"last")
+    assert len(received) == 12
+    host.close()
+    board.close()
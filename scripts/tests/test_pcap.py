@@ -0,0 +1,55 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import struct
+
+import pytest
+
+from ethPcap import (
+    PCAP_HEADER,
+    PCAP_MAGIC_US,
+    PCAP_RECORD,
+    PCAPNG_MAGIC,
+    PcapWriter,
+    ReadPcap,
+)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "capture.pcap")
+    frames = [bytes(range(64)), b"\xff" * 1514, b"x" * 60]
+    writer = PcapWriter(path)
+    writer.Write(frames[0], 1700000000123456789)
+    writer.WriteFrames(frames[1:])
+    writer.close()
+
+    records = list(ReadPcap(path))
+    assert [frame for _, frame in records] == frames
+    assert records[0][0] == 1700000000123456789
+    assert records[1][0] == records[2][0]
+
+
+def test_microseconds_big_endian(tmp_path):
+    path = tmp_path / "capture.pcap"
+    header = struct.Struct(">" + PCAP_HEADER.format)
+    record = struct.Struct(">" + PCAP_RECORD.format)
+    path.write_bytes(
+        header.pack(PCAP_MAGIC_US, 2, 4, 0, 0, 65535, 1)
+        + record.pack(12, 345, 3, 3)
+        + b"abc"
+        # Truncated record at the end of the file
+        + record.pack(13, 0, 10, 10)
+        + b"abc"
+    )
+    assert list(ReadPcap(str(path))) == [(12000345000, b"abc")]
+
+
+def test_not_pcap(tmp_path):
+    path = tmp_path / "capture.pcapng"
+    path.write_bytes(struct.pack("<I", PCAPNG_MAGIC) + bytes(28))
+    with pytest.raises(ValueError, match="pcapng"):
+        list(ReadPcap(str(path)))
+    path.write_bytes(b"short")
+    with pytest.raises(ValueError):
+        list(ReadPcap(str(path)))
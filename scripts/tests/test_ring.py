@@ -0,0 +1,52 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+"""Raw sockets on the loopback interface (needs CAP_NET_RAW)"""
+
+import pytest
+
+from ethBase import CreateRawSocket, Link, RecvFrames, SendFrames, SendPackets
+
+HOST_ADDR = bytes.fromhex("02aaaaaaaa01")
+BOARD_ADDR = bytes.fromhex("02bbbbbbbb02")
+
+
+def _Sockets(rx_ring):
+    try:
+        host = CreateRawSocket(Link(HOST_ADDR, "lo", dst_addr=BOARD_ADDR), rx_ring)
+    except PermissionError:
+        pytest.skip("raw sockets not permitted")
+    board = CreateRawSocket(Link(BOARD_ADDR, "lo", dst_addr=HOST_ADDR))
+    return host, board
+
+
+@pytest.mark.parametrize("rx_ring", [False, True], ids=["recv", "ring"])
+def test_loopback(rx_ring):
+    host, board = _Sockets(rx_ring)
+    payloads = [bytes([i]) * 100 for i in range(50)]
+    SendFrames(board, payloads[:25])
+    # Frames of other types or to other addresses are filtered out
+    header = BOARD_ADDR + HOST_ADDR
+    SendPackets(
+        board,
+        [
+            bytes.fromhex("02cccccccc03") + HOST_ADDR + b"\x60\x00" + bytes(50),
+            HOST_ADDR + BOARD_ADDR + b"\x08\x00" + bytes(50),
+            header + b"\x60\x00" + bytes(50),
+        ],
+    )
+    SendFrames(board, payloads[25:])
+
+    received = []
+    while True:
+        frames = RecvFrames(host, 16, 0.2)
+        if not frames:
+            break
+        # Ring frames are only valid until the next receive
+        received += [bytes(frame) for frame in frames]
+    # Loopback delivers the frames sent by other sockets twice: as sent, and
+    # as received
+    assert list(dict.fromkeys(received)) == payloads
+    host.close()
+    board.close()
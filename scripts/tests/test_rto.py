@@ -0,0 +1,60 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import pytest
+
+from ethRto import RTO_ALPHA, RTO_BETA, RTO_K, RtoEstimator
+
+
+def test_initial():
+    rto = RtoEstimator(0.5)
+    assert rto.rto == 0.5
+    assert rto.srtt is None
+
+
+def test_first_sample():
+    rto = RtoEstimator(1.0)
+    rto.Sample(0.1)
+    assert rto.srtt == 0.1
+    assert rto.rttvar == 0.05
+    assert rto.rto == pytest.approx(0.1 + RTO_K * 0.05)
+
+
+def test_later_samples():
+    rto = RtoEstimator(1.0)
+    rto.Sample(0.1)
+    rto.Sample(0.2)
+    rttvar = 0.05 + RTO_BETA * (abs(0.1 - 0.2) - 0.05)
+    srtt = 0.1 + RTO_ALPHA * (0.2 - 0.1)
+    assert rto.rttvar == pytest.approx(rttvar)
+    assert rto.srtt == pytest.approx(srtt)
+    assert rto.rto == pytest.approx(srtt + RTO_K * rttvar)
+
+
+def test_clamp():
+    rto = RtoEstimator(1.0, minimum=0.01, maximum=2.0)
+    rto.Sample(1e-6)
+    assert rto.rto == 0.01
+    rto.Sample(10.0)
+    assert rto.rto == 2.0
+
+
+def test_backoff():
+    rto = RtoEstimator(0.1, maximum=0.5)
+    rto.Backoff()
+    assert rto.rto == pytest.approx(0.2)
+    rto.Backoff()
+    rto.Backoff()
+    assert rto.rto == 0.5
+    # A new sample clears the backoff
+    rto.Sample(0.01)
+    assert rto.rto == pytest.approx(0.03)
+
+
+def test_fixed():
+    rto = RtoEstimator(0.1, adaptive=False)
+    rto.Sample(0.5)
+    rto.Backoff()
+    assert rto.rto == 0.1
+    assert rto.srtt is None
@@ -0,0 +1,52 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import pytest
+
+from ethSimRing import CreateSimRing, FRAME_LENGTH, SimRing
+
+
+def test_empty(tmp_path):
+    ring = CreateSimRing(str(tmp_path / "ring"), 64)
+    assert ring.Get() is None
+    ring.close()
+
+
+def test_wrap_around(tmp_path):
+    path = str(tmp_path / "ring")
+    producer = CreateSimRing(path, 64)
+    consumer = SimRing(path)
+    # Frames of 2 + 21 bytes do not divide the ring, so they wrap around at
+    # every offset, length and data alike
+    for i in range(50):
+        frame = bytes([i]) * 21
+        assert producer.Put(frame)
+        assert consumer.Get() == frame
+    assert consumer.Get() is None
+    producer.close()
+    consumer.close()
+
+
+def test_full(tmp_path):
+    ring = CreateSimRing(str(tmp_path / "ring"), 64)
+    frame = bytes(range(30))
+    assert ring.Put(frame)
+    assert ring.Put(frame)
+    # 2 * (2 + 30) bytes fill the ring
+    assert not ring.Put(b"x")
+    assert ring.Get() == frame
+    assert ring.Put(b"x" * (32 - FRAME_LENGTH.size))
+    assert ring.Get() == frame
+    assert ring.Get() == b"x" * 30
+    assert ring.Get() is None
+    ring.close()
+
+
+def test_invalid(tmp_path):
+    with pytest.raises(ValueError):
+        CreateSimRing(str(tmp_path / "ring"), 100)
+    path = tmp_path / "other"
+    path.write_bytes(bytes(256))
+    with pytest.raises(ValueError):
+        SimRing(str(path))
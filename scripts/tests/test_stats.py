@@ -0,0 +1,78 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+from ethStats import PHASE_DATA, TransferStats
+
+
+def test_new_transfer_resets():
+    stats = TransferStats()
+    stats.BeginSync()
+    stats.BeginData(10)
+    stats.Received(10, 1000)
+    stats.Progress(10)
+    stats.End()
+    stats.BeginSync()
+    assert stats.bytes_received == 0
+    assert (stats.done, stats.total) == (0, 0)
+
+
+def test_summary():
+    stats = TransferStats()
+    stats.BeginSync()
+    stats.BeginData(10)
+    stats.Received(10, 1000)
+    stats.Timeout()
+    stats.Progress(7)
+    stats.End()
+    summary = stats.Summary()
+    assert summary["bytes_received"] == 1000
+    assert summary["frames_received"] == 10
+    assert summary["timeouts"] == 1
+    assert (summary["frames_done"], summary["frames_total"]) == (7, 10)
+
+
+def test_segments_keep_counters():
+    stats = TransferStats()
+    stats.BeginSync()
+    stats.BeginData(10)
+    stats.Received(10, 1000)
+    stats.Timeout()
+    stats.Progress(10)
+    stats.End()
+    # Next segment of a stream
+    stats.BeginSync(True)
+    stats.BeginData(4)
+    assert stats.phase == PHASE_DATA
+    assert (stats.done, stats.total) == (10, 14)
+    stats.Received(4, 300)
+    stats.Progress(3)
+    stats.End()
+
+    summary = stats.Summary()
+    assert summary["bytes_received"] == 1300
+    assert summary["frames_received"] == 14
+    assert summary["timeouts"] == 1
+    assert (summary["frames_done"], summary["frames_total"]) == (13, 14)
+
+
+def test_data_without_sync():
+    stats = TransferStats()
+    stats.BeginData(5)
+    stats.Sent(5, 500)
+    stats.End()
+    stats.BeginData(2)
+    assert stats.bytes_sent == 0
+    assert stats.total == 2
+
+
+def test_rtt():
+    stats = TransferStats()
+    for seconds in (100e-6, 200e-6, 300e-6, 5e-3):
+        stats.Rtt(seconds)
+    summary = stats.Summary()
+    assert summary["rtt_samples"] == 4
+    assert summary["rtt_min_us"] == 100
+    assert summary["rtt_max_us"] == 5000
+    assert summary["rtt_p50_us"] == 256
+    assert summary["rtt_p99_us"] == 5000
@@ -0,0 +1,91 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+import os
+import zlib
+
+import ethVerify
+import pytest
+
+from ethVerify import (
+    CountMismatches,
+    FileCrc32,
+    MismatchOffsets,
+    SAME_BLOCK_SIZE,
+    VerifyFiles,
+)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """Run with and without NumPy"""
+    if request.param == "numpy":
+        if ethVerify.numpy is None:
+            pytest.skip("NumPy not installed")
+    else:
+        monkeypatch.setattr(ethVerify, "numpy", None)
+    return request.param
+
+
+def test_count_mismatches(backend):
+    sent = bytes(range(256)) * 4
+    rcv = bytearray(sent)
+    assert CountMismatches(sent, rcv) == 0
+    for offset in (0, 7, 300, 1023):
+        rcv[offset] ^= 0xFF
+    assert CountMismatches(sent, rcv) == 4
+    assert CountMismatches(memoryview(sent), memoryview(rcv)) == 4
+    # Only the common length is compared
+    assert CountMismatches(sent, rcv[:100]) == 2
+
+
+def test_views_over_blocks(backend):
+    # Views are compared block by block
+    sent = os.urandom(3 * SAME_BLOCK_SIZE + 100)
+    rcv = bytearray(sent)
+    assert CountMismatches(memoryview(sent), memoryview(rcv)) == 0
+    rcv[-1] ^= 1
+    assert CountMismatches(memoryview(sent), memoryview(rcv)) == 1
+    assert MismatchOffsets(memoryview(sent), memoryview(rcv)) == [len(sent) - 1]
+    # Only the common length is compared
+    assert CountMismatches(memoryview(sent), memoryview(rcv)[:-1]) == 0
+
+
+def test_mismatch_offsets(backend):
+    sent = bytes(1000)
+    rcv = bytearray(sent)
+    for offset in (1, 500, 999):
+        rcv[offset] = 1
+    assert MismatchOffsets(sent, rcv) == [1, 500, 999]
+    assert MismatchOffsets(sent, rcv, base=100, limit=2) == [101, 600]
+    assert MismatchOffsets(sent, rcv, limit=0) == []
+    assert MismatchOffsets(sent, sent) == []
+
+
+def test_file_crc32(tmp_path):
+    data = bytes(range(256)) * 100
+    path = tmp_path / "data"
+    path.write_bytes(data)
+    with open(path, "rb") as f:
+        assert FileCrc32(f, len(data)) == zlib.crc32(data)
+        assert FileCrc32(f, 1000, 500) == zlib.crc32(data[500:1500])
+        crc = FileCrc32(f, 500)
+        assert FileCrc32(f, 1000, 500, crc) == zlib.crc32(data[:1500])
+
+
+def test_verify_files(tmp_path):
+    data = bytes(range(256)) * 100
+    sent = tmp_path / "sent"
+    rcv = tmp_path / "rcv"
+    sent.write_bytes(data)
+    rcv.write_bytes(data)
+    assert VerifyFiles(str(sent), str(rcv))[0] == 0
+    changed = bytearray(data)
+    changed[10] ^= 1
+    changed[20000] ^= 1
+    rcv.write_bytes(changed)
+    assert VerifyFiles(str(sent), str(rcv), 1) == (2, [10])
+    # Missing bytes count as errors
+    rcv.write_bytes(data[:-5])
+    assert VerifyFiles(str(sent), str(rcv))[0] == 5
@@ -22,6 +22,7 @@ import sys
 sys.path.append("../../")
 from submodules.ETHERNET.software.python.ethBase import (
     CreateSocket,
+    Link,
     SyncAckFirst,
     SyncAckLast,
 )
@@ -44,7 +45,7 @@ if __name__ == "__main__":
         rcv_file_size = int(sys.argv[4])
         rcv_file_var = sys.argv[5]
 
-    socket = CreateSocket()
+    socket = CreateSocket(Link(sys.argv[2], sys.argv[1]))
 
     # Receive Data File
     print("\nReceiving data...")
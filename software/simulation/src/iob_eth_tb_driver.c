@@ -7,110 +7,150 @@
 #include "iob_eth_tb_driver.h"
 #include "iob_eth.h"
 #include "iob_eth_defines.h"
+#include <errno.h>
+#include <fcntl.h>
+#include <stdint.h>
 #include <stdio.h>
 #include <stdlib.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
 #include <unistd.h>
 
-static FILE *eth2soc_fd;
-static FILE *soc2eth_fd;
+// Frame ring in a memory-mapped file, shared with eth2file
+struct sim_ring {
+  unsigned char *map;
+  volatile uint32_t *head;
+  volatile uint32_t *tail;
+  unsigned char *data;
+  uint32_t mask;
+};
+
+static struct sim_ring eth2soc_ring; // frames to the core
+static struct sim_ring soc2eth_ring; // frames from the core
+static int soc2eth_bell_fd;
 
 static void cpu_initeth(int base_address);
-static void relay_frame_file_2_eth();
-static void relay_frame_eth_2_file(int frame_size);
+static void ring_open(struct sim_ring *ring, const char *path);
+static void relay_frame_ring_2_eth();
+static int relay_frame_eth_2_ring(int frame_size);
 
 // Call this function once at start up
 void eth_setup(int base_address) {
   // configure eth
   cpu_initeth(base_address);
 
-  while ((eth2soc_fd = fopen("./eth2soc", "rb")) == NULL)
-    ;
-  fclose(eth2soc_fd);
-  soc2eth_fd = fopen("./soc2eth", "wb");
+  // eth2file creates the ring to the core last
+  ring_open(&eth2soc_ring, "./eth2soc");
+  ring_open(&soc2eth_ring, "./soc2eth");
+  soc2eth_bell_fd = open("./soc2eth.bell", O_WRONLY | O_NONBLOCK);
+  if (soc2eth_bell_fd < 0) {
+    perror("./soc2eth.bell");
+    exit(1);
+  }
 }
 
-// Call this function in main loop to keep relaying frames form file to core and
-// vice versa
+// Call this function in main loop to keep relaying frames form ring to core
+// and vice versa
 void eth_relay_frames() {
   int rx_nbytes_reg = 0;
 
-  // Relay ethernet frames from core to file
+  // Relay ethernet frames from core to ring
   rx_nbytes_reg = iob_eth_csrs_get_rx_nbytes();
   if (rx_nbytes_reg) {
     // printf("$eth2file sending %d bytes.\n", rx_nbytes_reg); // DEBUG
-    relay_frame_eth_2_file(rx_nbytes_reg);
-    // printf("$eth2file_done\n"); // DEBUG
-  }
-  // Relay ethernet frames from file to core
-  if (eth_tx_ready(0)) {
-    // Try to open file
-    eth2soc_fd = fopen("./eth2soc", "rb");
-    if (!eth2soc_fd) {
-      // wait 1 ms and try again
-      usleep(1000);
-      eth2soc_fd = fopen("./eth2soc", "rb");
-      if (!eth2soc_fd) {
-        fclose(soc2eth_fd);
+    // frame stays in the core until there is space for it in the ring
+    if (relay_frame_eth_2_ring(rx_nbytes_reg)) {
+      // wake eth2file; if the pipe is full, it is awake already
+      if (write(soc2eth_bell_fd, "", 1) < 0 && errno != EAGAIN) {
+        perror("./soc2eth.bell");
         exit(1);
       }
     }
-    // Read file contents
-    relay_frame_file_2_eth();
+    // printf("$eth2file_done\n"); // DEBUG
   }
+  // Relay ethernet frames from ring to core
+  if (eth_tx_ready(0))
+    relay_frame_ring_2_eth();
 }
 
 //
 // Local functions
 //
 
-static void relay_frame_file_2_eth() {
-  unsigned char size_l, size_h, frame_byte;
+static void ring_open(struct sim_ring *ring, const char *path) {
+  int fd;
+  struct stat st;
+
+  // wait for eth2file to create the ring (it appears complete)
+  while ((fd = open(path, O_RDWR)) < 0)
+    usleep(1000);
+  fstat(fd, &st);
+  ring->map = (unsigned char *)mmap(NULL, st.st_size, PROT_READ | PROT_WRITE,
+                                    MAP_SHARED, fd, 0);
+  close(fd);
+  if (ring->map == MAP_FAILED || *(uint32_t *)ring->map != SIM_RING_MAGIC) {
+    printf("%s is not a frame ring\n", path);
+    exit(1);
+  }
+  ring->head = (volatile uint32_t *)&ring->map[SIM_RING_HEAD_OFFSET];
+  ring->tail = (volatile uint32_t *)&ring->map[SIM_RING_TAIL_OFFSET];
+  ring->data = &ring->map[SIM_RING_DATA_OFFSET];
+  ring->mask = *(uint32_t *)&ring->map[SIM_RING_CAPACITY_OFFSET] - 1;
+}
+
+static void relay_frame_ring_2_eth() {
+  uint32_t head, tail;
   unsigned short int frame_size;
-  unsigned int i, n;
+  unsigned int i;
+
+  // Check for a frame (read head before the frame it covers)
+  head = __atomic_load_n(eth2soc_ring.head, __ATOMIC_ACQUIRE);
+  tail = *eth2soc_ring.tail;
+  if (head == tail)
+    return;
 
   // Read frame size (2 bytes)
-  n = fscanf(eth2soc_fd, "%c%c", &size_l, &size_h);
-  // Continue if size read successfully
-  if (n == 2) {
-    frame_size = (size_h << 8) | size_l;
-    // printf("$file2eth received %d bytes.\n", frame_size); // DEBUG
-    //  wait for ready
-    while (!eth_tx_ready(0))
-      ;
-    // set frame size
-    eth_set_payload_size(0, frame_size);
-    // Set ready bit
-    eth_set_ready(0, 1);
-
-    // Read RAW frame from binary encoded file, byte by byte
-    for (i = 0; i < frame_size; i = i) {
-      n = fscanf(eth2soc_fd, "%c", &frame_byte);
-      if (n > 0) {
-        iob_eth_csrs_set_frame_word(frame_byte);
-        i = i + 1;
-      }
-    }
-    fclose(eth2soc_fd);
-    // Delete frame from file
-    eth2soc_fd = fopen("./eth2soc", "wb");
-    // printf("$file2eth_done\n"); // DEBUG
-  } // n != 0
-  fclose(eth2soc_fd);
+  frame_size = eth2soc_ring.data[tail & eth2soc_ring.mask] |
+               (eth2soc_ring.data[(tail + 1) & eth2soc_ring.mask] << 8);
+  tail += SIM_RING_LENGTH_LEN;
+  // printf("$file2eth received %d bytes.\n", frame_size); // DEBUG
+  // set frame size
+  eth_set_payload_size(0, frame_size);
+  // Set ready bit
+  eth_set_ready(0, 1);
+
+  // Copy RAW frame from ring to core, byte by byte
+  for (i = 0; i < frame_size; i++)
+    iob_eth_csrs_set_frame_word(
+        eth2soc_ring.data[(tail + i) & eth2soc_ring.mask]);
+
+  // Free frame space (after reading the frame)
+  __atomic_store_n(eth2soc_ring.tail, tail + frame_size, __ATOMIC_RELEASE);
+  // printf("$file2eth_done\n"); // DEBUG
 }
 
-static void relay_frame_eth_2_file(int frame_size) {
-  char frame_byte;
+static int relay_frame_eth_2_ring(int frame_size) {
+  uint32_t head, tail;
   unsigned int i;
 
+  // Check for space (read tail before overwriting the space it frees)
+  head = *soc2eth_ring.head;
+  tail = __atomic_load_n(soc2eth_ring.tail, __ATOMIC_ACQUIRE);
+  if (SIM_RING_LENGTH_LEN + frame_size > soc2eth_ring.mask + 1 - (head - tail))
+    return 0;
+
   // Write two bytes with frame size
-  fprintf(soc2eth_fd, "%c%c", frame_size & 0xff, (frame_size >> 8) & 0x07);
+  soc2eth_ring.data[head & soc2eth_ring.mask] = frame_size & 0xff;
+  soc2eth_ring.data[(head + 1) & soc2eth_ring.mask] = (frame_size >> 8) & 0x07;
+  head += SIM_RING_LENGTH_LEN;
 
-  // Read frame bytes from core and write to file
-  for (i = 0; i < frame_size; i = i + 1) {
-    frame_byte = iob_eth_csrs_get_frame_word();
-    fprintf(soc2eth_fd, "%c", frame_byte);
-  }
-  fflush(soc2eth_fd);
+  // Read frame bytes from core and write to ring
+  for (i = 0; i < frame_size; i = i + 1)
+    soc2eth_ring.data[(head + i) & soc2eth_ring.mask] =
+        iob_eth_csrs_get_frame_word();
+
+  // Publish frame (after writing it)
+  __atomic_store_n(soc2eth_ring.head, head + frame_size, __ATOMIC_RELEASE);
 
   // Wait for BD status update (via ready/empty bit)
   while (!eth_rx_ready(64))
@@ -122,6 +162,8 @@ static void relay_frame_eth_2_file(int frame_size) {
 
   // Mark empty to allow receive next frame
   eth_set_empty(64, 1);
+
+  return 1;
 }
 
 static void cpu_initeth(int base_address) {
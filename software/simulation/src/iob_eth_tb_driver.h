@@ -7,7 +7,36 @@
 #ifndef H_IOB_ETH_TB_DRIVER_H
 #define H_IOB_ETH_TB_DRIVER_H
 
+/** @file iob_eth_tb_driver.h
+ * @brief Relay of frames between the core and the eth2file script, through
+ * shared-memory rings (one per direction) in memory-mapped files.
+ *
+ * Ring file layout (see scripts/ethSimRing.py): magic, capacity of the data
+ * area (power of two), head (bytes written by the producer) and tail (bytes
+ * read by the consumer), each in its own cache line, then the data area.
+ * Each frame is a 16-bit length followed by the frame bytes, wrapping around
+ * the end of the data area.
+ */
+
+#define SIM_RING_MAGIC 0x52424f49 /**< "IOBR" */
+#define SIM_RING_CAPACITY_OFFSET 4
+#define SIM_RING_HEAD_OFFSET 64
+#define SIM_RING_TAIL_OFFSET 128
+#define SIM_RING_DATA_OFFSET 192
+#define SIM_RING_LENGTH_LEN 2 /**< Size of the length before each frame */
+
+/**
+ * @brief Map the rings created by eth2file, waiting for them to exist, and
+ * configure the core.
+ *
+ * @param base_address Base address of the core.
+ */
 void eth_setup(int base_address);
+
+/**
+ * @brief Relay one frame in each direction, if available. Call in the main
+ * loop of the testbench; it never blocks.
+ */
 void eth_relay_frames();
 
 #endif // H_IOB_ETH_TB_DRIVER_H
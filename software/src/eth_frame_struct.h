@@ -36,3 +36,173 @@
  * @brief Length of the Ethernet header.
  */
 #define HDR_LEN (2 * IOB_ETH_MAC_ADDR_LEN + 2)
+
+/**
+ * @def ETH_PREAMBLE_SFD_LEN
+ * @brief Length of the preamble and start frame delimiter, kept in the core
+ * buffer before the frame.
+ */
+#define ETH_PREAMBLE_SFD_LEN 8
+/**
+ * @def ETH_CRC_LEN
+ * @brief Length of the frame check sequence.
+ */
+#define ETH_CRC_LEN 4
+/**
+ * @def ETH_MAX_NBYTES
+ * @brief Largest payload that fits the core frame buffer, offered during sync
+ * (payloads above ETH_NBYTES need jumbo frames on the host interface).
+ */
+#define ETH_MAX_NBYTES                                                         \
+  ((1 << IOB_ETH_BUFFER_W) - ETH_PREAMBLE_SFD_LEN - HDR_LEN - ETH_CRC_LEN)
+
+/**
+ * @def ETH_SYNC_MAGIC
+ * @brief Magic bytes at the start of a sync frame that negotiates the
+ * transfer mode.
+ */
+#define ETH_SYNC_MAGIC "IOBE"
+/**
+ * @def ETH_SYNC_MAGIC_LEN
+ * @brief Length of the sync frame magic bytes.
+ */
+#define ETH_SYNC_MAGIC_LEN 4
+/**
+ * @def ETH_SYNC_VERSION
+ * @brief Version of the sync frame format.
+ */
+#define ETH_SYNC_VERSION 1
+/**
+ * @def ETH_SYNC_FROM_HOST
+ * @brief Sync frame sender: host PC.
+ */
+#define ETH_SYNC_FROM_HOST 1
+/**
+ * @def ETH_SYNC_FROM_BOARD
+ * @brief Sync frame sender: board.
+ */
+#define ETH_SYNC_FROM_BOARD 2
+
+/** @name Sync Frame Pointers
+ *  @{
+ */
+#define ETH_SYNC_VERSION_PTR 4 /**< Format version pointer */
+#define ETH_SYNC_SENDER_PTR 5  /**< Sender pointer */
+#define ETH_SYNC_FLAGS_PTR 6   /**< Transfer mode flags pointer */
+#define ETH_SYNC_WINDOW_PTR 8  /**< Window (16 bits) pointer */
+#define ETH_SYNC_PAYLOAD_PTR 10 /**< Payload size (16 bits, 0 for ETH_NBYTES) */
+/** @} */
+
+/** @name Transfer Mode Flags
+ *  @{
+ */
+#define ETH_MODE_SEQ (1 << 0) /**< Sequence-numbered frames in flight */
+#define ETH_MODE_ACK (1 << 1) /**< Compact ack frames instead of data echo */
+#define ETH_MODE_CRC (1 << 2)    /**< CRC32 verdicts instead of data echo */
+#define ETH_MODE_RESUME (1 << 3) /**< Resume request before data frames */
+#define ETH_MODE_STREAM (1 << 4) /**< Versioned size frame (variable size) */
+#define ETH_MODE_SUPPORTED                                                     \
+  (ETH_MODE_SEQ | ETH_MODE_ACK | ETH_MODE_CRC | ETH_MODE_RESUME |              \
+   ETH_MODE_STREAM) /**< Flags supported by driver */
+/** @} */
+
+/**
+ * @def ETH_SYNC_WINDOW_MAX
+ * @brief Maximum number of frames in flight offered when sending.
+ */
+#define ETH_SYNC_WINDOW_MAX 32
+
+/**
+ * @def ETH_SEQ_LEN
+ * @brief Length of the sequence number at the start of each data frame
+ * payload (ETH_MODE_SEQ).
+ */
+#define ETH_SEQ_LEN 4
+
+/** @name Ack Frame Pointers (ETH_MODE_ACK)
+ *  @{
+ */
+#define ETH_ACK_CUM_PTR 0  /**< Number of frames received in order */
+#define ETH_ACK_SACK_PTR 4 /**< Bitmask of frames received after those */
+#define ETH_ACK_SACK_BITS 32 /**< Number of bits in selective ack bitmask */
+/** @} */
+
+/** @name Data Check Pointers (ETH_MODE_CRC)
+ *  Data frames carry the CRC32 of their data after the sequence number, and
+ *  are answered with a verdict frame. A digest frame with sequence number
+ *  equal to the number of data frames and the CRC32 of the whole file
+ *  follows the data frames.
+ *  @{
+ */
+#define ETH_DATA_CRC_PTR 4 /**< CRC32 (as zlib crc32) of the frame data */
+#define ETH_DATA_CRC_LEN 4 /**< Length of the CRC32 of the frame data */
+#define ETH_VERDICT_PTR 4  /**< Verdict, after the sequence number */
+#define ETH_VERDICT_OK 1   /**< Data matches its CRC32 */
+#define ETH_VERDICT_BAD 2  /**< Data does not match its CRC32 */
+/** @} */
+
+/**
+ * @def ETH_RESUME_MAGIC
+ * @brief Magic bytes at the start of a resume frame (ETH_MODE_RESUME). The
+ * host asks to resume the transfer at an offset, with the CRC32 of the data
+ * before it; the board replies with the offset it resumes at (0 if its data
+ * before the offset does not match).
+ */
+#define ETH_RESUME_MAGIC "IOBK"
+
+/** @name Resume Frame Pointers (ETH_MODE_RESUME)
+ *  @{
+ */
+#define ETH_RESUME_SENDER_PTR 4 /**< Sender pointer (as in sync frames) */
+#define ETH_RESUME_OFFSET_PTR 8 /**< Offset to resume the transfer at */
+#define ETH_RESUME_CRC_PTR 12   /**< CRC32 of the data before the offset */
+/** @} */
+
+/**
+ * @def ETH_SIZE_MAGIC
+ * @brief Magic bytes at the start of the size frame of variable size
+ * transfers (ETH_MODE_STREAM; the size is a 32-bit integer otherwise).
+ * Streams of unknown length are sent in segments, each a variable size
+ * transfer with ETH_SIZE_MORE set, except the last. A last size frame of 0
+ * bytes (no data follows) is the end-of-stream frame.
+ */
+#define ETH_SIZE_MAGIC "IOBS"
+
+/** @name Size Frame Pointers (ETH_MODE_STREAM)
+ *  @{
+ */
+#define ETH_SIZE_VERSION_PTR 4 /**< Size frame version */
+#define ETH_SIZE_FLAGS_PTR 5   /**< Size frame flags */
+#define ETH_SIZE_PTR 8         /**< Size of the data (64-bit) */
+#define ETH_SIZE_VERSION 1     /**< Size frame version sent */
+#define ETH_SIZE_MORE (1 << 0) /**< More segments of the stream follow */
+/** @} */
+
+/**
+ * @def ETH_BATCH_MAGIC
+ * @brief Magic bytes at the start of a batch of files, transferred as one
+ * variable size file: a manifest with an entry per file, followed by the
+ * files, each at an offset aligned to ETH_BATCH_ALIGN bytes.
+ */
+#define ETH_BATCH_MAGIC "IOBB"
+
+/**
+ * @def ETH_BATCH_ALIGN
+ * @brief Alignment of the files in a batch, so they can be used in place.
+ */
+#define ETH_BATCH_ALIGN 8
+
+/** @name Batch Manifest Pointers
+ *  The manifest header is followed by one entry per file, each followed by
+ *  the NUL-terminated file name.
+ *  @{
+ */
+#define ETH_BATCH_COUNT_PTR 4     /**< Number of files */
+#define ETH_BATCH_MANIFEST_PTR 8  /**< Manifest size, with the header */
+#define ETH_BATCH_HEADER_LEN 12   /**< Length of the manifest header */
+#define ETH_BATCH_OFFSET_PTR 0    /**< Offset of the file in the batch */
+#define ETH_BATCH_SIZE_PTR 4      /**< File size */
+#define ETH_BATCH_CRC_PTR 8       /**< CRC32 (as zlib crc32) of the file */
+#define ETH_BATCH_NAME_LEN_PTR 12 /**< Name length, with the NUL */
+#define ETH_BATCH_ENTRY_LEN 14    /**< Length of an entry, before the name */
+/** @} */
@@ -46,6 +46,17 @@ static void set_int(char *ptr, unsigned int i_val) {
   return;
 }
 
+/* read 16 bit value */
+static unsigned int get_short(char *ptr) {
+  return ((unsigned char)ptr[1] << 8) | (unsigned char)ptr[0];
+}
+
+/* write 16 bit value to ptr position */
+static void set_short(char *ptr, unsigned int s_val) {
+  ptr[0] = s_val & 0xFF;
+  ptr[1] = (s_val >> 8) & 0xFF;
+}
+
 static void print_buffer(char *buffer, int size) {
   if (buffer == NULL || size < 1) {
     printf("DEBUG print buffer: invalid inputs\n");
@@ -331,7 +342,7 @@ int eth_rcv_frame(char *data_rcv, unsigned int size, int timeout) {
 
   // Alloc memory for frame
   volatile char *frame_ptr =
-      (volatile char *)(*mem_alloc)(HDR_LEN + ETH_NBYTES + 4);
+      (volatile char *)(*mem_alloc)(HDR_LEN + ETH_MAX_NBYTES + 4);
 
   // Copy template to frame
   // for (i=0; i < TEMPLATE_LEN; i++)
@@ -394,44 +405,329 @@ int eth_rcv_frame(char *data_rcv, unsigned int size, int timeout) {
 }
 
 #define MAX(A, B) ((A) > (B) ? (A) : (B))
+#define MIN(A, B) ((A) < (B) ? (A) : (B))
+
+// One bit per frame in ETH_MODE_SEQ transfers
+#define BITMAP_GET(map, n) ((map)[(n) >> 3] & (1 << ((n)&7)))
+#define BITMAP_SET(map, n) ((map)[(n) >> 3] |= 1 << ((n)&7))
 
 static unsigned int rcv_timeout = 500000;
-static char buffer[ETH_NBYTES + HDR_LEN];
+static char buffer[ETH_MAX_NBYTES + HDR_LEN];
+
+// Transfer mode negotiated in the last sync
+static unsigned int sync_flags = 0;
+static unsigned int sync_window = 1;
+static unsigned int sync_payload = ETH_NBYTES;
+
+// Offset the transfer resumed at, and CRC32 of the data before it
+// (ETH_MODE_RESUME)
+static unsigned int resume_offset = 0;
+static unsigned int resume_crc = 0;
 
 void eth_set_receive_timeout(unsigned int timeout) { rcv_timeout = timeout; }
 
-static void SyncAckFirst() {
+/* check if ptr holds a sync frame from given sender
+ * return 1 if valid, 0 otherwise */
+static int get_sync(char *ptr, unsigned int sender) {
+  int i;
+  for (i = 0; i < ETH_SYNC_MAGIC_LEN; i++)
+    if (ptr[i] != ETH_SYNC_MAGIC[i])
+      return 0;
+  return ptr[ETH_SYNC_VERSION_PTR] == ETH_SYNC_VERSION &&
+         ptr[ETH_SYNC_SENDER_PTR] == sender;
+}
+
+/* write sync frame with current transfer mode to ptr position */
+static void set_sync(char *ptr, unsigned int sender) {
+  int i;
+  for (i = 0; i < ETH_MINIMUM_NBYTES; i++)
+    ptr[i] = 0;
+  for (i = 0; i < ETH_SYNC_MAGIC_LEN; i++)
+    ptr[i] = ETH_SYNC_MAGIC[i];
+  ptr[ETH_SYNC_VERSION_PTR] = ETH_SYNC_VERSION;
+  ptr[ETH_SYNC_SENDER_PTR] = sender;
+  ptr[ETH_SYNC_FLAGS_PTR] = sync_flags;
+  set_short(&ptr[ETH_SYNC_WINDOW_PTR], sync_window);
+  set_short(&ptr[ETH_SYNC_PAYLOAD_PTR], sync_payload);
+}
+
+/* get payload size from sync frame at ptr, limited to what fits the buffer */
+static unsigned int get_sync_payload(char *ptr) {
+  unsigned int payload = get_short(&ptr[ETH_SYNC_PAYLOAD_PTR]);
+  // Hosts without payload size negotiation send 0
+  if (payload == 0)
+    payload = ETH_NBYTES;
+  return MAX(MIN(payload, ETH_MAX_NBYTES), ETH_MINIMUM_NBYTES);
+}
+
+// CRC32 lookup table, built on first use (ETH_MODE_CRC)
+static unsigned int crc_table[256];
+
+/* update CRC32 (as zlib crc32, 0 at the start) with size bytes at ptr */
+static unsigned int crc32_update(unsigned int crc, char *ptr,
+                                 unsigned int size) {
+  unsigned int c;
+  int i, j;
+  if (!crc_table[1])
+    for (i = 0; i < 256; i++) {
+      c = i;
+      for (j = 0; j < 8; j++)
+        c = (c & 1) ? 0xEDB88320 ^ (c >> 1) : c >> 1;
+      crc_table[i] = c;
+    }
+  crc = ~crc;
+  for (i = 0; i < size; i++)
+    crc = crc_table[(crc ^ (unsigned char)ptr[i]) & 0xFF] ^ (crc >> 8);
+  return ~crc;
+}
+
+/* length of the fields before the data in ETH_MODE_SEQ frames */
+static unsigned int data_prefix_len() {
+  if (sync_flags & ETH_MODE_CRC)
+    return ETH_SEQ_LEN + ETH_DATA_CRC_LEN;
+  return ETH_SEQ_LEN;
+}
+
+/* send verdict on frame seq (ETH_MODE_CRC), formed in buffer */
+static void send_verdict(unsigned int seq, int ok) {
+  int i;
+  for (i = 0; i < ETH_MINIMUM_NBYTES; i++)
+    buffer[i] = 0;
+  set_int(buffer, seq);
+  buffer[ETH_VERDICT_PTR] = ok ? ETH_VERDICT_OK : ETH_VERDICT_BAD;
+  eth_send_frame(buffer, ETH_MINIMUM_NBYTES);
+}
+
+/* check if ptr holds a resume request from the host
+ * return 1 if valid, 0 otherwise */
+static int get_resume(char *ptr) {
+  int i;
+  for (i = 0; i < ETH_SYNC_MAGIC_LEN; i++)
+    if (ptr[i] != ETH_RESUME_MAGIC[i])
+      return 0;
+  return ptr[ETH_RESUME_SENDER_PTR] == ETH_SYNC_FROM_HOST;
+}
+
+/* send resume reply with the offset the transfer resumed at, formed in
+ * buffer */
+static void send_resume() {
+  int i;
+  for (i = 0; i < ETH_MINIMUM_NBYTES; i++)
+    buffer[i] = 0;
+  for (i = 0; i < ETH_SYNC_MAGIC_LEN; i++)
+    buffer[i] = ETH_RESUME_MAGIC[i];
+  buffer[ETH_RESUME_SENDER_PTR] = ETH_SYNC_FROM_BOARD;
+  set_int(&buffer[ETH_RESUME_OFFSET_PTR], resume_offset);
+  set_int(&buffer[ETH_RESUME_CRC_PTR], resume_crc);
+  eth_send_frame(buffer, ETH_MINIMUM_NBYTES);
+}
+
+/* wait for the host resume request and reply with the offset to resume at:
+ * the requested one if the data before it matches the host CRC32, 0
+ * otherwise (ETH_MODE_RESUME)
+ * repeat_sync: repeat the sync reply if the host sends its sync again
+ * return offset to resume at */
+static unsigned int eth_resume(char *data, int size, int repeat_sync) {
+  unsigned int crc;
+
+  while (1) {
+    // wait to receive frame
+    while (eth_rcv_frame(buffer, ETH_MINIMUM_NBYTES, rcv_timeout))
+      ;
+    if (get_resume(buffer))
+      break;
+    if (repeat_sync && get_sync(buffer, ETH_SYNC_FROM_HOST)) {
+      set_sync(buffer, ETH_SYNC_FROM_BOARD);
+      eth_send_frame(buffer, ETH_MINIMUM_NBYTES);
+    }
+  }
+
+  get_int(&buffer[ETH_RESUME_OFFSET_PTR], &resume_offset);
+  get_int(&buffer[ETH_RESUME_CRC_PTR], &crc);
+  if (resume_offset >= size || crc32_update(0, data, resume_offset) != crc)
+    resume_offset = 0;
+  resume_crc = crc32_update(0, data, resume_offset);
+  send_resume();
+
+  return resume_offset;
+}
+
+/* check if ptr holds the empty ack of hosts without mode negotiation
+ * return 1 if empty, 0 otherwise */
+static int get_empty(char *ptr) {
+  int i;
+  for (i = 0; i < ETH_MINIMUM_NBYTES; i++)
+    if (ptr[i])
+      return 0;
+  return 1;
+}
+
+/* need_sync: only accept a sync frame from the host, or the empty ack of hosts
+ * without mode negotiation, skipping late frames of a previous transfer */
+static void SyncAckFirst(int need_sync) {
+  // Offer supported transfer modes
+  sync_flags = ETH_MODE_SUPPORTED;
+  sync_window = ETH_SYNC_WINDOW_MAX;
+  sync_payload = ETH_MAX_NBYTES;
+
   while (1) {
-    // Send frame
+    // Send frame, formed again as skipped frames overwrite it
+    set_sync(buffer, ETH_SYNC_FROM_BOARD);
     eth_send_frame(
         buffer,
         ETH_MINIMUM_NBYTES); // Do not care what we send, any frame is the ack
 
-    // Wait to receive ack
-    if (eth_rcv_frame(buffer, ETH_MINIMUM_NBYTES, rcv_timeout) == ETH_DATA_RCV)
+    // Wait to receive ack, except resume requests sent after a sync reply
+    // that was lost
+    if (eth_rcv_frame(buffer, ETH_MINIMUM_NBYTES, rcv_timeout) ==
+            ETH_DATA_RCV &&
+        !get_resume(buffer) &&
+        (!need_sync || get_sync(buffer, ETH_SYNC_FROM_HOST) ||
+         get_empty(buffer)))
       break;
   }
+
+  // Use the transfer mode selected by the host, if any
+  if (get_sync(buffer, ETH_SYNC_FROM_HOST)) {
+    sync_flags = buffer[ETH_SYNC_FLAGS_PTR] & ETH_MODE_SUPPORTED;
+    sync_window =
+        MIN(get_short(&buffer[ETH_SYNC_WINDOW_PTR]), ETH_SYNC_WINDOW_MAX);
+    sync_payload = get_sync_payload(buffer);
+  } else {
+    sync_flags = 0;
+    sync_window = 1;
+    sync_payload = ETH_NBYTES;
+  }
 }
 
-static void SyncAckLast() {
+/* need_sync: only accept a sync frame from the host, skipping late frames of
+ * a previous transfer (the host is known to negotiate modes) */
+static void SyncAckLast(int need_sync) {
   // Wait to receive frame
   while (1) {
     // Wait to receive ack
-    if (eth_rcv_frame(buffer, ETH_MINIMUM_NBYTES, rcv_timeout) == ETH_DATA_RCV)
+    if (eth_rcv_frame(buffer, ETH_MINIMUM_NBYTES, rcv_timeout) ==
+            ETH_DATA_RCV &&
+        (!need_sync || get_sync(buffer, ETH_SYNC_FROM_HOST)))
       break;
   }
 
+  // Accept the transfer mode requested by the host, if any
+  if (get_sync(buffer, ETH_SYNC_FROM_HOST)) {
+    sync_flags = buffer[ETH_SYNC_FLAGS_PTR] & ETH_MODE_SUPPORTED;
+    sync_window = get_short(&buffer[ETH_SYNC_WINDOW_PTR]);
+    sync_payload = get_sync_payload(buffer);
+    set_sync(buffer, ETH_SYNC_FROM_BOARD);
+  } else {
+    sync_flags = 0;
+    sync_window = 1;
+    sync_payload = ETH_NBYTES;
+  }
+
   eth_send_frame(
       buffer,
       ETH_MINIMUM_NBYTES); // Do not care what we send, any frame is the ack
 }
 
+// Receive sequence-numbered frames in any order (ETH_MODE_SEQ). With
+// ETH_MODE_CRC, check each frame and the whole file against their CRC32.
+static unsigned int eth_rcv_file_seq(char *data, int size) {
+  int check = sync_flags & ETH_MODE_CRC;
+  int prefix_len = data_prefix_len();
+  int chunk_size = sync_payload - prefix_len;
+  int num_frames = ((size - 1) / chunk_size) + 1;
+  unsigned int seq, bytes_to_receive, crc;
+  int count_frames = 0;
+  // whether the file matches the digest, -1 until it arrives (ETH_MODE_CRC)
+  int digest_ok = -1;
+  int i, ok;
+
+  // One bit per frame, set when frame is received
+  unsigned char *received =
+      (unsigned char *)(*mem_alloc)((num_frames + 7) / 8);
+  for (i = 0; i < (num_frames + 7) / 8; i++)
+    received[i] = 0;
+
+  while (count_frames < num_frames || (check && digest_ok < 0)) {
+    // wait to receive frame
+    while (eth_rcv_frame(buffer, sync_payload, rcv_timeout))
+      ;
+
+    // repeat sync reply if the host did not get it
+    if (get_sync(buffer, ETH_SYNC_FROM_HOST)) {
+      set_sync(buffer, ETH_SYNC_FROM_BOARD);
+      eth_send_frame(buffer, ETH_MINIMUM_NBYTES);
+      continue;
+    }
+
+    // repeat resume reply if the host did not get it
+    if ((sync_flags & ETH_MODE_RESUME) && get_resume(buffer)) {
+      send_resume();
+      continue;
+    }
+
+    get_int(buffer, &seq);
+    get_int(&buffer[ETH_DATA_CRC_PTR], &crc);
+
+    // digest, sent once all data frames are acknowledged (ETH_MODE_CRC)
+    if (check && seq == num_frames && count_frames == num_frames) {
+      digest_ok = crc32_update(0, data, size) == crc;
+      send_verdict(seq, digest_ok);
+      continue;
+    }
+
+    // ignore frames from other transfers
+    if (seq >= num_frames)
+      continue;
+
+    // check if it is last packet (has less data that full payload size)
+    if (seq == (num_frames - 1))
+      bytes_to_receive = size - seq * chunk_size;
+    else
+      bytes_to_receive = chunk_size;
+
+    // copy data, unless frame was resent because its ack was lost
+    ok = 1;
+    if (!BITMAP_GET(received, seq)) {
+      if (check)
+        ok = crc32_update(0, &buffer[prefix_len], bytes_to_receive) == crc;
+      if (ok) {
+        for (i = 0; i < bytes_to_receive; i++)
+          data[seq * chunk_size + i] = buffer[prefix_len + i];
+        BITMAP_SET(received, seq);
+        count_frames++;
+      }
+    }
+
+    // send verdict, or frame back as ack, including sequence number
+    if (check)
+      send_verdict(seq, ok);
+    else
+      eth_send_frame(buffer,
+                     MAX(ETH_SEQ_LEN + bytes_to_receive, ETH_MINIMUM_NBYTES));
+  }
+
+  if (check && !digest_ok)
+    printf("Error, received file does not match the digest\n");
+
+  (*mem_free)(received);
+
+  return size;
+}
+
 static unsigned int eth_rcv_file_impl(char *data, int size) {
-  int num_frames = ((size - 1) / ETH_NBYTES) + 1;
+  int num_frames = ((size - 1) / sync_payload) + 1;
   unsigned int bytes_to_receive;
   unsigned int count_bytes = 0;
+  unsigned int offset = 0;
   int i, j;
 
+  if (sync_flags & ETH_MODE_SEQ) {
+    if (sync_flags & ETH_MODE_RESUME)
+      offset = eth_resume(data, size, 1);
+    return offset + eth_rcv_file_seq(&data[offset], size - offset);
+  }
+
   // Loop to receive intermediate data frames
   for (j = 0; j < num_frames; j++) {
 
@@ -439,7 +735,7 @@ static unsigned int eth_rcv_file_impl(char *data, int size) {
     if (j == (num_frames - 1))
       bytes_to_receive = size - count_bytes;
     else
-      bytes_to_receive = ETH_NBYTES;
+      bytes_to_receive = sync_payload;
 
     // wait to receive frame
     while (eth_rcv_frame(&data[count_bytes], bytes_to_receive, rcv_timeout))
@@ -456,13 +752,181 @@ static unsigned int eth_rcv_file_impl(char *data, int size) {
   return count_bytes;
 }
 
+// Send chunk 'seq' of data with its sequence number (ETH_MODE_SEQ). With
+// ETH_MODE_CRC, also its CRC32, or, for seq equal to the number of frames, the
+// digest of the whole data.
+static void eth_send_frame_seq(char *data, int size, unsigned int seq) {
+  int prefix_len = data_prefix_len();
+  int chunk_size = sync_payload - prefix_len;
+  int num_frames = ((size - 1) / chunk_size) + 1;
+  unsigned int bytes_to_send, frame_size, crc;
+  int i;
+
+  // check if it is last packet (has less data that full payload size), or
+  // the digest (no data)
+  if (seq >= num_frames)
+    bytes_to_send = 0;
+  else if (seq == (num_frames - 1))
+    bytes_to_send = size - seq * chunk_size;
+  else
+    bytes_to_send = chunk_size;
+  frame_size = MAX(prefix_len + bytes_to_send, ETH_MINIMUM_NBYTES);
+
+  // Alloc memory for frame
+  char *frame_ptr = (char *)(*mem_alloc)(TEMPLATE_LEN + frame_size);
+
+  // Copy template, sequence number and data (with padding) to frame
+  for (i = 0; i < TEMPLATE_LEN; i++)
+    frame_ptr[i] = TEMPLATE[i];
+  set_int(&frame_ptr[TEMPLATE_LEN], seq);
+  for (i = 0; i < bytes_to_send; i++)
+    frame_ptr[TEMPLATE_LEN + prefix_len + i] = data[seq * chunk_size + i];
+  for (i = prefix_len + bytes_to_send; i < frame_size; i++)
+    frame_ptr[TEMPLATE_LEN + i] = 0;
+  if (sync_flags & ETH_MODE_CRC) {
+    if (seq >= num_frames)
+      crc = crc32_update(0, data, size);
+    else
+      crc = crc32_update(0, &data[seq * chunk_size], bytes_to_send);
+    set_int(&frame_ptr[TEMPLATE_LEN + ETH_DATA_CRC_PTR], crc);
+  }
+
+  eth_send_frame_addr(frame_size, (uint32_t)(uintptr_t)frame_ptr);
+
+  (*mem_free)(frame_ptr);
+}
+
+// Send sequence-numbered frames, with up to sync_window in flight
+// (ETH_MODE_SEQ). With ETH_MODE_CRC, frames with a bad verdict are sent again
+// at once, and the digest follows once all frames are acknowledged.
+static unsigned int eth_send_file_seq(char *data, int size) {
+  int check = sync_flags & ETH_MODE_CRC;
+  int chunk_size = sync_payload - data_prefix_len();
+  unsigned int num_frames = ((size - 1) / chunk_size) + 1;
+  unsigned int base = 0, next = 0;
+  unsigned int seq, sack, bytes_to_send;
+  unsigned int error_bytes = 0;
+  int i, progress, verdict;
+
+  // One bit per frame, set when frame is acknowledged
+  unsigned char *acked = (unsigned char *)(*mem_alloc)((num_frames + 7) / 8);
+  for (i = 0; i < (num_frames + 7) / 8; i++)
+    acked[i] = 0;
+
+  while (base < num_frames) {
+    // send frames until window is full
+    while (next < num_frames && next < base + sync_window) {
+      eth_send_frame_seq(data, size, next);
+      next++;
+    }
+
+    // wait for ack, resend frames not yet acknowledged on timeout
+    if (eth_rcv_frame(buffer, sync_payload, rcv_timeout)) {
+      for (seq = base; seq < next; seq++)
+        if (!BITMAP_GET(acked, seq))
+          eth_send_frame_seq(data, size, seq);
+      continue;
+    }
+
+    // repeat resume reply if the host did not get it
+    if ((sync_flags & ETH_MODE_RESUME) && get_resume(buffer)) {
+      send_resume();
+      continue;
+    }
+
+    get_int(&buffer[ETH_ACK_CUM_PTR], &seq);
+    if (check) {
+      // verdict: ignore frames from other transfers
+      if (seq >= next || BITMAP_GET(acked, seq))
+        continue;
+      // data corrupted on the way: send it again at once
+      if (buffer[ETH_VERDICT_PTR] == ETH_VERDICT_OK)
+        BITMAP_SET(acked, seq);
+      else
+        eth_send_frame_seq(data, size, seq);
+    } else if (sync_flags & ETH_MODE_ACK) {
+      // ignore frames that are not acks for this transfer
+      if (seq > next)
+        continue;
+      // cumulative ack: all frames before seq received
+      progress = 0;
+      for (i = base; i < seq; i++)
+        if (!BITMAP_GET(acked, i)) {
+          BITMAP_SET(acked, i);
+          progress = 1;
+        }
+      // selective ack: frames received after seq
+      get_int(&buffer[ETH_ACK_SACK_PTR], &sack);
+      for (i = 0; i < ETH_ACK_SACK_BITS && seq + 1 + i < next; i++)
+        if (((sack >> i) & 1) && !BITMAP_GET(acked, seq + 1 + i)) {
+          BITMAP_SET(acked, seq + 1 + i);
+          progress = 1;
+        }
+      // acks that acknowledge nothing new are repeated by the receiver when
+      // it stops getting frames: resend without waiting for the timeout,
+      // which the repeated acks would keep from expiring
+      if (!progress)
+        for (i = base; i < next; i++)
+          if (!BITMAP_GET(acked, i))
+            eth_send_frame_seq(data, size, i);
+    } else {
+      // frame echo: ignore frames from other transfers
+      if (seq >= next || BITMAP_GET(acked, seq))
+        continue;
+      if (seq == (num_frames - 1))
+        bytes_to_send = size - seq * chunk_size;
+      else
+        bytes_to_send = chunk_size;
+      for (i = 0; i < bytes_to_send; i++)
+        if (buffer[ETH_SEQ_LEN + i] != data[seq * chunk_size + i])
+          error_bytes += 1;
+      BITMAP_SET(acked, seq);
+    }
+
+    // slide window over acknowledged frames
+    while (base < num_frames && BITMAP_GET(acked, base))
+      base++;
+  }
+
+  (*mem_free)(acked);
+
+  // send digest until its verdict arrives, ignoring repeated verdicts of data
+  // frames (ETH_MODE_CRC)
+  verdict = 0;
+  while (check && !verdict) {
+    eth_send_frame_seq(data, size, num_frames);
+    while (!eth_rcv_frame(buffer, ETH_MINIMUM_NBYTES, rcv_timeout)) {
+      get_int(buffer, &seq);
+      if (seq == num_frames) {
+        verdict = buffer[ETH_VERDICT_PTR];
+        break;
+      }
+    }
+  }
+  if (check && verdict != ETH_VERDICT_OK) {
+    printf("Error, file digest does not match the received file\n");
+    error_bytes = 1;
+  }
+
+  printf("File transmitted with %d errors...\n", error_bytes);
+
+  return size;
+}
+
 static unsigned int eth_send_file_impl(char *data, int size) {
-  int num_frames = ((size - 1) / ETH_NBYTES) + 1;
+  int num_frames = ((size - 1) / sync_payload) + 1;
   unsigned int bytes_to_send;
   unsigned int count_bytes = 0;
   unsigned int error_bytes = 0;
+  unsigned int offset = 0;
   int i, j;
 
+  if (sync_flags & ETH_MODE_SEQ) {
+    if (sync_flags & ETH_MODE_RESUME)
+      offset = eth_resume(data, size, 0);
+    return offset + eth_send_file_seq(&data[offset], size - offset);
+  }
+
   // Loop to send data
   for (j = 0; j < num_frames; j++) {
 
@@ -470,7 +934,7 @@ static unsigned int eth_send_file_impl(char *data, int size) {
     if (j == (num_frames - 1))
       bytes_to_send = size - count_bytes;
     else
-      bytes_to_send = ETH_NBYTES;
+      bytes_to_send = sync_payload;
 
     // send frame
     eth_send_frame(&data[count_bytes], MAX(bytes_to_send, ETH_MINIMUM_NBYTES));
@@ -498,50 +962,235 @@ static unsigned int eth_send_file_impl(char *data, int size) {
 
 unsigned int eth_rcv_file(char *data, int size) {
 
-  SyncAckLast();
+  SyncAckLast(0);
 
   return eth_rcv_file_impl(data, size);
 }
 
 unsigned int eth_send_file(char *data, int size) {
 
-  SyncAckFirst();
+  SyncAckFirst(0);
 
   return eth_send_file_impl(data, size);
 }
 
-unsigned int eth_rcv_variable_file(char *data) {
-  unsigned int size = 0;
+/* check if ptr holds a versioned size frame (ETH_MODE_STREAM)
+ * return 1 if valid, 0 otherwise */
+static int get_size(char *ptr) {
+  int i;
+  for (i = 0; i < ETH_SYNC_MAGIC_LEN; i++)
+    if (ptr[i] != ETH_SIZE_MAGIC[i])
+      return 0;
+  return ptr[ETH_SIZE_VERSION_PTR] == ETH_SIZE_VERSION;
+}
 
-  SyncAckLast();
+/* receive size frame of a variable size transfer (skip repeated sync frames,
+ * and late frames of a previous transfer with ETH_MODE_STREAM) and send it
+ * back as ack
+ * flags: set to the size frame flags (ETH_MODE_STREAM)
+ * return size */
+static unsigned int rcv_size(unsigned int *flags) {
+  unsigned int size = 0;
 
-  // Receive file size
-  while (eth_rcv_frame(buffer, ETH_MINIMUM_NBYTES, rcv_timeout))
+  while (eth_rcv_frame(buffer, ETH_MINIMUM_NBYTES, rcv_timeout) ||
+         get_sync(buffer, ETH_SYNC_FROM_HOST) ||
+         ((sync_flags & ETH_MODE_STREAM) && !get_size(buffer)))
     ;
 
   // Send data back as ack
   eth_send_frame(buffer, ETH_MINIMUM_NBYTES);
-  get_int(buffer, &size);
 
-  return eth_rcv_file_impl(data, size);
+  *flags = 0;
+  if (!(sync_flags & ETH_MODE_STREAM)) {
+    get_int(buffer, &size);
+    return size;
+  }
+  // Only the low 32 bits of the size fit the board memory
+  *flags = buffer[ETH_SIZE_FLAGS_PTR];
+  get_int(&buffer[ETH_SIZE_PTR], &size);
+  return size;
 }
 
-unsigned int eth_send_variable_file(char *data, int size) {
-
-  SyncAckFirst();
-
-  // Send size
-  set_int(buffer, size);
+/* send size frame of a variable size transfer, formed in buffer, and wait
+ * for its ack
+ * flags: size frame flags (ETH_MODE_STREAM) */
+static void send_size(unsigned int size, unsigned int flags) {
+  int i;
+  for (i = 0; i < ETH_MINIMUM_NBYTES; i++)
+    buffer[i] = 0;
+  if (sync_flags & ETH_MODE_STREAM) {
+    for (i = 0; i < ETH_SYNC_MAGIC_LEN; i++)
+      buffer[i] = ETH_SIZE_MAGIC[i];
+    buffer[ETH_SIZE_VERSION_PTR] = ETH_SIZE_VERSION;
+    buffer[ETH_SIZE_FLAGS_PTR] = flags;
+    set_int(&buffer[ETH_SIZE_PTR], size);
+  } else {
+    set_int(buffer, size);
+  }
   eth_send_frame(buffer, ETH_MINIMUM_NBYTES);
 
   // Wait for ack
   while (eth_rcv_frame(buffer, ETH_MINIMUM_NBYTES, rcv_timeout))
     ;
+}
+
+unsigned int eth_rcv_variable_file(char *data) {
+  unsigned int size, flags, count_bytes = 0;
+
+  SyncAckLast(0);
+
+  while (1) {
+    size = rcv_size(&flags);
+    if (size)
+      count_bytes += eth_rcv_file_impl(&data[count_bytes], size);
+
+    // Receive the segments of a stream of unknown length until the last one
+    if (!(flags & ETH_SIZE_MORE))
+      return count_bytes;
+    SyncAckLast(1);
+  }
+}
+
+unsigned int eth_send_variable_file(char *data, int size) {
+
+  SyncAckFirst(0);
+
+  // Send size
+  send_size(size, 0);
 
   // Transfer file
   return eth_send_file_impl(data, size);
 }
 
+unsigned int eth_send_stream(char *data, int size) {
+
+  SyncAckFirst(1);
+  if (!(sync_flags & ETH_MODE_STREAM)) {
+    printf("Error, host does not support streams\n");
+    return 0;
+  }
+
+  // Send size of this segment, more follow
+  send_size(size, ETH_SIZE_MORE);
+  if (size == 0)
+    return 0;
+
+  // Transfer segment
+  return eth_send_file_impl(data, size);
+}
+
+void eth_end_stream() {
+
+  SyncAckFirst(1);
+  if (!(sync_flags & ETH_MODE_STREAM)) {
+    printf("Error, host does not support streams\n");
+    return;
+  }
+
+  // Send end-of-stream frame
+  send_size(0, 0);
+}
+
+/* offset after ETH_BATCH_ALIGN alignment */
+static unsigned int batch_align(unsigned int offset) {
+  return (offset + ETH_BATCH_ALIGN - 1) & ~(ETH_BATCH_ALIGN - 1);
+}
+
+int eth_rcv_batch(char *data, eth_batch_file_t *files, int max_files) {
+  unsigned int size, count, manifest_len, offset, name_len;
+  char *entry, *manifest_end;
+  int i, errors = 0;
+
+  size = eth_rcv_variable_file(data);
+
+  // Check manifest header
+  if (size < ETH_BATCH_HEADER_LEN)
+    return -1;
+  for (i = 0; i < ETH_SYNC_MAGIC_LEN; i++)
+    if (data[i] != ETH_BATCH_MAGIC[i])
+      return -1;
+  get_int(&data[ETH_BATCH_COUNT_PTR], &count);
+  get_int(&data[ETH_BATCH_MANIFEST_PTR], &manifest_len);
+  if (count > max_files || manifest_len > size)
+    return -1;
+
+  // Point files to their data in place, and check them
+  manifest_end = &data[manifest_len];
+  entry = &data[ETH_BATCH_HEADER_LEN];
+  for (i = 0; i < count; i++) {
+    if (entry + ETH_BATCH_ENTRY_LEN > manifest_end)
+      return -1;
+    get_int(&entry[ETH_BATCH_OFFSET_PTR], &offset);
+    get_int(&entry[ETH_BATCH_SIZE_PTR], &files[i].size);
+    get_int(&entry[ETH_BATCH_CRC_PTR], &files[i].crc);
+    name_len = get_short(&entry[ETH_BATCH_NAME_LEN_PTR]);
+    files[i].name = &entry[ETH_BATCH_ENTRY_LEN];
+    entry += ETH_BATCH_ENTRY_LEN + name_len;
+    if (name_len == 0 || entry > manifest_end || entry[-1] != 0 ||
+        offset < manifest_len || offset > size ||
+        files[i].size > size - offset)
+      return -1;
+    files[i].data = &data[offset];
+    if (crc32_update(0, files[i].data, files[i].size) != files[i].crc) {
+      printf("Error, batch file %s does not match its CRC32\n", files[i].name);
+      errors++;
+    }
+  }
+
+  return errors ? -1 : count;
+}
+
+unsigned int eth_send_batch(eth_batch_file_t *files, int count) {
+  unsigned int manifest_len = ETH_BATCH_HEADER_LEN, size, offset, name_len;
+  unsigned int j;
+  char *batch, *entry;
+  int i;
+
+  // Lay out the files after the manifest
+  for (i = 0; i < count; i++) {
+    for (name_len = 1; files[i].name[name_len - 1]; name_len++)
+      ;
+    manifest_len += ETH_BATCH_ENTRY_LEN + name_len;
+  }
+  size = manifest_len;
+  for (i = 0; i < count; i++)
+    size = batch_align(size) + files[i].size;
+
+  batch = (char *)(*mem_alloc)(size);
+
+  // Form manifest, and copy each file after zero padding
+  for (i = 0; i < ETH_SYNC_MAGIC_LEN; i++)
+    batch[i] = ETH_BATCH_MAGIC[i];
+  set_int(&batch[ETH_BATCH_COUNT_PTR], count);
+  set_int(&batch[ETH_BATCH_MANIFEST_PTR], manifest_len);
+  entry = &batch[ETH_BATCH_HEADER_LEN];
+  size = manifest_len;
+  for (i = 0; i < count; i++) {
+    offset = batch_align(size);
+    for (j = size; j < offset; j++)
+      batch[j] = 0;
+    for (j = 0; j < files[i].size; j++)
+      batch[offset + j] = files[i].data[j];
+    size = offset + files[i].size;
+    files[i].crc = crc32_update(0, files[i].data, files[i].size);
+
+    set_int(&entry[ETH_BATCH_OFFSET_PTR], offset);
+    set_int(&entry[ETH_BATCH_SIZE_PTR], files[i].size);
+    set_int(&entry[ETH_BATCH_CRC_PTR], files[i].crc);
+    j = 0;
+    do
+      entry[ETH_BATCH_ENTRY_LEN + j] = files[i].name[j];
+    while (files[i].name[j++]);
+    set_short(&entry[ETH_BATCH_NAME_LEN_PTR], j);
+    entry += ETH_BATCH_ENTRY_LEN + j;
+  }
+
+  size = eth_send_variable_file(batch, size);
+  (*mem_free)(batch);
+
+  return size;
+}
+
 void eth_wait_phy_rst() {
   while (iob_eth_csrs_get_phy_rst_val())
     ;
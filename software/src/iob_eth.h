@@ -138,6 +138,10 @@ void eth_set_receive_timeout(unsigned int timeout);
 /**
  * @brief Receives a file over Ethernet.
  *
+ * When the host resumes an interrupted transfer (ETH_MODE_RESUME), the data
+ * already in the buffer before the resume offset is kept, if it matches the
+ * host CRC32.
+ *
  * @param data Buffer to store the received file data.
  * @param size The size of the file to receive.
  * @return unsigned int The number of bytes received.
@@ -156,6 +160,10 @@ unsigned int eth_send_file(char *data, int size);
 /**
  * @brief Receives a file of variable size.
  *
+ * Streams of unknown length (ETH_MODE_STREAM) are received segment by
+ * segment into consecutive positions of the buffer, until the end of the
+ * stream.
+ *
  * @param data Buffer to store the received file data.
  * @return unsigned int The size of the received file.
  */
@@ -170,6 +178,62 @@ unsigned int eth_rcv_variable_file(char *data);
  */
 unsigned int eth_send_variable_file(char *data, int size);
 
+/**
+ * @brief Sends a segment of a stream of unknown length.
+ *
+ * Each segment is transferred as a variable size file, with its own sync, so
+ * data can be sent as it is produced. The host must support streams
+ * (ETH_MODE_STREAM). End the stream with eth_end_stream.
+ *
+ * @param data Pointer to the segment data to send.
+ * @param size The size of the segment.
+ * @return unsigned int The number of bytes sent.
+ */
+unsigned int eth_send_stream(char *data, int size);
+
+/**
+ * @brief Ends a stream sent with eth_send_stream (sends the end-of-stream
+ * frame).
+ */
+void eth_end_stream();
+
+/**
+ * @brief File of a batch transferred with eth_rcv_batch or eth_send_batch.
+ */
+typedef struct {
+  char *name;        /**< NUL-terminated file name */
+  char *data;        /**< File data */
+  unsigned int size; /**< File size */
+  unsigned int crc;  /**< CRC32 (as zlib crc32) of the file data */
+} eth_batch_file_t;
+
+/**
+ * @brief Receives a batch of files in a single variable size transfer.
+ *
+ * The batch (a manifest with the name, size and CRC32 of each file, followed
+ * by the files) is received into data. The files are used in place: their
+ * names and data point into data, each file aligned to ETH_BATCH_ALIGN bytes.
+ *
+ * @param data Buffer to store the received batch.
+ * @param files Array to fill with the files of the batch.
+ * @param max_files Number of entries in files.
+ * @return int The number of files received, or -1 if the manifest is invalid
+ * or a file does not match its CRC32.
+ */
+int eth_rcv_batch(char *data, eth_batch_file_t *files, int max_files);
+
+/**
+ * @brief Sends a batch of files in a single variable size transfer.
+ *
+ * The files are copied after the manifest into a buffer from the memory
+ * allocation function, and their CRC32 is stored in the crc field.
+ *
+ * @param files Array with the name, data and size of each file.
+ * @param count Number of files.
+ * @return unsigned int The number of bytes sent.
+ */
+unsigned int eth_send_batch(eth_batch_file_t *files, int count);
+
 /**
  * @brief Waits for the PHY to reset.
  *